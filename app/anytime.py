@@ -0,0 +1,76 @@
+# Anytime GA loop shared by both optimizers
+# Steps a GA run one generation at a time and reports the best-so-far answer after
+# every generation, stopping on a generation limit, a wall-clock deadline, convergence
+# (no improvement for `patience` generations) or once a target fitness is reached.
+
+import time
+from typing import Iterator, Optional
+
+# Stop reasons reported on the final Progress
+GENERATIONS = "generations"
+DEADLINE = "deadline"
+CONVERGED = "converged"
+TARGET = "target"
+
+
+class Progress:
+    def __init__(self, generation, result, fitness, elapsed_ms, stop_reason=None, population=None):
+        self.generation = generation    # generations completed (0 = initial population)
+        self.result = result            # the run's result object for the best route so far
+        self.fitness = fitness          # best fitness so far, higher is better
+        self.elapsed_ms = elapsed_ms
+        self.stop_reason = stop_reason  # set on the last Progress only
+        self.population = population    # current population, e.g. to warm-start a later run
+
+    @property
+    def done(self) -> bool:
+        return self.stop_reason is not None
+
+
+def iterate(ga, rng, generations, deadline_ms: Optional[float] = None, patience: Optional[int] = None,
+            target: Optional[float] = None, started: Optional[float] = None) -> Iterator[Progress]:
+    """
+    Evolves a GA run (initial_population, fitness, step, best) and yields a Progress for the
+    initial population and after each generation; the last one carries stop_reason.
+    fitness and target are higher-is-better. started is a time.perf_counter() value and
+    defaults to now, so setup done by the caller can count against the deadline.
+    """
+    started = time.perf_counter() if started is None else started
+    deadline = started + deadline_ms / 1000.0 if deadline_ms is not None else None
+    population = ga.initial_population(rng)
+    fitness = ga.fitness(population)
+    best = float(fitness.max())
+    best_result = ga.best(population, fitness, 0)
+    stale = 0
+    generation = 0
+    while True:
+        now = time.perf_counter()
+        if target is not None and best >= target:
+            reason = TARGET
+        elif patience is not None and stale >= patience:
+            reason = CONVERGED
+        elif generation >= generations:
+            reason = GENERATIONS
+        elif deadline is not None and now >= deadline:
+            reason = DEADLINE
+        else:
+            reason = None
+        yield Progress(generation, best_result, best, (now - started) * 1000.0, reason, population)
+        if reason is not None:
+            return
+        population, fitness = ga.step(population, fitness, rng)
+        generation += 1
+        current = float(fitness.max())
+        if current > best:
+            best, stale = current, 0
+            best_result = ga.best(population, fitness, generation)
+        else:
+            stale += 1
+
+
+def run_anytime(ga, rng, generations, deadline_ms=None, patience=None, target=None, callback=None, started=None):
+    # Drives iterate() to the end, calling callback(progress) each generation; returns the final Progress
+    for progress in iterate(ga, rng, generations, deadline_ms, patience, target, started):
+        if callback is not None:
+            callback(progress)
+    return progress
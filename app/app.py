@@ -1,11 +1,16 @@
 
+import os
 import streamlit as st
 from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, WasteType, Vehicle, WasteClassification
+from fitness_cache import shared_cache
+from result_store import ResultStore
+from waste_classifier import classify_waste
+from fuzzy_risk import fuzzy_risk, risk_level
+from route_graph import route_html
+import metrics
 import networkx as nx
 import matplotlib.pyplot as plt
-from pyvis.network import Network
 import streamlit.components.v1 as components
-import random
 
 # --- Improved Custom CSS for a clean, soft look ---
 st.markdown(
@@ -84,56 +89,46 @@ with st.sidebar:
 </ul>
 <hr>
 """, unsafe_allow_html=True)
+    # Per-request timing breakdown, filled in after each optimization
+    show_timings = st.checkbox("Show timing breakdown", value=True, key="show_timings")
+    profile_run = st.checkbox("Profile with cProfile", key="profile_run")
+    # Fixed seed: the same inputs give the same route, and repeated requests come from the store
+    ga_seed = int(st.number_input("Random seed", min_value=0, value=42, step=1, key="ga_seed"))
+    use_store = st.checkbox("Reuse stored results", value=True, key="use_store")
 
-def fuzzy_risk_score(pH, flash_point, toxicity):
-    risk = 0
-    if pH < 3 or pH > 11:
-        risk += 1
-    if flash_point < 37:
-        risk += 1
-    if toxicity.lower() == "high":
-        risk += 1
-    if risk == 0:
-        return "Low"
-    elif risk == 1:
-        return "Medium"
-    else:
-        return "High"
+WASTE_TYPES = {
+    "Flammable": WasteType.FLAMMABLE,
+    "Corrosive": WasteType.CORROSIVE,
+    "Toxic": WasteType.TOXIC,
+    "General": WasteType.GENERAL,
+}
 
-def plot_route(route_nodes):
-    # Now with 3 disposal nodes and improved interactivity
-    all_nodes = [
-        "Source", "Inspection A", "Inspection B", "Inspection C",
-        "Node X", "Node Y", "Node Z", "Node W", "Disposal A", "Disposal B", "Disposal C"
-    ]
-    all_edges = [
-        ("Source", "Inspection A"), ("Source", "Inspection B"), ("Source", "Inspection C"),
-        ("Inspection A", "Node X"), ("Inspection B", "Node Y"), ("Inspection C", "Node Z"),
-        ("Node X", "Disposal A"), ("Node Y", "Disposal B"), ("Node Z", "Disposal C"),
-        ("Source", "Node W"), ("Node W", "Disposal A"), ("Node W", "Disposal B"), ("Node W", "Disposal C")
-    ]
-    route_edges = [(route_nodes[i], route_nodes[i+1]) for i in range(len(route_nodes)-1)]
+@st.cache_resource
+def get_fitness_cache():
+    # One route-fitness cache per server process, kept across reruns and sessions
+    return shared_cache()
 
-    net = Network(height="400px", width="100%", directed=True, notebook=False)
-    for node in all_nodes:
-        color = "deepskyblue" if node in route_nodes else "lightgray"
-        size = 30 if node in route_nodes else 20
-        net.add_node(node, label=node, color=color, size=size, physics=True)
-    for edge in all_edges:
-        color = "orange" if edge in route_edges else "#cccccc"
-        width = 4 if edge in route_edges else 1
-        net.add_edge(edge[0], edge[1], color=color, width=width)
+@st.cache_resource
+def get_result_store():
+    # Optimizer results kept on disk across server restarts
+    return ResultStore(os.environ.get("HAZWASTE_RESULT_STORE", "route_results.sqlite"))
 
-    net.set_options('''
-    var options = {
-      "nodes": {"font": {"size": 18}, "physics": true, "shadow": true},
-      "edges": {"arrows": {"to": {"enabled": true}}, "smooth": true},
-      "interaction": {"hover": true, "multiselect": true, "navigationButtons": true}
-    }
-    ''')
-    net.save_graph("route_graph.html")
-    HtmlFile = open("route_graph.html", "r", encoding="utf-8")
-    components.html(HtmlFile.read(), height=450)
+def show_breakdown(breakdown):
+    # Sidebar table of stage timings and counters recorded by metrics.capture()
+    with st.sidebar:
+        st.markdown(f'<h3 style="color:#2193b0;">⏱️ Timing ({breakdown.total_ms:.0f} ms)</h3>', unsafe_allow_html=True)
+        st.table([{"Stage": row["stage"], "Calls": row["calls"], "ms": round(row["ms"], 1)}
+                  for row in breakdown.totals()])
+        if breakdown.counters:
+            st.table([{"Counter": name, "Value": value} for name, value in breakdown.counters.items()])
+        if breakdown.profile:
+            with st.expander("cProfile (cumulative)"):
+                st.code(breakdown.profile)
+
+def plot_route(route_nodes, network):
+    # Draws the optimizer's network and highlights the route (in either edge direction).
+    # The HTML is rendered in memory and cached per route; see route_graph.py
+    components.html(route_html(network, route_nodes), height=450)
 
 st.markdown('<h1 style="color:#2193b0;font-weight:900;text-shadow:1px 1px 8px #6dd5ed;">♻️ Smart Hazardous Waste Classifier & Route Optimizer</h1>', unsafe_allow_html=True)
 st.markdown('<h4 style="color:#2193b0;">A modern tool for safe, efficient hazardous waste management</h4>', unsafe_allow_html=True)
@@ -156,119 +151,121 @@ st.markdown('<h3 style="color:#2193b0;">🚚 Vehicle & Quantity</h3>', unsafe_al
 st.markdown('<div style="color:#888;font-size:0.98rem;margin-bottom:0.5rem;">Specify vehicle and waste details:</div>', unsafe_allow_html=True)
 vehicle_capacity = st.number_input("Vehicle Capacity (kg)", min_value=1, max_value=10000, value=1000, key="vehicle_capacity")
 waste_quantity = st.number_input("Waste Quantity (kg)", min_value=1, max_value=10000, value=500, key="waste_quantity")
+time_budget_ms = st.number_input("Optimization time budget (ms)", min_value=50, max_value=60000, value=2000, step=50, key="time_budget_ms")
+show_pareto = st.checkbox("Show trade-offs (Pareto front of distance, risk and late stops)", key="show_pareto")
 st.markdown('<hr>', unsafe_allow_html=True)
 
 if st.button("✨ Classify & Optimize Route"):
-    # Map user input to WasteType
-    if toxicity == "High":
-        if flash_point <= 60:
-            waste_type = WasteType.FLAMMABLE
-        else:
-            waste_type = WasteType.TOXIC
-    elif pH <= 2.0 or pH >= 12.5:
-        waste_type = WasteType.CORROSIVE
-    else:
-        waste_type = WasteType.GENERAL
-
-    st.markdown(
-        f'<div style="background:linear-gradient(90deg,#2193b0,#6dd5ed);color:#fff;padding:0.9rem 1.2rem;border-radius:10px;font-size:1.1rem;margin-bottom:0.5rem;box-shadow:0 2px 8px 0 rgba(33,147,176,0.10);font-weight:bold;">'
-        f'Waste type: {waste_type}'
-        '</div>',
-        unsafe_allow_html=True
-    )
-
-    # Prepare advanced optimizer request
-    vehicle = Vehicle(vehicle_capacity)
-    waste_classification = WasteClassification(waste_type, waste_quantity)
-    request = OptimizationRequest(
-        source_location="source",
-        destination_location="disposal",
-        waste_classification=waste_classification,
-        vehicle=vehicle
-    )
-    optimizer = AdvancedRouteOptimizer()
-
-    # Find the best route using a simple GA loop
-    # For demo: generate a population of random valid routes, pick the best by fitness
-    def generate_valid_route():
-        # Build a valid path from Source to Disposal A using only allowed edges
-        # Network: Source -> Inspection A -> Node X -> Disposal A
-        route = ["Source"]
-        if random.random() < 0.7:
-            route.append("Inspection A")
-            if random.random() < 0.7:
-                route.append("Node X")
-        else:
-            route.append("Node W")
-        route.append("Disposal A")
-        # Validate route: all consecutive pairs must be valid edges
-        valid_edges = {
-            ("Source", "Inspection A"), ("Source", "Node W"),
-            ("Inspection A", "Node X"), ("Node X", "Disposal A"),
-            ("Node W", "Disposal A")
-        }
-        for i in range(len(route) - 1):
-            if (route[i], route[i+1]) not in valid_edges:
-                return None
-        return route
-
-    best_route = None
-    best_fitness = -float('inf')
-    best_cost = None
-    for _ in range(100):
-        route = generate_valid_route()
-        if not route:
-            continue
-        node_map = {
-            "Source": "source",
-            "Inspection A": "inspection_a",
-            "Node X": "node_1",
-            "Node W": "node_w",
-            "Disposal A": "disposal",
-        }
-        key_route = [node_map.get(n, n.lower().replace(' ', '_')) for n in route]
-        fitness = optimizer._calculate_fitness(key_route, request)
-        # Calculate cost
-        total_cost = 0
-        for i in range(len(key_route) - 1):
-            a, b = key_route[i], key_route[i+1]
-            edge = optimizer.network["distances"].get((a, b)) or optimizer.network["distances"].get((b, a))
-            if edge:
-                total_cost += edge["distance"] * 10
-        if fitness > best_fitness:
-            best_fitness = fitness
-            best_route = route
-            best_cost = total_cost
+    # Stage timings (and optionally a cProfile report) for this button press
+    with metrics.capture(profile=profile_run) as breakdown:
+        # Map the canonical classification to WasteType
+        waste_type = WASTE_TYPES[classify_waste(pH, flash_point, toxicity)]
 
-
-
-    if best_route:
-        best_route_str = ' -> '.join(best_route)
-        blue_box = 'background:linear-gradient(90deg,#36d1c4,#5b86e5);color:white;padding:1rem 1.5rem;border-radius:12px;font-size:1.1rem;margin-bottom:0.5rem;box-shadow:0 2px 8px 0 rgba(91,134,229,0.10);font-weight:bold;'
-        st.markdown(
-            f'<div style="{blue_box}">Waste type: {waste_type}</div>',
-            unsafe_allow_html=True
-        )
         st.markdown(
-            f'<div style="{blue_box}"><b>Best Route:</b> {best_route_str}</div>',
+            f'<div style="background:linear-gradient(90deg,#2193b0,#6dd5ed);color:#fff;padding:0.9rem 1.2rem;border-radius:10px;font-size:1.1rem;margin-bottom:0.5rem;box-shadow:0 2px 8px 0 rgba(33,147,176,0.10);font-weight:bold;">'
+            f'Waste type: {waste_type}'
+            '</div>',
             unsafe_allow_html=True
         )
-        st.markdown(
-            f'<div style="{blue_box}"><b>Fitness Score:</b> {best_fitness:.4f} (higher is better)</div>',
-            unsafe_allow_html=True
-        )
-        st.markdown(
-            f'<div style="{blue_box}"><b>Total cost:</b> {best_cost} units</div>',
-            unsafe_allow_html=True
-        )
-        # Fuzzy risk score output
-        risk_score = fuzzy_risk_score(pH, flash_point, toxicity)
-        st.markdown(
-            f'<div style="{blue_box}">🚨 <b>Fuzzy Risk Level:</b> <span style="font-size:1.2rem;">{risk_score}</span></div>',
-            unsafe_allow_html=True
+
+        # Prepare advanced optimizer request; the fuzzy risk scales each edge's incident risk
+        risk_score = fuzzy_risk(pH, flash_point, toxicity)
+        vehicle = Vehicle(vehicle_capacity)
+        waste_classification = WasteClassification(waste_type, waste_quantity, hazard=risk_score)
+        request = OptimizationRequest(
+            source_location="source",
+            destination_location="disposal",
+            waste_classification=waste_classification,
+            vehicle=vehicle
         )
-        # Route graph visualization
-        st.markdown('<h3 style="color:#36d1c4;">🗺️ Route Visualization</h3>', unsafe_allow_html=True)
-        plot_route(best_route)
-    else:
-        st.error("No valid route could be generated. Please check your input values.")
\ No newline at end of file
+        optimizer = AdvancedRouteOptimizer({"patience": 15, "seed": ga_seed}, cache=get_fitness_cache())
+        if use_store:
+            optimizer.result_store = get_result_store()
+        # Live progress: best-so-far route and fitness after every generation
+        progress_bar = st.progress(0.0)
+        status = st.empty()
+        result = None
+        try:
+            for progress in optimizer.optimize_iter(request, deadline_ms=time_budget_ms):
+                result = progress.result
+                progress_bar.progress(min(1.0, max(progress.generation / optimizer.generations,
+                                                   progress.elapsed_ms / time_budget_ms)))
+                status.markdown(
+                    f'Generation {progress.generation}: best fitness {progress.fitness:.4f} '
+                    f'({progress.elapsed_ms:.0f} ms)'
+                )
+            progress_bar.progress(1.0)
+            status.markdown(f'Stopped after {progress.generation} generations ({progress.stop_reason}, {progress.elapsed_ms:.0f} ms)')
+            if use_store:
+                stats = optimizer.result_store.stats()
+                st.sidebar.caption(f"Result store: {stats['size']} routes, {stats['hit_rate']:.0%} hit rate this session")
+        except ValueError as e:
+            st.error(str(e))
+            result = None
+        best_route = None
+        if result:
+            names = {key: node["name"] for key, node in optimizer.network["nodes"].items()}
+            best_route = [names[key] for key in result.route]
+            best_fitness = result.fitness
+            best_cost = result.total_cost
+
+        if best_route:
+            best_route_str = ' -> '.join(best_route)
+            blue_box = 'background:linear-gradient(90deg,#36d1c4,#5b86e5);color:white;padding:1rem 1.5rem;border-radius:12px;font-size:1.1rem;margin-bottom:0.5rem;box-shadow:0 2px 8px 0 rgba(91,134,229,0.10);font-weight:bold;'
+            st.markdown(
+                f'<div style="{blue_box}">Waste type: {waste_type}</div>',
+                unsafe_allow_html=True
+            )
+            st.markdown(
+                f'<div style="{blue_box}"><b>Best Route:</b> {best_route_str}</div>',
+                unsafe_allow_html=True
+            )
+            st.markdown(
+                f'<div style="{blue_box}"><b>Fitness Score:</b> {best_fitness:.4f} (higher is better)</div>',
+                unsafe_allow_html=True
+            )
+            st.markdown(
+                f'<div style="{blue_box}"><b>Total cost:</b> {best_cost} units</div>',
+                unsafe_allow_html=True
+            )
+            # Per-stop ETAs (hours after midnight; waiting where a site is not open yet)
+            st.markdown(
+                f'<div style="{blue_box}"><b>Departure:</b> {result.departure_time:.2f} h, <b>duration:</b> {result.duration:.2f} h</div>',
+                unsafe_allow_html=True
+            )
+            st.table([
+                {"Stop": names[stop["node"]], "Arrival (h)": round(stop["arrival"], 2), "Wait (h)": round(stop["wait"], 2),
+                 "Departure (h)": round(stop["departure"], 2), "Late": stop["late"]}
+                for stop in result.schedule
+            ])
+            # Fuzzy risk score output
+            st.markdown(
+                f'<div style="{blue_box}">🚨 <b>Fuzzy Risk Level:</b> <span style="font-size:1.2rem;">{risk_level(pH, flash_point, toxicity)}</span>'
+                f' ({risk_score:.2f})</div>',
+                unsafe_allow_html=True
+            )
+            # Route graph visualization
+            st.markdown('<h3 style="color:#36d1c4;">🗺️ Route Visualization</h3>', unsafe_allow_html=True)
+            plot_route(result.route, optimizer.network)
+
+            if show_pareto:
+                # NSGA-II trade-offs: no route on the front is better in every objective than another
+                st.markdown('<h3 style="color:#36d1c4;">⚖️ Distance / Risk Trade-offs</h3>', unsafe_allow_html=True)
+                front = optimizer.optimize_pareto(request, deadline_ms=time_budget_ms)
+                st.table([
+                    {"Route": ' -> '.join(names[key] for key in r.route), "Distance (km)": round(r.total_distance, 2),
+                     "Risk + weather": round(r.total_risk, 2), "Late stops": sum(stop["late"] for stop in r.schedule)}
+                    for r in front
+                ])
+                fig, ax = plt.subplots(figsize=(6, 3.5))
+                ax.scatter([r.total_distance for r in front], [r.total_risk for r in front],
+                           c=[sum(stop["late"] for stop in r.schedule) for r in front], cmap="viridis", s=60)
+                ax.plot([result.total_distance], [result.total_risk], marker="*", color="orange", markersize=16,
+                        linestyle="none", label="Best weighted route")
+                ax.set_xlabel("Distance (km)")
+                ax.set_ylabel("Risk + weather exposure")
+                ax.legend()
+                st.pyplot(fig)
+                plt.close(fig)  # Streamlit keeps the process alive; free the figure after every run
+    if show_timings:
+        show_breakdown(breakdown)
@@ -0,0 +1,314 @@
+# Compiled graph shared by route_optimizer, distance_matrix and the advanced optimizer
+# Nodes get integer IDs; adjacency is CSR and every edge attribute is a flat array
+# aligned with the CSR edge order, so lookups are array indexing instead of dict probes.
+
+import itertools
+import os
+import numpy as np
+from typing import Dict
+
+# One bit per waste type in the restriction bitmask
+RESTRICTION_BITS = {
+    "flammable": 1,
+    "toxic": 2,
+    "corrosive": 4,
+    "general": 8,
+}
+
+# Distinguishes compiled graphs in cache keys
+_TOKENS = itertools.count()
+
+# Above this many nodes edge lookups use binary search instead of a dense N x N table
+DENSE_NODE_LIMIT = 2048
+
+# Travel speeds are piecewise constant per hour of the day
+HOURS = 24
+DEFAULT_SPEED_KMH = 50.0
+
+
+def restriction_bit(waste_type) -> int:
+    if waste_type is None:
+        return 0
+    return RESTRICTION_BITS.get(str(waste_type).lower(), 0)
+
+
+class CompiledGraph:
+    def __init__(self, names, node_types, tw_open, tw_close, indptr, indices,
+                 distance, risk, weather, restricted, labels=None, directed=True,
+                 speed_profiles=None, speed_class=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.labels = list(labels) if labels is not None else list(self.names)
+        self.node_types = np.asarray(node_types)
+        self.tw_open = np.asarray(tw_open, dtype=float)
+        self.tw_close = np.asarray(tw_close, dtype=float)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.distance = np.asarray(distance, dtype=float)
+        self.risk = np.asarray(risk, dtype=float)
+        self.weather = np.asarray(weather, dtype=float)
+        self.restricted = np.asarray(restricted, dtype=np.uint8)
+        # Time-dependent speeds: one row of HOURS km/h values per distinct profile, and
+        # the profile index of every edge
+        if speed_profiles is None:
+            speed_profiles = np.full((1, HOURS), DEFAULT_SPEED_KMH)
+        self.speed_profiles = np.asarray(speed_profiles, dtype=np.float32).reshape(-1, HOURS)
+        if speed_class is None:
+            speed_class = np.zeros(len(self.indices))
+        self.speed_class = np.asarray(speed_class, dtype=np.uint16)
+        self.directed = directed
+        self.token = next(_TOKENS)
+        # Bumped by update_edges; caches of edge-attribute results key on (token, version)
+        self.version = 0
+        self._closed = {}  # edge ID -> distance before closure
+        self.path = None   # directory the arrays are memory-mapped from (graph_store.load_graph)
+        self._cache = {}
+
+    def __getstate__(self):
+        # A graph mapped from disk and not updated since travels as its path, so worker
+        # processes map the same files; otherwise the arrays are pickled. Derived lookup
+        # tables are rebuilt lazily either way.
+        if self.path is not None and self.version == 0:
+            return {"path": self.path}
+        state = dict(self.__dict__)
+        state["_cache"] = {}
+        return state
+
+    def __setstate__(self, state):
+        if "names" not in state:
+            from graph_store import load_graph
+            state = dict(load_graph(state["path"]).__dict__)
+        self.__dict__.update(state)
+        # Tokens are only unique within a process; an unpickled graph gets one of this process
+        self.token = next(_TOKENS)
+
+    def copy(self) -> "CompiledGraph":
+        # Private copy for update_edges: the edge attributes are copied (writable even for
+        # a memory-mapped graph), the CSR structure is shared; the copy has its own token
+        graph = object.__new__(CompiledGraph)
+        graph.__dict__.update(self.__dict__)
+        for attr in ("distance", "risk", "weather", "restricted"):
+            setattr(graph, attr, np.array(getattr(self, attr)))
+        graph._closed = dict(self._closed)
+        graph._cache = {}
+        graph.path = None
+        graph.token = next(_TOKENS)
+        return graph
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def sources(self) -> np.ndarray:
+        # Tail node of every edge, in CSR order
+        if "sources" not in self._cache:
+            self._cache["sources"] = np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+        return self._cache["sources"]
+
+    def ids(self, route) -> np.ndarray:
+        # Node names -> int IDs (-1 for names not in the graph)
+        return np.array([self.index.get(n, -1) for n in route], dtype=np.int32)
+
+    def neighbors(self, u: int) -> np.ndarray:
+        return self.indices[self.indptr[u]:self.indptr[u + 1]]
+
+    def edge_ids(self, u, v) -> np.ndarray:
+        # Vectorized (u, v) -> edge ID, -1 where there is no edge or a node is unknown
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        known = (u >= 0) & (v >= 0)
+        n = self.n_nodes
+        query = np.where(known, u * n + v, 0)
+        if n <= DENSE_NODE_LIMIT:
+            eid = self._edge_table().take(query)
+        elif self.n_edges:
+            keys = self._edge_keys()
+            pos = np.minimum(np.searchsorted(keys, query), self.n_edges - 1)
+            eid = np.where(keys[pos] == query, pos, -1)
+        else:
+            eid = np.full(query.shape, -1, dtype=np.int64)
+        return np.where(known, eid, -1)
+
+    def has_edge(self, a, b) -> bool:
+        return int(self.edge_ids(self.index.get(a, -1), self.index.get(b, -1))) >= 0
+
+    def neighbor_table(self):
+        # Padded (N x max_degree) neighbour and edge-ID tables, -1 = no neighbour
+        if "neighbor_table" not in self._cache:
+            degree = np.diff(self.indptr)
+            width = max(1, int(degree.max(initial=0)))
+            slot = np.arange(self.n_edges) - np.repeat(self.indptr[:-1], degree)
+            nbr = np.full((self.n_nodes, width), -1, dtype=np.int32)
+            eid = np.full((self.n_nodes, width), -1, dtype=np.int64)
+            nbr[self.sources, slot] = self.indices
+            eid[self.sources, slot] = np.arange(self.n_edges)
+            self._cache["neighbor_table"] = (nbr, eid)
+        return self._cache["neighbor_table"]
+
+    def reverse(self):
+        # CSR of the transposed graph: (indptr, tails, edge IDs) grouped by head node
+        if "reverse" not in self._cache:
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.n_nodes), out=indptr[1:])
+            self._cache["reverse"] = (indptr, self.sources[order], order)
+        return self._cache["reverse"]
+
+    @property
+    def constant_speed(self) -> bool:
+        # No profile varies by hour, so travel times do not depend on the departure time
+        if "constant_speed" not in self._cache:
+            self._cache["constant_speed"] = bool((self.speed_profiles == self.speed_profiles[:, :1]).all())
+        return self._cache["constant_speed"]
+
+    def travel_hours(self, eid, depart) -> np.ndarray:
+        # Vectorized travel time of edges eid when leaving at clock time depart (hours);
+        # the speed is the edge profile's value for the departure hour of day
+        hour = np.floor(depart).astype(np.int64) % HOURS
+        return self.distance[eid] / self.speed_profiles[self.speed_class[eid], hour]
+
+    def update_edges(self, changes: Dict) -> np.ndarray:
+        """
+        Applies edge-attribute deltas in place: {(a, b): {"risk", "weather", "restricted", "closed"}}.
+        Omitted attributes keep their value; "restricted" replaces the waste-type list and a
+        closed edge keeps its place in the CSR arrays with an infinite distance until it is
+        reopened with "closed": False. Undirected graphs update both directions.
+        Returns the sorted IDs of the updated edges.
+        """
+        touched = []
+        for (a, b), attrs in changes.items():
+            pairs = [(a, b)] if self.directed else [(a, b), (b, a)]
+            for u, v in pairs:
+                eid = int(self.edge_ids(self.index.get(u, -1), self.index.get(v, -1)))
+                if eid < 0:
+                    raise ValueError(f"Unknown edge: {u} -> {v}")
+                if "risk" in attrs:
+                    self.risk[eid] = float(attrs["risk"])
+                if "weather" in attrs:
+                    self.weather[eid] = float(attrs["weather"])
+                if "restricted" in attrs:
+                    mask = 0
+                    for waste_type in attrs["restricted"]:
+                        mask |= restriction_bit(waste_type)
+                    self.restricted[eid] = mask
+                if attrs.get("closed") and eid not in self._closed:
+                    self._closed[eid] = self.distance[eid]
+                    self.distance[eid] = np.inf
+                elif attrs.get("closed") is False and eid in self._closed:
+                    self.distance[eid] = self._closed.pop(eid)
+                touched.append(eid)
+        if touched:
+            self.version += 1
+            # Dense attribute matrices are stale; structural tables are unchanged
+            for key in [k for k in self._cache if isinstance(k, tuple) and k[0] == "dense"]:
+                del self._cache[key]
+        return np.unique(np.array(touched, dtype=np.int64))
+
+    def blocked(self, waste_type) -> np.ndarray:
+        # Per-edge bool: edge is restricted for this waste type
+        return (self.restricted & restriction_bit(waste_type)) != 0
+
+    def dense(self, attr: str, fill=np.inf) -> np.ndarray:
+        # Dense N x N matrix of an edge attribute (small graphs only)
+        key = ("dense", attr, fill)
+        if key not in self._cache:
+            matrix = np.full((self.n_nodes, self.n_nodes), fill, dtype=float)
+            matrix[self.sources, self.indices] = getattr(self, attr)
+            self._cache[key] = matrix
+        return self._cache[key]
+
+    def _edge_table(self) -> np.ndarray:
+        if "edge_table" not in self._cache:
+            table = np.full(self.n_nodes * self.n_nodes, -1, dtype=np.int32)
+            table[self._edge_keys()] = np.arange(self.n_edges)
+            self._cache["edge_table"] = table
+        return self._cache["edge_table"]
+
+    def _edge_keys(self) -> np.ndarray:
+        # CSR order with sorted columns makes u * N + v globally sorted
+        if "edge_keys" not in self._cache:
+            self._cache["edge_keys"] = self.sources.astype(np.int64) * self.n_nodes + self.indices
+        return self._cache["edge_keys"]
+
+
+def build_graph(description: Dict) -> CompiledGraph:
+    """
+    Compiles a declarative network description:
+        {"nodes": {key: {"name", "type", "time_window"}},
+         "distances": {(a, b): {"distance", "risk", "weather", "restricted", "speed"}},
+         "speed_profiles": {name: [km/h for each hour of the day]},
+         "directed": bool}
+    Descriptions are undirected unless "directed" is set; undirected edges get both directions.
+    An edge speed is a constant km/h, HOURS hourly values or a speed_profiles name (default 50 km/h).
+    """
+    nodes = description["nodes"]
+    directed = description.get("directed", False)
+    names = list(nodes)
+    index = {name: i for i, name in enumerate(names)}
+    # Named hourly profiles; an edge's "speed" is a km/h number, HOURS values or a profile name
+    named_profiles = description.get("speed_profiles", {})
+    profiles = {(DEFAULT_SPEED_KMH,) * HOURS: 0}
+    edges = {}
+    for (a, b), attrs in description["distances"].items():
+        if not isinstance(attrs, dict):
+            attrs = {"distance": attrs}
+        mask = 0
+        for waste_type in attrs.get("restricted", []):
+            mask |= restriction_bit(waste_type)
+        speed = attrs.get("speed", DEFAULT_SPEED_KMH)
+        speed = named_profiles.get(speed, speed) if isinstance(speed, str) else speed
+        profile = tuple(float(v) for v in np.broadcast_to(np.asarray(speed, dtype=float), (HOURS,)))
+        row = (float(attrs["distance"]), float(attrs.get("risk", 0.0)), float(attrs.get("weather", 0.0)), mask,
+               profiles.setdefault(profile, len(profiles)))
+        edges[(index[a], index[b])] = row
+        if not directed:
+            edges.setdefault((index[b], index[a]), row)
+    pairs = sorted(edges)
+    tails = np.array([u for u, _ in pairs], dtype=np.int64)
+    indptr = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=len(names)), out=indptr[1:])
+    attrs = np.array([edges[p] for p in pairs], dtype=float).reshape(len(pairs), 5)
+    windows = np.array([nodes[n].get("time_window", (0, 24)) for n in names], dtype=float).reshape(len(names), 2)
+    return CompiledGraph(
+        names=names,
+        labels=[nodes[n].get("name", n) for n in names],
+        node_types=[nodes[n].get("type", "waypoint") for n in names],
+        tw_open=windows[:, 0],
+        tw_close=windows[:, 1],
+        indptr=indptr,
+        indices=[v for _, v in pairs],
+        distance=attrs[:, 0],
+        risk=attrs[:, 1],
+        weather=attrs[:, 2],
+        restricted=attrs[:, 3].astype(np.uint8),
+        directed=directed,
+        speed_profiles=np.array(list(profiles), dtype=float),
+        speed_class=attrs[:, 4],
+    )
+
+
+_COMPILED = {}
+
+def compile_network(description) -> CompiledGraph:
+    # Build once per description object and reuse across requests (an already
+    # compiled graph is returned as is, a directory path is loaded with
+    # graph_store.load_graph once per path). The description is kept alive alongside
+    # its graph so its id() is never recycled.
+    if isinstance(description, CompiledGraph):
+        return description
+    if isinstance(description, (str, os.PathLike)):
+        from graph_store import load_graph
+        path = os.path.abspath(description)
+        if path not in _COMPILED:
+            _COMPILED[path] = (path, load_graph(path))
+        return _COMPILED[path][1]
+    entry = _COMPILED.get(id(description))
+    if entry is None or entry[0] is not description:
+        entry = (description, build_graph(description))
+        _COMPILED[id(description)] = entry
+    return entry[1]
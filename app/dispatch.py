@@ -0,0 +1,261 @@
+# Multi-vehicle batch dispatch
+# Plans many waste lots across a fleet in one call. Lots are grouped by waste type
+# (incompatible types never share a load), packed into capacitated trips
+# depot -> pickups -> mandatory inspection -> disposal with Clarke-Wright savings,
+# the pickup order of each trip is improved with 2-opt while time remains, and
+# trips are then spread over the fleet. Each distinct vehicle capacity is tried as the
+# packing limit, so a mixed fleet is not left waiting while the largest vehicle runs
+# every merged trip.
+
+import time
+import numpy as np
+from typing import Dict, List, Sequence
+
+from distance_matrix import GRAPH
+from path_solver import shortest_path_tree, tree_path
+from route_optimizer import disposal_rule
+
+
+class Trip:
+    def __init__(self, waste_type, lots, route, distance, load):
+        self.waste_type = waste_type
+        self.lots = lots          # indices into the dispatched lot list, in pickup order
+        self.route = route        # node names, depot -> ... -> disposal
+        self.distance = distance
+        self.load = load
+
+class VehicleRoute:
+    def __init__(self, vehicle_index, vehicle):
+        self.vehicle_index = vehicle_index
+        self.vehicle = vehicle
+        self.trips: List[Trip] = []
+
+    @property
+    def distance(self) -> float:
+        return sum(trip.distance for trip in self.trips)
+
+    @property
+    def load(self) -> float:
+        return sum(trip.load for trip in self.trips)
+
+class DispatchResult:
+    def __init__(self, vehicle_routes, unassigned, metrics):
+        self.vehicle_routes = vehicle_routes  # one VehicleRoute per fleet vehicle
+        self.unassigned = unassigned          # (lot index, reason) pairs
+        self.metrics = metrics
+
+
+class _TypePlanner:
+    # Shortest-path trees for one waste type: from the depot, towards the inspection and
+    # disposal sites, and (lazily) from each pickup node. Trees are shared between waste
+    # types whose restricted edges are identical.
+
+    def __init__(self, graph, depot, waste_type, rules, tree_cache):
+        required, disposal = rules(waste_type)
+        self.graph = graph
+        self.depot = graph.index[depot]
+        self.required = graph.index[required] if required else None
+        self.disposal = graph.index[disposal]
+        self.allowed = ~graph.blocked(waste_type) & np.isfinite(graph.distance)
+        self._trees = tree_cache.setdefault(self.allowed.tobytes(), {})
+
+    def tree(self, origin, reverse=False):
+        key = (origin, reverse)
+        if key not in self._trees:
+            self._trees[key] = shortest_path_tree(self.graph, origin, self.graph.distance, self.allowed, reverse)
+        return self._trees[key]
+
+    def tails(self, nodes) -> np.ndarray:
+        # Pickup node -> (inspection ->) disposal, from one reverse tree per site
+        if self.required is None:
+            return self.tree(self.disposal, reverse=True)[0][nodes]
+        to_disposal = self.tree(self.disposal, reverse=True)[0][self.required]
+        return self.tree(self.required, reverse=True)[0][nodes] + to_disposal
+
+    def path(self, pickups) -> List[int]:
+        # depot -> pickups -> (inspection ->) disposal
+        route = tree_path(self.tree(self.depot)[1], self.depot, pickups[0])
+        for a, b in zip(pickups[:-1], pickups[1:]):
+            if a != b:
+                route.extend(tree_path(self.tree(a)[1], a, b)[1:])
+        for site in ([self.required] if self.required is not None else []) + [self.disposal]:
+            if route[-1] != site:
+                route.extend(tree_path(self.tree(site, reverse=True)[1], site, route[-1], reverse=True)[1:])
+        return route
+
+
+def _sequence_cost(seq, start, pair, tail) -> float:
+    cost = start[seq[0]] + tail[seq[-1]]
+    for a, b in zip(seq[:-1], seq[1:]):
+        cost += pair[a, b]
+    return cost
+
+
+def _savings_trips(quantities, start, pair, tail, capacity, deadline):
+    # Clarke-Wright: start with one trip per lot, then merge trip ending at i with trip
+    # starting at j in decreasing order of the saving tail[i] + start[j] - pair[i, j]
+    m = len(quantities)
+    trips = {i: [i] for i in range(m)}
+    trip_of = list(range(m))
+    load = {i: quantities[i] for i in range(m)}
+    head = {i: i for i in range(m)}
+    end = {i: i for i in range(m)}
+    savings = tail[:, None] + start[None, :] - pair
+    np.fill_diagonal(savings, -np.inf)
+    savings[~np.isfinite(savings)] = -np.inf
+    flat = np.flatnonzero(savings > 0)
+    exhausted = False
+    for k in flat[np.argsort(-savings.ravel()[flat], kind="stable")]:
+        if time.perf_counter() > deadline:
+            exhausted = True
+            break
+        i, j = divmod(int(k), m)
+        ti, tj = trip_of[i], trip_of[j]
+        if ti == tj or end[ti] != i or head[tj] != j or load[ti] + load[tj] > capacity:
+            continue
+        for lot in trips[tj]:
+            trip_of[lot] = ti
+        trips[ti].extend(trips.pop(tj))
+        load[ti] += load.pop(tj)
+        end[ti] = end.pop(tj)
+        del head[tj]
+    return list(trips.values()), exhausted
+
+
+def _two_opt(seq, start, pair, tail, deadline):
+    # Reverse pickup segments while that shortens the trip
+    best = _sequence_cost(seq, start, pair, tail)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(len(seq) - 1):
+            for j in range(i + 1, len(seq)):
+                cand = seq[:i] + seq[i:j + 1][::-1] + seq[j + 1:]
+                cost = _sequence_cost(cand, start, pair, tail)
+                if cost < best - 1e-9:
+                    seq, best, improved = cand, cost, True
+    return seq, best
+
+
+def _assign(trips, fleet):
+    # Longest trips first, each to the least-busy vehicle that can carry it; returns the
+    # vehicle routes and the (lot, reason) pairs of trips no vehicle can carry
+    vehicle_routes = [VehicleRoute(i, v) for i, v in enumerate(fleet)]
+    rejected = []
+    for trip in sorted(trips, key=lambda t: (-t.load, -t.distance)):
+        fits = [vr for vr in vehicle_routes if vr.vehicle.capacity >= trip.load]
+        if not fits:
+            rejected.extend((lot, "Vehicle capacity exceeded!") for lot in trip.lots)
+            continue
+        min(fits, key=lambda vr: (vr.distance, vr.vehicle.capacity)).trips.append(trip)
+    return vehicle_routes, rejected
+
+
+def dispatch(lots: Sequence, fleet: Sequence, depot: str = "Source", graph=None,
+             time_budget_ms: float = 1000.0, rules=None) -> DispatchResult:
+    """
+    Plans pickups for many WasteClassification lots (lot.location = pickup node, None =
+    depot) across a fleet of Vehicles. Respects per-type inspection/disposal rules,
+    restricted edges and capacities; each vehicle may run several trips. Planning stops
+    improving once time_budget_ms is spent and returns the best plan so far.
+    rules maps a waste type to (inspection node or None, disposal node); defaults to
+    route_optimizer.disposal_rule.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000.0
+    graph = graph or GRAPH
+    rules = rules or disposal_rule
+    max_capacity = max((v.capacity for v in fleet), default=0)
+    unassigned = []
+    exhausted = False
+    tree_cache = {}
+
+    # Each waste type has its own inspection and disposal site, and hazardous classes
+    # must not be mixed on one load, so only lots of the same type share a trip. Types
+    # are compared case-insensitively, like disposal_rule does.
+    by_type: Dict[str, List[int]] = {}
+    for i, lot in enumerate(lots):
+        if lot.quantity > max_capacity:
+            unassigned.append((i, "Vehicle capacity exceeded!"))
+        elif (lot.location or depot) not in graph.index:
+            unassigned.append((i, "Unknown pickup location"))
+        else:
+            by_type.setdefault(str(lot.waste_type).capitalize(), []).append(i)
+
+    types = []  # (waste type, planner, members, pickup nodes, start, pair, tail, quantities)
+    for waste_type, members in by_type.items():
+        planner = _TypePlanner(graph, depot, waste_type, rules, tree_cache)
+        nodes = np.array([graph.index[lots[i].location or depot] for i in members])
+        start = planner.tree(planner.depot)[0][nodes]
+        tail = planner.tails(nodes)
+        reachable = np.isfinite(start) & np.isfinite(tail)
+        for k in np.flatnonzero(~reachable):
+            unassigned.append((members[k], "No permitted route for this waste type"))
+        keep = np.flatnonzero(reachable)
+        if not len(keep):
+            continue
+        members = [members[k] for k in keep]
+        nodes, start, tail = nodes[keep], start[keep], tail[keep]
+        # Pickup-to-pickup distances; rows not computed before the deadline stay
+        # unmergeable, which degrades gracefully to one trip per lot
+        pair = np.full((len(nodes), len(nodes)), np.inf)
+        for k, a in enumerate(nodes):
+            if time.perf_counter() > deadline:
+                exhausted = True
+                break
+            pair[k] = planner.tree(int(a))[0][nodes]
+        types.append((waste_type, planner, members, nodes, start, pair, tail, [lots[i].quantity for i in members]))
+
+    # Trips merged up to the largest vehicle fit only that vehicle, which then runs most
+    # of the plan. Every distinct fleet capacity (largest first) is tried as the packing
+    # limit, and the limit whose plan has the shortest busiest vehicle, then the shortest
+    # total distance, is kept.
+    best = None
+    for limit in sorted({v.capacity for v in fleet}, reverse=True):
+        if best is not None and time.perf_counter() > deadline:
+            exhausted = True
+            break
+        plan = []  # (type position, pickup sequence, Clarke-Wright distance, load)
+        for t, (_, _, _, _, start, pair, tail, quantities) in enumerate(types):
+            groups, hit_deadline = _savings_trips(quantities, start, pair, tail, limit, deadline)
+            exhausted |= hit_deadline
+            plan += [(t, group, _sequence_cost(group, start, pair, tail), sum(quantities[k] for k in group))
+                     for group in groups]
+        vehicle_routes, _ = _assign([Trip(t, group, None, distance, load) for t, group, distance, load in plan],
+                                    fleet)
+        score = (max((vr.distance for vr in vehicle_routes), default=0.0), sum(vr.distance for vr in vehicle_routes))
+        if best is None or score < best[0]:
+            best = (score, plan)
+
+    trips: List[Trip] = []
+    for t, group, _, load in (best[1] if best is not None else []):
+        waste_type, planner, members, nodes, start, pair, tail, _ = types[t]
+        seq, distance = _two_opt(group, start, pair, tail, deadline)
+        trips.append(Trip(
+            waste_type=waste_type,
+            lots=[members[k] for k in seq],
+            route=[graph.names[n] for n in planner.path([int(nodes[k]) for k in seq])],
+            distance=float(distance),
+            load=float(load),
+        ))
+    vehicle_routes, rejected = _assign(trips, fleet)
+    unassigned += rejected
+
+    assigned = [t for vr in vehicle_routes for t in vr.trips]
+    total_distance = sum(t.distance for t in assigned)
+    delivered = sum(t.load for t in assigned)
+    utilization = [t.load / vr.vehicle.capacity for vr in vehicle_routes for t in vr.trips]
+    metrics = {
+        "lots": len(lots),
+        "lots_assigned": sum(len(t.lots) for t in assigned),
+        "quantity_delivered": delivered,
+        "trips": len(assigned),
+        "vehicles_used": sum(1 for vr in vehicle_routes if vr.trips),
+        "total_distance": total_distance,
+        "max_vehicle_distance": max((vr.distance for vr in vehicle_routes), default=0.0),
+        "mean_utilization": float(np.mean(utilization)) if utilization else 0.0,
+        "quantity_per_distance": delivered / total_distance if total_distance else 0.0,
+        "solve_time_ms": (time.perf_counter() - started) * 1000.0,
+        "time_budget_exhausted": exhausted or time.perf_counter() > deadline,
+    }
+    return DispatchResult(vehicle_routes, unassigned, metrics)
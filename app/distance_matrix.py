@@ -1,24 +1,50 @@
 # distance_matrix.py
-# Simple mock distance matrix for 6 nodes
+# Depot network shared by route_optimizer and get_distance, compiled once into a CompiledGraph
 
-# Nodes: Source, Inspection A, Inspection B, Inspection C, Node X, Node Y, Node Z, Node W, Disposal
+from compiled_graph import compile_network
 
-distances = {
-    ("Source", "Inspection A"): 5,
-    ("Source", "Inspection B"): 6,
-    ("Source", "Inspection C"): 7,
-    ("Inspection A", "Node X"): 8,
-    ("Inspection B", "Node Y"): 9,
-    ("Inspection C", "Node Z"): 10,
-    ("Node X", "Disposal"): 11,
-    ("Node Y", "Disposal"): 12,
-    ("Node Z", "Disposal"): 13,
-    ("Source", "Node W"): 4,
-    ("Node W", "Disposal"): 14
+# Nodes: Source, Inspection A/B/C, Node X/Y/Z/W, Disposal A/B/C
+
+def _node(name, node_type):
+    return {"name": name, "type": node_type, "time_window": (0, 24)}
+
+DEPOT_NETWORK = {
+    "directed": True,
+    "nodes": {
+        "Source": _node("Source", "source"),
+        "Inspection A": _node("Inspection A", "inspection"),
+        "Inspection B": _node("Inspection B", "inspection"),
+        "Inspection C": _node("Inspection C", "inspection"),
+        "Node X": _node("Node X", "waypoint"),
+        "Node Y": _node("Node Y", "waypoint"),
+        "Node Z": _node("Node Z", "waypoint"),
+        "Node W": _node("Node W", "waypoint"),
+        "Disposal A": _node("Disposal A", "disposal"),
+        "Disposal B": _node("Disposal B", "disposal"),
+        "Disposal C": _node("Disposal C", "disposal"),
+    },
+    "distances": {
+        ("Source", "Inspection A"): {"distance": 5},
+        ("Source", "Inspection B"): {"distance": 6},
+        ("Source", "Inspection C"): {"distance": 7},
+        ("Inspection A", "Node X"): {"distance": 8},
+        ("Inspection B", "Node Y"): {"distance": 9},
+        ("Inspection C", "Node Z"): {"distance": 10},
+        ("Node X", "Disposal A"): {"distance": 11},
+        ("Node Y", "Disposal B"): {"distance": 12},
+        ("Node Z", "Disposal C"): {"distance": 13},
+        ("Source", "Node W"): {"distance": 4},
+        ("Node W", "Disposal A"): {"distance": 14},
+        ("Node W", "Disposal B"): {"distance": 14},
+        ("Node W", "Disposal C"): {"distance": 14},
+    },
 }
 
-def get_distance(route):
-    total = 0
-    for i in range(len(route)-1):
-        total += distances.get((route[i], route[i+1]), 0)
-    return total
+GRAPH = compile_network(DEPOT_NETWORK)
+
+def get_distance(route, graph=None):
+    # Missing legs count as 0, as before
+    graph = graph or GRAPH
+    ids = graph.ids(route)
+    eid = graph.edge_ids(ids[:-1], ids[1:])
+    return float(graph.distance[eid[eid >= 0]].sum())
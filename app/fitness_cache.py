@@ -0,0 +1,117 @@
+# Route-fitness memoization shared by route_optimizer and AdvancedRouteOptimizer
+# Bounded LRU: the least recently used entry is evicted once maxsize is reached.
+
+import threading
+import numpy as np
+import metrics
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+DEFAULT_MAXSIZE = 100_000
+
+
+def encode_route(route: Sequence[int]) -> bytes:
+    # Node-ID sequence packed as int32 bytes: hashes fast and stores compactly
+    return np.asarray(route, dtype=np.int32).tobytes()
+
+
+def route_key(namespace, route, waste_type=None, start_time=None) -> Tuple:
+    # Key: which objective/graph, the encoded node-ID sequence, waste type and start time
+    # (a departure hour or tuple of candidate hours)
+    if not isinstance(route, bytes):
+        route = encode_route(route)
+    return (namespace, route, waste_type, start_time)
+
+
+class FitnessCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        # Streamlit sessions share one instance across script threads
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            value = self._data.get(key, default)
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def get_many(self, keys) -> list:
+        # Batch lookup under one lock acquisition; misses come back as None
+        out = []
+        with self._lock:
+            data = self._data
+            for key in keys:
+                value = data.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    data.move_to_end(key)
+                    self.hits += 1
+                out.append(value)
+        return out
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def put_many(self, items) -> None:
+        with self._lock:
+            for key, value in items:
+                self._data[key] = value
+                self._data.move_to_end(key)
+            self._evict()
+
+    def get_or_compute(self, key: Hashable, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _evict(self) -> None:
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+_shared_cache: Optional[FitnessCache] = None
+_shared_lock = threading.Lock()
+
+def shared_cache(maxsize: int = DEFAULT_MAXSIZE) -> FitnessCache:
+    # Process-wide cache used by both optimizers unless one is passed explicitly
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = FitnessCache(maxsize)
+            metrics.METRICS.gauge("fitness_cache_size", lambda: len(_shared_cache))
+            metrics.METRICS.gauge("fitness_cache_hit_rate", lambda: _shared_cache.stats()["hit_rate"])
+        return _shared_cache
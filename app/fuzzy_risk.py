@@ -0,0 +1,268 @@
+# Fuzzy inference of the hazard of a waste lot from pH, flash point and toxicity
+# Mamdani system evaluated over whole arrays at once: trapezoidal memberships fuzzify
+# every input column, rule strengths are the minimum over their antecedents, rules with
+# the same consequent are aggregated with the maximum, and the clipped output sets are
+# defuzzified by centroid on a fixed grid (or, faster, by the weighted average of the
+# output set centroids). Scores are in [0, 1].
+#
+# Levels come from the dominant output set (ties go to the lower level). The hazard sets
+# cross 0.5 at the classify_waste thresholds (pH 3 and 11, flash point 37 C, toxicity
+# "high"), so for crisp samples exactly one output set fires above 0.5: the old 0-3
+# hazard counter's level (no hazard is Low, one is Medium, two or more are High). On a
+# threshold the hazard set is exactly 0.5 and the tie goes to the lower level, as the
+# counter's strict inequalities do. The centroid score is graded and need not fall in
+# the level's third of [0, 1] near the thresholds.
+#
+#   fuzzy_risk(1.0, 10.0, "high")                         -> 0.85
+#   fuzzy_risk_batch(frame)                               -> Series aligned to frame.index
+#   risk_level(3.0, 8.0, "medium")                        -> "Medium"
+#   risk_levels(frame)                                    -> Categorical Low / Medium / High
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from waste_classifier import COLUMNS
+
+INF = np.inf
+
+
+def trapmf(x, a, b, c, d) -> np.ndarray:
+    """
+    Trapezoidal membership: 0 below a, rising to 1 at b, 1 up to c, falling to 0 at d.
+    a = b = -inf or c = d = inf give open shoulders; b = c gives a triangle.
+    """
+    x = np.asarray(x, dtype=float)
+    out = np.ones_like(x)
+    if np.isfinite(a):
+        out = (x - a) / (b - a) if b > a else (x >= b).astype(float)
+    if np.isfinite(d):
+        out = np.minimum(out, (d - x) / (d - c) if d > c else (x <= c).astype(float))
+    return np.clip(out, 0.0, 1.0)
+
+
+def trimf(x, a, b, c) -> np.ndarray:
+    # Triangular membership peaking at b
+    return trapmf(x, a, b, b, c)
+
+
+# Input variables -> term -> trapezoid (a, b, c, d). Hazard terms and their complements
+# sum to 1 everywhere, so every input is covered by the rules below.
+INPUT_TERMS: Dict[str, Dict[str, Tuple[float, float, float, float]]] = {
+    "pH": {
+        "acidic": (-INF, -INF, 2.0, 4.0),
+        "neutral": (2.0, 4.0, 10.0, 12.0),
+        "alkaline": (10.0, 12.0, INF, INF),
+    },
+    "flash_point": {
+        "flammable": (-INF, -INF, 27.0, 47.0),
+        "stable": (27.0, 47.0, INF, INF),
+    },
+    # Toxicity on a 0-1 scale (labels map through TOXICITY_LEVELS)
+    "toxicity": {
+        "nontoxic": (-INF, -INF, 0.5, 1.0),
+        "toxic": (0.5, 1.0, INF, INF),
+    },
+}
+
+TOXICITY_LEVELS = {"none": 0.0, "low": 0.0, "medium": 0.5, "high": 1.0}
+
+# Output sets on the [0, 1] risk universe
+OUTPUT_TERMS = {
+    "low": (-INF, -INF, 0.2, 0.4),
+    "medium": (0.3, 0.5, 0.5, 0.7),
+    "high": (0.6, 0.8, INF, INF),
+}
+
+# (antecedents, consequent); antecedents are ANDed (min), rules sharing a consequent are
+# ORed (max). "corrosive" is acidic or alkaline.
+RULES = [
+    ((("pH", "neutral"), ("flash_point", "stable"), ("toxicity", "nontoxic")), "low"),
+    ((("pH", "corrosive"), ("flash_point", "stable"), ("toxicity", "nontoxic")), "medium"),
+    ((("pH", "neutral"), ("flash_point", "flammable"), ("toxicity", "nontoxic")), "medium"),
+    ((("pH", "neutral"), ("flash_point", "stable"), ("toxicity", "toxic")), "medium"),
+    ((("pH", "corrosive"), ("flash_point", "flammable")), "high"),
+    ((("pH", "corrosive"), ("toxicity", "toxic")), "high"),
+    ((("flash_point", "flammable"), ("toxicity", "toxic")), "high"),
+]
+
+LABELS = ["Low", "Medium", "High"]  # one per output set, in OUTPUT_TERMS order
+
+# Defuzzification grid and the output sets sampled on it
+GRID = np.linspace(0.0, 1.0, 101)
+_OUTPUTS = list(OUTPUT_TERMS)
+_OUTPUT_MF = np.stack([trapmf(GRID, *OUTPUT_TERMS[t]) for t in _OUTPUTS])
+_OUTPUT_CENTROIDS = (_OUTPUT_MF @ GRID) / _OUTPUT_MF.sum(axis=1)
+_CHUNK = 4096  # rows per block of the overlap temporaries
+
+
+_STEPS = 1000  # strength resolution of the centroid tables
+
+
+def _centroid_tables():
+    # Where only one output set is non-zero, the clipped area and moment of that stretch
+    # depend only on the set's strength, and are piecewise linear in it with knots at the
+    # set's sampled values. They are tabulated once on a uniform strength grid (exact
+    # while those knots lie on it, as they do for OUTPUT_TERMS) and interpolated; only the
+    # grid points where output sets overlap are evaluated per row.
+    active = _OUTPUT_MF > 0
+    shared = active.sum(axis=0) > 1
+    levels = np.linspace(0.0, 1.0, _STEPS + 1)
+    areas, moments = [], []
+    for k in range(len(_OUTPUTS)):
+        cols = active[k] & ~shared
+        clipped = np.minimum(levels[:, None], _OUTPUT_MF[k, cols][None, :])
+        areas.append(clipped.sum(axis=1))
+        moments.append(clipped @ GRID[cols])
+    # Flattened (terms x levels) tables, padded so index _STEPS + 1 is valid
+    pad = lambda rows: np.concatenate([np.append(r, r[-1]) for r in rows])
+    # Overlapping grid points grouped by the output sets active there
+    overlaps = {}
+    for j in np.flatnonzero(shared):
+        overlaps.setdefault(tuple(np.flatnonzero(active[:, j])), []).append(j)
+    overlaps = [(list(terms), _OUTPUT_MF[np.ix_(terms, cols)], GRID[cols]) for terms, cols in overlaps.items()]
+    return overlaps, pad(areas), pad(moments)
+
+
+_OVERLAPS, _AREA_TABLE, _MOMENT_TABLE = _centroid_tables()
+
+def toxicity_values(toxicity) -> np.ndarray:
+    # Labels ("High", "medium", ...) or numbers -> 0-1 scale; unknown labels count as 0
+    values = np.asarray(toxicity)
+    if values.dtype.kind in "biuf":
+        return values.astype(float)
+    # Parse only the distinct labels, then broadcast back
+    codes, labels = pd.factorize(values.ravel(), sort=False)
+    lookup = np.array([_toxicity_level(str(label)) for label in labels] + [0.0])
+    return lookup[codes].reshape(values.shape)  # code -1 (missing) maps to 0
+
+
+def _toxicity_level(label: str) -> float:
+    label = label.strip().lower()
+    if label in TOXICITY_LEVELS:
+        return TOXICITY_LEVELS[label]
+    try:
+        return float(label)
+    except ValueError:
+        return 0.0
+
+
+def rule_strengths(pH, flash_point, toxicity) -> np.ndarray:
+    # (rows x output terms) aggregated firing strength of each output set
+    inputs = {"pH": np.asarray(pH, dtype=float), "flash_point": np.asarray(flash_point, dtype=float),
+              "toxicity": toxicity_values(toxicity)}
+    memberships = {}
+    for variable, terms in INPUT_TERMS.items():
+        for term, params in terms.items():
+            memberships[variable, term] = trapmf(inputs[variable], *params)
+    memberships["pH", "corrosive"] = np.maximum(memberships["pH", "acidic"], memberships["pH", "alkaline"])
+    shape = np.broadcast_shapes(*(v.shape for v in inputs.values()))
+    strengths = np.zeros(shape + (len(_OUTPUTS),))
+    for antecedents, consequent in RULES:
+        fire = memberships[antecedents[0]]
+        for antecedent in antecedents[1:]:
+            fire = np.minimum(fire, memberships[antecedent])
+        k = _OUTPUTS.index(consequent)
+        strengths[..., k] = np.maximum(strengths[..., k], fire)
+    return strengths
+
+
+def _lerp(table, i, frac) -> np.ndarray:
+    # Linear interpolation in the flattened tables, summed over the output sets
+    low = table.take(i)
+    return (low + frac * (table.take(i + 1) - low)).sum(axis=1)
+
+
+def defuzzify(strengths: np.ndarray, method="centroid") -> np.ndarray:
+    """
+    Crisp risk from (rows x output terms) strengths. "centroid" clips each output set at
+    its strength, takes the maximum and returns the centre of gravity on GRID;
+    "weighted" is the strength-weighted mean of the output set centroids (no grid).
+    Rows with no firing rule score 0.
+    """
+    flat = strengths.reshape(-1, len(_OUTPUTS))
+    if method == "weighted":
+        total = flat.sum(axis=1)
+        score = np.divide(flat @ _OUTPUT_CENTROIDS, total, out=np.zeros(len(flat)), where=total > 0)
+    elif method == "centroid":
+        strength = np.clip(flat, 0.0, 1.0)
+        position = strength * _STEPS
+        i = position.astype(np.int64)
+        frac = position - i
+        i += np.arange(len(_OUTPUTS)) * (_STEPS + 2)
+        area = _lerp(_AREA_TABLE, i, frac)
+        moment = _lerp(_MOMENT_TABLE, i, frac)
+        for lo in range(0, len(flat), _CHUNK):
+            block = strength[lo:lo + _CHUNK]
+            for terms, mf, y in _OVERLAPS:
+                mu = np.minimum(block[:, terms[0], None], mf[0])
+                for k in range(1, len(terms)):
+                    np.maximum(mu, np.minimum(block[:, terms[k], None], mf[k]), out=mu)
+                area[lo:lo + _CHUNK] += mu.sum(axis=1)
+                moment[lo:lo + _CHUNK] += mu @ y
+        score = np.divide(moment, area, out=np.zeros(len(flat)), where=area > 0)
+    else:
+        raise ValueError(f"Unknown defuzzification method: {method}")
+    return score.reshape(strengths.shape[:-1])
+
+
+def _columns(pH, flash_point, toxicity, columns):
+    # (pH, flash_point, toxicity, index) from arrays or a DataFrame (index None for arrays)
+    if isinstance(pH, pd.DataFrame):
+        frame = pH
+        return tuple(frame[c].to_numpy() for c in columns) + (frame.index,)
+    return pH, flash_point, toxicity, None
+
+
+def fuzzy_risk_batch(pH, flash_point=None, toxicity=None, columns=COLUMNS, method="centroid"):
+    """
+    Vectorized fuzzy risk over arrays, or over a DataFrame with pH, flash_point and
+    toxicity columns. Returns a float Series (aligned to the DataFrame index) for
+    DataFrame input, otherwise a float array.
+    """
+    with metrics.timer("fuzzy_risk"):
+        pH, flash_point, toxicity, index = _columns(pH, flash_point, toxicity, columns)
+        score = defuzzify(rule_strengths(pH, flash_point, toxicity), method)
+    if index is not None:
+        return pd.Series(score, index=index, name="risk")
+    return score
+
+
+def fuzzy_risk(pH, flash_point, toxicity, method="centroid") -> float:
+    # Risk in [0, 1] for one sample
+    return float(fuzzy_risk_batch([pH], [flash_point], [toxicity], method=method)[0])
+
+
+def risk_levels(pH, flash_point=None, toxicity=None, columns=COLUMNS):
+    """
+    Low / Medium / High level of the strongest output set (argmax keeps the first, i.e.
+    lowest, of tied sets), over arrays or a DataFrame like fuzzy_risk_batch. Returns a
+    categorical Series for DataFrame input, otherwise a pandas Categorical.
+    """
+    pH, flash_point, toxicity, index = _columns(pH, flash_point, toxicity, columns)
+    codes = rule_strengths(pH, flash_point, toxicity).argmax(axis=-1)
+    result = pd.Categorical.from_codes(codes.ravel(), categories=LABELS)
+    if index is not None:
+        return pd.Series(result, index=index, name="risk_level")
+    return result
+
+
+def risk_level(pH, flash_point, toxicity) -> str:
+    return risk_levels([pH], [flash_point], [toxicity])[0]
+
+
+def hazard_severity(hazard=None) -> float:
+    """
+    Multiplier of an edge's incident risk for a lot with this fuzzy risk: 1 at a medium
+    hazard (0.5) or None, 0.5 at 0 and 2 at 1. Weather exposure is not scaled.
+    """
+    if hazard is None:
+        return 1.0
+    return 4.0 ** (min(max(float(hazard), 0.0), 1.0) - 0.5)
+
+
+def edge_exposure(risk, weather, severity=1.0):
+    # Per-edge risk + weather exposure of a lot whose incident severity is `severity`
+    return severity * risk + weather
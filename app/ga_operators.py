@@ -0,0 +1,335 @@
+# Pluggable operators for the legacy route GA (route_optimizer.RouteGARun)
+# Routes are lists of node names from start to disposal. An operator set bundles a
+# crossover, a mutation, an optional graph-aware repair and an optional local search:
+#
+#   legacy   - the original one-cut crossover and swap mutation, no repair
+#   ox       - order crossover + swap mutation, repaired with shortest-path splices
+#   erx      - edge recombination + detour mutation, repaired
+#   memetic  - erx plus a shortcut / 2-opt / Or-opt local search on every child
+#
+# Membership tests use sets, so crossovers are linear in the route length. The repaired
+# sets also charge missing_leg_penalty per leg that is not an edge of the graph, so a
+# route that jumps between unconnected nodes can no longer look cheaper than a real one.
+
+import math
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from compiled_graph import DENSE_NODE_LIMIT
+from path_solver import shortest_path_tree, tree_path
+
+INF = math.inf
+
+
+class RouteContext:
+    # What the operators need to know about one start/disposal pair: leg lengths and
+    # (cached) shortest paths between any two nodes
+
+    def __init__(self, graph, start, disposal, required=None):
+        self.graph = graph
+        self.start = start
+        self.disposal = disposal
+        self.required = required
+        self._dense = graph.dense("distance") if graph.n_nodes <= DENSE_NODE_LIMIT else None
+        self._legs: Dict = {}
+        self._trees: Dict = {}  # (root, reverse) -> (distances, predecessor / next-hop array)
+
+    def __getstate__(self):
+        # Caches are rebuilt per process (island workers)
+        state = dict(self.__dict__)
+        state.update(_dense=None, _legs={}, _trees={})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.graph.n_nodes <= DENSE_NODE_LIMIT:
+            self._dense = self.graph.dense("distance")
+
+    def leg(self, a, b) -> float:
+        # Length of edge a -> b, inf if there is none
+        index = self.graph.index
+        if self._dense is not None:
+            return float(self._dense[index[a], index[b]])
+        key = (a, b)
+        if key not in self._legs:
+            eid = int(self.graph.edge_ids(index[a], index[b]))
+            self._legs[key] = float(self.graph.distance[eid]) if eid >= 0 else INF
+        return self._legs[key]
+
+    def length(self, route) -> float:
+        return sum(self.leg(a, b) for a, b in zip(route[:-1], route[1:]))
+
+    def missing_legs(self, route) -> int:
+        ids = self.graph.ids(route)
+        return int((self.graph.edge_ids(ids[:-1], ids[1:]) < 0).sum())
+
+    def tree(self, root, reverse=False):
+        # (distances, predecessor / next-hop array) of the shortest path tree from root
+        # (to root with reverse=True), computed once per root and direction
+        key = (self.graph.index[root], reverse)
+        if key not in self._trees:
+            graph = self.graph
+            self._trees[key] = shortest_path_tree(graph, key[0], graph.distance, np.isfinite(graph.distance), reverse)
+        return self._trees[key]
+
+    def path(self, a, b) -> Optional[List[str]]:
+        # Shortest path a -> b as node names, None if b is unreachable. Paths into the
+        # disposal or the required node (most repairs) share one reverse tree per target.
+        graph = self.graph
+        origin, target = graph.index[a], graph.index[b]
+        reverse = b == self.disposal or b == self.required
+        root, end = (target, origin) if reverse else (origin, target)
+        tree = self.tree(b if reverse else a, reverse)[1]
+        if origin != target and tree[end] < 0:
+            return None
+        return [graph.names[v] for v in tree_path(tree, root, end, reverse)]
+
+
+def _anchor(route, ctx) -> List[str]:
+    # Make sure the route starts at start and ends at disposal
+    if route[0] != ctx.start:
+        route = [ctx.start] + route
+    if route[-1] != ctx.disposal:
+        route = route + [ctx.disposal]
+    return route
+
+
+# --- crossover ---
+
+def legacy_crossover(p1, p2, rng, ctx) -> List[str]:
+    # Head of p1 up to a random cut, then p2 in order without the head's nodes. A
+    # start -> disposal route has no interior to cut, so p1 is returned as is.
+    if len(p1) < 3:
+        return list(p1)
+    cut = rng.randint(1, len(p1)-2)
+    head = p1[:cut]
+    taken = set(head)
+    return _anchor(head + [n for n in p2 if n not in taken], ctx)
+
+
+def order_crossover(p1, p2, rng, ctx) -> List[str]:
+    # OX on the interiors: a random slice of p1 kept in place, the rest filled with
+    # p2's remaining interior nodes in p2's order
+    inner1, inner2 = p1[1:-1], p2[1:-1]
+    if not inner1:
+        return list(p2)
+    i, j = sorted(rng.sample(range(len(inner1) + 1), 2))
+    segment = inner1[i:j]
+    taken = set(segment)
+    rest = [n for n in inner2 if n not in taken]
+    pos = min(i, len(rest))
+    return [ctx.start] + rest[:pos] + segment + rest[pos:] + [ctx.disposal]
+
+
+def edge_recombination(p1, p2, rng, ctx) -> List[str]:
+    # Walks from start over the union of both parents' legs. Candidates that are real
+    # edges come first, then (while the required node is unvisited) anything but the
+    # disposal, then the candidate with the fewest unvisited successors; ties are random.
+    successors: Dict[str, set] = {}
+    for parent in (p1, p2):
+        for a, b in zip(parent[:-1], parent[1:]):
+            successors.setdefault(a, set()).add(b)
+    route = [ctx.start]
+    visited = {ctx.start}
+    while route[-1] != ctx.disposal:
+        current = route[-1]
+        candidates = [n for n in successors.get(current, ()) if n not in visited]
+        if not candidates:
+            route.append(ctx.disposal)  # left to the repair
+            break
+        pending = ctx.required is not None and ctx.required not in visited
+
+        def priority(n):
+            return (ctx.leg(current, n) == INF, pending and n == ctx.disposal,
+                    sum(1 for m in successors.get(n, ()) if m not in visited), rng.random())
+        nxt = min(candidates, key=priority)
+        route.append(nxt)
+        visited.add(nxt)
+    return route
+
+
+# --- mutation ---
+
+def swap_mutation(route, rng, ctx) -> List[str]:
+    # Swaps two interior nodes (in place, as the original GA did)
+    if len(route) > 3:
+        i, j = rng.sample(range(1, len(route)-1), 2)
+        route[i], route[j] = route[j], route[i]
+    return route
+
+
+def detour_mutation(route, rng, ctx) -> List[str]:
+    # Replaces the stretch between two random positions with shortest paths through a
+    # random node of the graph
+    i, j = sorted(rng.sample(range(len(route)), 2)) if len(route) > 2 else (0, len(route) - 1)
+    via = ctx.graph.names[rng.randrange(ctx.graph.n_nodes)]
+    first, second = ctx.path(route[i], via), ctx.path(via, route[j])
+    if first is None or second is None:
+        return route
+    return route[:i] + first + second[1:] + route[j + 1:]
+
+
+# --- repair ---
+
+def _drop_loops(route, required) -> List[str]:
+    # Cuts out every cycle (a node visited twice) that does not contain the required node
+    out: List[str] = []
+    position: Dict[str, int] = {}
+    for n in route:
+        p = position.get(n)
+        if p is not None and required not in out[p + 1:]:
+            for m in out[p + 1:]:
+                del position[m]
+            del out[p + 1:]
+            continue
+        position[n] = len(out)
+        out.append(n)
+    return out
+
+
+def shortest_path_repair(route, ctx) -> List[str]:
+    """
+    Splices the shortest path between consecutive nodes that are not joined by an
+    edge, drops nodes that cannot be reached at all and removes the cycles this
+    creates. A route still missing the required node gets it inserted, along shortest
+    paths, between the two consecutive nodes where the detour is cheapest; the rest of
+    the route is kept.
+    """
+    out = [route[0]]
+    for b in route[1:]:
+        a = out[-1]
+        if a == b:
+            continue
+        if ctx.leg(a, b) < INF:
+            out.append(b)
+            continue
+        path = ctx.path(a, b)
+        if path is not None:
+            out += path[1:]
+        elif b == ctx.disposal:
+            out.append(b)  # nothing reaches the disposal from here; stays infeasible
+    if out[-1] != ctx.disposal:
+        out.append(ctx.disposal)
+    out = _drop_loops(out, ctx.required)
+    if ctx.required is not None and ctx.required not in out:
+        out = _insert_required(out, ctx)
+    return out
+
+
+def _insert_required(route, ctx) -> List[str]:
+    # Cheapest insertion of the required node: detour route[k] -> required -> route[k+1]
+    # minus the leg it replaces, over every k (distances from the two trees at required)
+    index = ctx.graph.index
+    to_required = ctx.tree(ctx.required, reverse=True)[0]
+    from_required = ctx.tree(ctx.required)[0]
+    ids = [index[n] for n in route]
+    legs = np.array([ctx.leg(a, b) for a, b in zip(route[:-1], route[1:])])
+    detour = to_required[ids[:-1]] + from_required[ids[1:]] - np.where(np.isfinite(legs), legs, 0.0)
+    k = int(np.argmin(detour))
+    if not np.isfinite(detour[k]):
+        return route  # the required node cannot be reached and left; stays infeasible
+    first, second = ctx.path(route[k], ctx.required), ctx.path(ctx.required, route[k + 1])
+    return _drop_loops(route[:k] + first + second[1:] + route[k + 2:], ctx.required)
+
+
+# --- local search ---
+
+def _shortcut(route, ctx) -> bool:
+    # Replaces a stretch i..j by the direct edge i -> j when that is shorter
+    legs = [ctx.leg(a, b) for a, b in zip(route[:-1], route[1:])]
+    prefix = np.concatenate(([0.0], np.cumsum(legs)))
+    for i in range(len(route) - 2):
+        for j in range(len(route) - 1, i + 1, -1):
+            if ctx.required in route[i + 1:j] and ctx.required not in route[:i + 1] + route[j:]:
+                continue
+            direct = ctx.leg(route[i], route[j])
+            if direct < prefix[j] - prefix[i] - 1e-9:
+                route[i + 1:j] = []
+                return True
+    return False
+
+
+def _two_opt(route, ctx) -> bool:
+    # Reverses an interior stretch i..j when that is shorter. Prefix sums of the forward
+    # and backward legs make every candidate O(1) on directed graphs too.
+    pairs = list(zip(route[:-1], route[1:]))
+    forward = np.concatenate(([0.0], np.cumsum([ctx.leg(a, b) for a, b in pairs])))
+    back = np.array([ctx.leg(b, a) for a, b in pairs])
+    missing = np.concatenate(([0], np.cumsum(back == INF)))
+    back = np.concatenate(([0.0], np.cumsum(np.where(back == INF, 0.0, back))))
+    for i in range(1, len(route) - 2):
+        for j in range(i + 1, len(route) - 1):
+            if missing[j] != missing[i]:
+                continue  # a reversed leg of i..j is not an edge
+            new = ctx.leg(route[i - 1], route[j]) + back[j] - back[i] + ctx.leg(route[i], route[j + 1])
+            if new < forward[j + 1] - forward[i - 1] - 1e-9:
+                route[i:j + 1] = route[j:i - 1:-1]
+                return True
+    return False
+
+
+def _or_opt(route, ctx) -> bool:
+    # Moves a stretch of 1-3 interior nodes to another position when that is shorter
+    leg = ctx.leg
+    for size in (1, 2, 3):
+        for i in range(1, len(route) - size):
+            j = i + size  # stretch is route[i:j]
+            before, after = route[i - 1], route[j]
+            removed = leg(before, route[i]) + leg(route[j - 1], after) - leg(before, after)
+            if removed <= 1e-9 or removed == INF:
+                continue
+            segment = route[i:j]
+            rest = route[:i] + route[j:]
+            for k in range(len(rest) - 1):
+                if k == i - 1:
+                    continue
+                a, b = rest[k], rest[k + 1]
+                added = leg(a, segment[0]) + leg(segment[-1], b) - leg(a, b)
+                if added < removed - 1e-9:
+                    route[:] = rest[:k + 1] + segment + rest[k + 1:]
+                    return True
+    return False
+
+
+def improve_route(route, ctx, max_moves=50) -> List[str]:
+    """
+    First-improvement local search with shortcut, 2-opt and Or-opt moves. Only
+    feasible routes are improved, and every move keeps them feasible.
+    """
+    if ctx.length(route) == INF:
+        return route
+    route = list(route)
+    for _ in range(max_moves):
+        if not (_shortcut(route, ctx) or _or_opt(route, ctx) or _two_opt(route, ctx)):
+            break
+    return route
+
+
+class Operators:
+    def __init__(self, name, crossover: Callable, mutation: Callable, repair: Optional[Callable] = None,
+                 local_search: Optional[Callable] = None, missing_leg_penalty=0.0):
+        self.name = name
+        self.crossover = crossover        # (p1, p2, rng, ctx) -> child
+        self.mutation = mutation          # (route, rng, ctx) -> route
+        self.repair = repair              # (route, ctx) -> route
+        self.local_search = local_search  # (route, ctx) -> route
+        self.missing_leg_penalty = missing_leg_penalty
+
+
+OPERATOR_SETS = {
+    "legacy": Operators("legacy", legacy_crossover, swap_mutation),
+    "ox": Operators("ox", order_crossover, swap_mutation, shortest_path_repair, missing_leg_penalty=1000),
+    "erx": Operators("erx", edge_recombination, detour_mutation, shortest_path_repair, missing_leg_penalty=1000),
+    "memetic": Operators("memetic", edge_recombination, detour_mutation, shortest_path_repair, improve_route,
+                         missing_leg_penalty=1000),
+}
+
+
+def get_operators(operators) -> Operators:
+    # An Operators instance or the name of one of OPERATOR_SETS
+    if isinstance(operators, Operators):
+        return operators
+    if operators not in OPERATOR_SETS:
+        raise ValueError(f"Unknown operator set: {operators} (expected one of {', '.join(OPERATOR_SETS)})")
+    return OPERATOR_SETS[operators]
@@ -1,17 +1,35 @@
 # Advanced Genetic Algorithm Route Optimizer
 # Features: vehicle capacity, time windows, road restrictions, risk/weather, advanced fitness, configurable GA
 
-import random
+import heapq
+import time
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, List, Dict, Tuple, Optional
+from compiled_graph import CompiledGraph, compile_network
+from fitness_cache import FitnessCache, route_key, shared_cache
+from anytime import Progress, iterate
+from island_model import run_islands
+from pareto import crowded_order, crowding_distance, non_dominated_sort
+from result_store import ResultStore, reproducible, result_key
+from fuzzy_risk import edge_exposure, hazard_severity
+import metrics
+
+# Longest departure window searched; speed profiles repeat every day
+MAX_DEPARTURE_WINDOW = 24.0
 
 # Example data models (replace with your actual imports)
 class OptimizationRequest:
-    def __init__(self, source_location, destination_location, waste_classification, vehicle):
+    def __init__(self, source_location, destination_location, waste_classification, vehicle, start_time=8,
+                 latest_departure=None):
         self.source_location = source_location
         self.destination_location = destination_location
         self.waste_classification = waste_classification
         self.vehicle = vehicle
+        self.start_time = start_time  # hour of departure
+        # If set, departures from start_time to latest_departure (at most
+        # MAX_DEPARTURE_WINDOW hours later) are considered and the one giving the shortest
+        # on-time trip is chosen per route
+        self.latest_departure = latest_departure
 
 class WasteType:
     FLAMMABLE = 'flammable'
@@ -24,75 +42,653 @@ class Vehicle:
         self.capacity = capacity
 
 class WasteClassification:
-    def __init__(self, waste_type, quantity):
+    def __init__(self, waste_type, quantity, location=None, hazard=None):
         self.waste_type = waste_type
         self.quantity = quantity
+        self.location = location  # pickup node for batch dispatch (None = depot)
+        self.hazard = hazard      # fuzzy_risk score in [0, 1]; scales each edge's incident risk (None = medium)
+
+class OptimizationResult:
+    def __init__(self, route, fitness, total_distance, total_cost, total_risk, penalty, generations,
+                 departure_time=None, duration=None, schedule=None):
+        self.route = route
+        self.fitness = fitness
+        self.total_distance = total_distance
+        self.total_cost = total_cost
+        self.total_risk = total_risk
+        self.penalty = penalty
+        self.generations = generations
+        self.departure_time = departure_time  # hour of departure
+        self.duration = duration              # hours from departure to service at the destination
+        self.schedule = schedule              # per-stop ETAs, see AdvancedRouteOptimizer._schedule
+
+# Per-route values produced by _evaluate_population (and stored in the fitness cache)
+SCORE_FIELDS = ("fitness", "distance", "cost", "risk", "penalty", "duration", "departure", "late")
+
+# Network with risk/weather, time windows, road restrictions.
+# Shared by every optimizer instance and compiled once; treat it as read-only.
+DEFAULT_NETWORK = {
+    "directed": False,
+    "nodes": {
+        "source": {"name": "Waste Source", "type": "source", "time_window": (0, 24)},
+        "inspection_a": {"name": "Inspection A", "type": "inspection", "time_window": (8, 18)},
+        "node_1": {"name": "Waypoint 1", "type": "waypoint", "time_window": (0, 24)},
+        "node_2": {"name": "Waypoint 2", "type": "waypoint", "time_window": (0, 24)},
+        "disposal": {"name": "Disposal Site", "type": "disposal", "time_window": (6, 20)}
+    },
+    "distances": {
+        ("source", "inspection_a"): {"distance": 10, "risk": 0.1, "weather": 0.2, "restricted": []},
+        ("inspection_a", "node_1"): {"distance": 8, "risk": 0.05, "weather": 0.1, "restricted": []},
+        ("node_1", "node_2"): {"distance": 6, "risk": 0.2, "weather": 0.3, "restricted": [WasteType.FLAMMABLE]},
+        ("node_2", "disposal"): {"distance": 8, "risk": 0.05, "weather": 0.1, "restricted": []},
+        ("inspection_a", "disposal"): {"distance": 20, "risk": 0.15, "weather": 0.4, "restricted": []},
+        ("source", "node_1"): {"distance": 15, "risk": 0.3, "weather": 0.2, "restricted": []},
+        ("source", "node_2"): {"distance": 18, "risk": 0.25, "weather": 0.5, "restricted": [WasteType.TOXIC]},
+    }
+}
 
 # Advanced Route Optimizer
 class AdvancedRouteOptimizer:
-    def __init__(self, ga_params=None):
-        # Network with risk/weather, time windows, road restrictions
-        self.network = {
-            "nodes": {
-                "source": {"name": "Waste Source", "type": "source", "time_window": (0, 24)},
-                "inspection_a": {"name": "Inspection A", "type": "inspection", "time_window": (8, 18)},
-                "node_1": {"name": "Waypoint 1", "type": "waypoint", "time_window": (0, 24)},
-                "node_2": {"name": "Waypoint 2", "type": "waypoint", "time_window": (0, 24)},
-                "disposal": {"name": "Disposal Site", "type": "disposal", "time_window": (6, 20)}
-            },
-            "distances": {
-                ("source", "inspection_a"): {"distance": 10, "risk": 0.1, "weather": 0.2, "restricted": []},
-                ("inspection_a", "node_1"): {"distance": 8, "risk": 0.05, "weather": 0.1, "restricted": []},
-                ("node_1", "node_2"): {"distance": 6, "risk": 0.2, "weather": 0.3, "restricted": [WasteType.FLAMMABLE]},
-                ("node_2", "disposal"): {"distance": 8, "risk": 0.05, "weather": 0.1, "restricted": []},
-                ("inspection_a", "disposal"): {"distance": 20, "risk": 0.15, "weather": 0.4, "restricted": []},
-                ("source", "node_1"): {"distance": 15, "risk": 0.3, "weather": 0.2, "restricted": []},
-                ("source", "node_2"): {"distance": 18, "risk": 0.25, "weather": 0.5, "restricted": [WasteType.TOXIC]},
-            }
-        }
+    def __init__(self, ga_params=None, cache: Optional[FitnessCache] = None):
+        self.network = DEFAULT_NETWORK
+        # Route-fitness memo shared with route_optimizer (ga_params use_cache=False bypasses it)
+        self.cache = cache if cache is not None else shared_cache()
         # GA parameters
+        self.ga_params = dict(ga_params) if ga_params else {}
         self.population_size = ga_params.get('population_size', 30) if ga_params else 30
         self.generations = ga_params.get('generations', 40) if ga_params else 40
         self.mutation_rate = ga_params.get('mutation_rate', 0.2) if ga_params else 0.2
         self.crossover_rate = ga_params.get('crossover_rate', 0.7) if ga_params else 0.7
         self.elitism = ga_params.get('elitism', True) if ga_params else True
+        # Upper bound on nodes per route (None = derived from the network size)
+        self.max_route_length = ga_params.get('max_route_length') if ga_params else None
+        self.use_cache = ga_params.get('use_cache', True) if ga_params else True
+        # Default seed of every run (an int, SeedSequence or numpy Generator; None = fresh entropy)
+        self.seed = ga_params.get('seed') if ga_params else None
+        # Optional key_index.KeyNodeIndex of the network; seeds the GA with the best macro-routes
+        self.key_index = None
+        # Optional result_store.ResultStore; repeated requests are answered from it
+        self.result_store: Optional[ResultStore] = None
 
-    def optimize(self, request: OptimizationRequest):
-        # Check vehicle capacity
-        if request.waste_classification.quantity > request.vehicle.capacity:
-            raise ValueError("Vehicle capacity exceeded!")
-        # ...existing code for population generation, evolution, etc...
-        # For brevity, only the fitness function is shown in detail
-        pass
+    @property
+    def graph(self) -> CompiledGraph:
+        # Compiled once per network description and shared across optimizer instances
+        return compile_network(self.network)
+
+    def optimize(self, request: OptimizationRequest, deadline_ms=None, patience=None, target_fitness=None,
+                 callback=None, seed=None) -> OptimizationResult:
+        # Runs until the generation limit, deadline_ms, `patience` generations without
+        # improvement or target_fitness; callback(progress) is called every generation
+        progress = None
+        for progress in self.optimize_iter(request, deadline_ms, patience, target_fitness, seed=seed):
+            if callback is not None:
+                callback(progress)
+        return progress.result
+
+    def optimize_iter(self, request: OptimizationRequest, deadline_ms=None, patience=None,
+                      target_fitness=None, warm_start=None, generations=None, seed=None) -> Iterator[Progress]:
+        """
+        Generator form of optimize(): yields an anytime.Progress with the best-so-far
+        OptimizationResult after the initial population and after every generation.
+        Stopping options default to the ga_params of the same name. warm_start seeds the
+        initial population with earlier routes (see GARun); generations overrides the limit.
+        seed (default ga_params seed) makes runs that stop on generations or patience
+        reproducible. With a result_store, a stored result comes back as a single Progress
+        with stop_reason "cached"; only runs with an int seed, without warm_start and not
+        stopped by the deadline are stored.
+        """
+        started = time.perf_counter()
+        params = self.ga_params
+        seed = seed if seed is not None else self.seed
+        limit = generations if generations is not None else self.generations
+        deadline_ms = deadline_ms if deadline_ms is not None else params.get('deadline_ms')
+        patience = patience if patience is not None else params.get('patience')
+        target = target_fitness if target_fitness is not None else params.get('target_fitness')
+        key = None
+        if self.result_store is not None and warm_start is None and reproducible(seed):
+            key = self._result_key(request, seed, limit, deadline_ms, patience, target)
+            stored = self.result_store.get(key)
+            if stored is not None:
+                result = OptimizationResult(**stored)
+                yield Progress(result.generations, result, result.fitness,
+                               (time.perf_counter() - started) * 1000.0, "cached")
+                return
+        with metrics.timer("ga_setup"):
+            run = GARun(self, request, warm_start)
+        for progress in iterate(run, np.random.default_rng(seed), limit, deadline_ms=deadline_ms,
+                                patience=patience, target=target, started=started):
+            if progress.done:
+                progress.result.generations = progress.generation
+                if key is not None and reproducible(seed, progress.stop_reason):
+                    self.result_store.put(key, vars(progress.result))
+            yield progress
+
+    def _result_key(self, request: OptimizationRequest, seed, generations, deadline_ms, patience, target) -> str:
+        # Everything that determines a run besides the network
+        waste = request.waste_classification
+        return result_key(
+            "advanced", self.graph,
+            request=[request.source_location, request.destination_location, str(waste.waste_type).lower(),
+                     waste.quantity, waste.hazard, request.vehicle.capacity, request.start_time,
+                     request.latest_departure],
+            ga_params={k: v for k, v in self.ga_params.items() if k != 'seed'},
+            seed=seed, generations=generations, deadline_ms=deadline_ms, patience=patience, target=target,
+            key_index=self.key_index is not None,
+        )
+
+    def optimize_islands(self, request: OptimizationRequest, n_islands=4, migration_interval=5,
+                         n_migrants=2, seed=None, max_workers=None) -> OptimizationResult:
+        # Island model: n_islands populations of population_size evolve in worker
+        # processes and exchange their best routes every migration_interval generations
+        seed = seed if seed is not None else self.seed
+        return run_islands(island_run, (self.graph, self.ga_params, request), self.generations,
+                           n_islands, migration_interval, n_migrants, seed, max_workers)
+
+    def optimize_pareto(self, request: OptimizationRequest, deadline_ms=None, generations=None,
+                        seed=None) -> List[OptimizationResult]:
+        """
+        NSGA-II mode: the Pareto front of routes over total distance, risk + weather
+        exposure and late stops, shortest first. Stops at the generation limit or once
+        deadline_ms (default ga_params deadline_ms) has passed.
+        """
+        started = time.perf_counter()
+        with metrics.timer("ga_setup"):
+            run = ParetoRun(self, request)
+        rng = np.random.default_rng(seed if seed is not None else self.seed)
+        deadline_ms = deadline_ms if deadline_ms is not None else self.ga_params.get('deadline_ms')
+        limit = generations if generations is not None else self.generations
+        population = run.initial_population(rng)
+        fitness = run.fitness(population)
+        generation = 0
+        while generation < limit:
+            if deadline_ms is not None and (time.perf_counter() - started) * 1000.0 >= deadline_ms:
+                break
+            population, fitness = run.step(population, fitness, rng)
+            generation += 1
+        return run.front(population, generation)
 
     def _calculate_fitness(self, route: List[str], request: OptimizationRequest) -> float:
-        total_distance = 0
-        total_time = 0
-        total_cost = 0
-        total_risk = 0
-        penalty = 0
-        current_time = 8  # Assume start at 8am
-        for i in range(len(route) - 1):
-            a, b = route[i], route[i+1]
-            edge = self.network["distances"].get((a, b)) or self.network["distances"].get((b, a))
-            if not edge:
-                penalty += 1000
+        # Scalar entry point; unknown node names count as missing edges
+        population = self.graph.ids(route)[None, :]
+        scores = self._score(population, request.waste_classification.waste_type, self._departures(request),
+                             self._severity(request))
+        return float(scores["fitness"][0])
+
+    def macro_fitness(self, macro_routes, request: OptimizationRequest) -> np.ndarray:
+        # Fitness of key-node macro-routes (e.g. source, inspection, disposal) from the key
+        # index: each leg is its shortest allowed path, so there are no restriction penalties;
+        # time windows are not included. Exposure is summed over the stored leg paths, as the
+        # index's risk totals do not scale incident risk by the lot's hazard.
+        g, waste_type = self.graph, request.waste_classification.waste_type
+        distance, _ = self.key_index.macro_costs(macro_routes, waste_type)
+        severity = self._severity(request)
+        risk = np.zeros(len(distance))
+        for i, macro in enumerate(macro_routes):
+            ids = g.ids(self.key_index.expand(macro, waste_type))
+            eid = g.edge_ids(ids[:-1], ids[1:])
+            risk[i] = edge_exposure(g.risk[eid], g.weather[eid], severity).sum()
+        return 1 / (0.5*distance + 0.2*distance*10 + 0.2*risk + 1)
+
+    def _macro_seeds(self, request: OptimizationRequest, n_seeds=3) -> Optional[List[List[str]]]:
+        # Node routes of the fittest macro-routes between the request's key nodes
+        index = self.key_index
+        if index is None or index.graph is not self.graph or index.stale or not index.has(
+                request.source_location, request.destination_location):
+            return None
+        waste_type = request.waste_classification.waste_type
+        macros = [m for m, _, _ in index.macro_routes(request.source_location, request.destination_location,
+                                                      waste_type)]
+        seeds = []
+        for length in sorted({len(m) for m in macros}):
+            group = [m for m in macros if len(m) == length]
+            fitness = self.macro_fitness(group, request)
+            seeds += [(fitness[i], group[i]) for i in range(len(group))]
+        seeds.sort(key=lambda s: -s[0])
+        return [index.expand(m, waste_type) for _, m in seeds[:n_seeds]] or None
+
+    def _severity(self, request: OptimizationRequest) -> float:
+        # Edge incident-risk multiplier for this lot's fuzzy hazard (see fuzzy_risk.hazard_severity)
+        return hazard_severity(request.waste_classification.hazard)
+
+    def _departures(self, request: OptimizationRequest) -> Tuple[float, ...]:
+        # Candidate departure hours, every departure_step hours (ga_params, default 1)
+        if request.latest_departure is None or request.latest_departure <= request.start_time:
+            return (float(request.start_time),)
+        if not np.isfinite(request.latest_departure):
+            raise ValueError("latest_departure must be a finite hour")
+        latest = min(request.latest_departure, request.start_time + MAX_DEPARTURE_WINDOW)
+        step = self.ga_params.get('departure_step', 1.0)
+        return tuple(np.arange(request.start_time, latest + 1e-9, step).tolist())
+
+    def _score(self, population: np.ndarray, waste_type, departures,
+               severity=1.0) -> Dict[str, np.ndarray]:
+        # _evaluate_population behind the shared fitness cache: duplicate rows are scored
+        # once, and only routes the cache has not seen are evaluated (as one batch)
+        if not self.use_cache:
+            metrics.count("fitness_evaluations", len(population))
+            with metrics.timer("fitness"):
+                return self._evaluate_population(population, waste_type, departures, severity)
+        # Key = row without its trailing destination padding, sliced from one bytes buffer
+        population = np.ascontiguousarray(population, dtype=np.int32)
+        width = population.shape[1]
+        real = population != population[:, -1:]
+        ends = np.where(real.any(axis=1), width - real[:, ::-1].argmax(axis=1), 0) + 1
+        buf = population.tobytes()
+        namespace = ("advanced", self.graph.token, self.graph.version, severity)
+        keys = [route_key(namespace, buf[4*width*i:4*(width*i + end)], waste_type, departures)
+                for i, end in enumerate(ends.tolist())]
+        slots = {}
+        inverse = np.array([slots.setdefault(key, len(slots)) for key in keys])
+        unique_keys = list(slots)
+        first = np.zeros(len(unique_keys), dtype=np.int64)
+        first[inverse[::-1]] = np.arange(len(keys))[::-1]
+        values = self.cache.get_many(unique_keys)
+        missing = [i for i, value in enumerate(values) if value is None]
+        metrics.count("fitness_cache_hits", len(keys) - len(missing))
+        if missing:
+            metrics.count("fitness_evaluations", len(missing))
+            with metrics.timer("fitness"):
+                fresh = self._evaluate_population(population[first[missing]], waste_type, departures, severity)
+            rows = np.column_stack([fresh[name] for name in SCORE_FIELDS])
+            new_items = []
+            for i, row in zip(missing, rows.tolist()):
+                values[i] = tuple(row)
+                new_items.append((unique_keys[i], values[i]))
+            self.cache.put_many(new_items)
+        table = np.array(values, dtype=float)[inverse]
+        return {name: table[:, k] for k, name in enumerate(SCORE_FIELDS)}
+
+    # --- Network helpers --------------------------------------------------
+
+    def _edge_weight(self, waste_type, severity=1.0) -> np.ndarray:
+        # Per-edge contribution to the fitness denominator
+        g = self.graph
+        weight = 0.5*g.distance + 0.2*g.distance*10 + 0.2*edge_exposure(g.risk, g.weather, severity)
+        return weight + 500 * g.blocked(waste_type)
+
+    def _guide(self, dest: int, waste_type, severity=1.0) -> Dict:
+        # Dijkstra towards the destination on fitness edge weights; guides the random walks
+        g = self.graph
+        weight = self._edge_weight(waste_type, severity)
+        rev_indptr, rev_tails, rev_edges = g.reverse()
+        dist = np.full(g.n_nodes, np.inf)
+        dist[dest] = 0.0
+        heap = [(0.0, dest)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
                 continue
-            # Road restriction
-            if request.waste_classification.waste_type in edge["restricted"]:
-                penalty += 500
-            # Distance, cost, risk, weather
-            total_distance += edge["distance"]
-            total_cost += edge["distance"] * 10
-            total_risk += edge["risk"] + edge["weather"]
-            # Time window check
-            node_b = self.network["nodes"][b]
-            current_time += edge["distance"] / 50 * 60  # Assume 50km/h
-            if not (node_b["time_window"][0] <= current_time <= node_b["time_window"][1]):
-                penalty += 200
+            for k in range(rev_indptr[u], rev_indptr[u + 1]):
+                v = rev_tails[k]
+                nd = d + weight[rev_edges[k]]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        # Typical edge weight; closed edges (infinite distance) do not count
+        open_weight = weight[np.isfinite(weight)]
+        scale = float(np.median(open_weight)) if len(open_weight) else 1.0
+        # Score of stepping to each neighbour, laid out like the neighbour table
+        neighbors, edges = g.neighbor_table()
+        step = weight[np.maximum(edges, 0)] + dist[np.maximum(neighbors, 0)]
+        step[neighbors < 0] = np.inf
+        return {"cost_to_go": dist, "scale": scale, "step": step}
+
+    def _route_width(self, source: int, dest: int) -> int:
+        if self.max_route_length:
+            return max(2, int(self.max_route_length))
+        # Enough room for detours around the shortest hop path, capped for large networks
+        g = self.graph
+        neighbors, _ = g.neighbor_table()
+        hops = np.full(g.n_nodes, -1)
+        hops[source] = 0
+        frontier = np.array([source])
+        depth = 0
+        while len(frontier) and hops[dest] < 0:
+            depth += 1
+            nxt = neighbors[frontier].ravel()
+            nxt = np.unique(nxt[nxt >= 0])
+            frontier = nxt[hops[nxt] < 0]
+            hops[frontier] = depth
+        min_hops = hops[dest] if hops[dest] > 0 else g.n_nodes
+        return int(min(g.n_nodes, max(8, 3 * min_hops + 1)))
+
+    # --- Vectorized GA ----------------------------------------------------
+
+    def _walk(self, population, start_pos, dest, guide, temperature, rng):
+        # Extend every row from column start_pos with a guided random walk (in place).
+        # Each step picks the neighbour minimising edge weight + cost-to-go + Gumbel noise,
+        # so temperature 0 follows the shortest path and higher values explore. A walk
+        # stops where no open edge leads on towards the destination.
+        neighbors, _ = self.graph.neighbor_table()
+        step, scale = guide["step"], guide["scale"]
+        width = population.shape[1]
+        # Only rows still travelling are stepped; the rest already hold destination padding
+        live = np.arange(len(population))
+        cur = population[live, start_pos]
+        keep = cur != dest
+        live, cur, pos = live[keep], cur[keep], start_pos[keep] + 1
+        while len(live):
+            cand = neighbors[cur]
+            noise = rng.gumbel(size=cand.shape) * (temperature[live] * scale)[:, None]
+            options = step[cur]
+            choice = np.argmin(options - noise, axis=1)
+            moving = np.isfinite(options[np.arange(len(live)), choice])
+            cur = np.where(moving, cand[np.arange(len(live)), choice], cur)
+            population[live, pos] = cur
+            keep = moving & (cur != dest) & (pos + 1 < width - 1)
+            live, cur, pos = live[keep], cur[keep], pos[keep] + 1
+        population[:, -1] = dest
+
+    def _evaluate_population(self, population: np.ndarray, waste_type, departures=(8,),
+                             severity=1.0) -> Dict[str, np.ndarray]:
+        # Whole-population fitness: distance, cost, risk/weather exposure (edge incident
+        # risk scaled by the lot's hazard severity) and penalties.
+        # Consecutive repeats (destination padding) are free moves.
+        g = self.graph
+        a, b = population[:, :-1], population[:, 1:]
+        moved = a != b
+        eid = g.edge_ids(a, b)
+        edge = moved & (eid >= 0)
+        eid = np.where(edge, eid, 0)
+        penalty = 1000.0 * (moved & ~edge).sum(axis=1)
+        # Road restriction
+        penalty += 500.0 * (edge & g.blocked(waste_type)[eid]).sum(axis=1)
+        leg = np.where(edge, g.distance[eid], 0.0)
+        total_distance = leg.sum(axis=1)
+        total_cost = total_distance * 10
+        total_risk = np.where(edge, edge_exposure(g.risk[eid], g.weather[eid], severity), 0.0).sum(axis=1)
+        # Time windows: simulate every candidate departure (rows) for every route (columns)
+        # and keep, per route, the departure with the fewest late arrivals, then the
+        # shortest duration
+        depart = np.asarray(departures, dtype=float)[:, None] * np.ones(len(population))
+        _, leave, late = self._propagate(eid, edge, b, depart)
+        n_late = late.sum(axis=2)
+        duration = leave[:, :, -1] - depart if leave.shape[2] else np.zeros_like(depart)
+        # (rounded so float noise does not break ties in favour of a later departure)
+        choice = np.lexsort((duration.round(9), n_late), axis=0)[0] if len(departures) > 1 else np.zeros(len(population), dtype=np.int64)
+        cols = np.arange(len(population))
+        penalty += 200.0 * n_late[choice, cols]
         # Combine metrics (weights can be tuned)
         fitness = 1 / (0.5*total_distance + 0.2*total_cost + 0.2*total_risk + penalty + 1)
-        return fitness
+        return {
+            "fitness": fitness,
+            "distance": total_distance,
+            "cost": total_cost,
+            "risk": total_risk,
+            "penalty": penalty,
+            "duration": duration[choice, cols],
+            "departure": depart[choice, cols],
+            "late": n_late[choice, cols].astype(float),
+        }
+
+    def _propagate(self, eid, edge, heads, depart):
+        # Clock (hours) along each route leg by leg: travel at the edge's speed for the
+        # hour of departure, wait at a node that is not open yet, late if past closing.
+        # eid/edge/heads are (routes x legs); depart broadcasts against routes, e.g.
+        # (departures x routes). Returns arrival, leave and late arrays (depart shape x legs).
+        g = self.graph
+        t = np.array(depart, dtype=float)
+        opens = np.where(edge, g.tw_open[heads], -np.inf)
+        closes = np.where(edge, g.tw_close[heads], np.inf)
+        travel = None
+        if g.constant_speed:
+            travel = np.where(edge, g.distance[eid] / g.speed_profiles[g.speed_class[eid], 0], 0.0)
+            # Without any waiting the clock is a plain cumulative sum
+            arrive = t[..., None] + np.cumsum(travel, axis=1)
+            if not (arrive < opens).any():
+                return arrive, arrive, arrive > closes
+        arrive = np.empty(t.shape + (eid.shape[1],))
+        leave = np.empty_like(arrive)
+        for k in range(eid.shape[1]):
+            moved = edge[:, k]
+            if not moved.any():
+                arrive[..., k] = leave[..., k] = t
+                continue
+            leg = travel[:, k] if travel is not None else np.where(moved, g.travel_hours(eid[:, k], t), 0.0)
+            arrive[..., k] = t + leg
+            t = np.maximum(arrive[..., k], opens[:, k])
+            leave[..., k] = t
+        return arrive, leave, arrive > closes
+
+    def _schedule(self, row: np.ndarray, departure: float) -> List[Dict]:
+        # Per-stop ETA for one route: arrival, wait for the time window and departure (hours)
+        g = self.graph
+        stops = row[np.concatenate([[True], row[1:] != row[:-1]])]
+        eid = g.edge_ids(stops[:-1], stops[1:])[None, :]
+        edge = eid >= 0
+        arrive, leave, late = self._propagate(np.where(edge, eid, 0), edge, stops[None, 1:], np.array([departure]))
+        schedule = [{"node": g.names[stops[0]], "arrival": float(departure), "wait": 0.0,
+                     "departure": float(departure), "late": False}]
+        for k, node in enumerate(stops[1:].tolist()):
+            schedule.append({"node": g.names[node], "arrival": float(arrive[0, k]),
+                             "wait": float(leave[0, k] - arrive[0, k]), "departure": float(leave[0, k]),
+                             "late": bool(late[0, k])})
+        return schedule
+
+    def _next_generation(self, population, fitness, n_elite, dest, guide, rng):
+        pop_size, width = population.shape
+        n_children = pop_size - n_elite
+        elite = population[np.argsort(-fitness)[:n_elite]]
+
+        # Binary tournament selection
+        def tournament():
+            a, b = rng.integers(0, pop_size, (2, n_children))
+            return np.where(fitness[a] >= fitness[b], a, b)
+        p1, p2 = population[tournament()], population[tournament()]
+
+        # Crossover at a shared intermediate node: p1 up to the node, p2 from it onwards.
+        # Parents that are valid paths give valid children. A few random cut points of p1
+        # are tried per pair; the first one that also occurs in p2 is used.
+        rows = np.arange(n_children)
+        reached = p1 == dest
+        end = np.where(reached.any(axis=1), reached.argmax(axis=1), width - 1)
+        tries = 1 + (rng.random((n_children, 4)) * np.maximum(end - 1, 1)[:, None]).astype(np.int64)
+        cut = p1[rows[:, None], tries]
+        match = (cut[:, :, None] == p2[:, None, 1:-1]) & (cut != dest)[:, :, None]
+        found = match.any(axis=2)
+        attempt = found.argmax(axis=1)
+        crossed = found.any(axis=1) & (rng.random(n_children) < self.crossover_rate)
+        i = tries[rows, attempt]
+        j = match[rows, attempt].argmax(axis=1) + 1
+        k = np.arange(width)
+        src = np.minimum(k[None, :] - i[:, None] + j[:, None], width - 1)
+        from_p2 = np.take_along_axis(p2, np.clip(src, 0, width - 1), axis=1)
+        children = np.where(crossed[:, None] & (k[None, :] >= i[:, None]), from_p2, p1)
+        children[:, -1] = dest
+
+        # Mutation: re-route the tail after a random position before the destination
+        mutate = np.flatnonzero(rng.random(n_children) < self.mutation_rate)
+        if len(mutate):
+            sub = children[mutate]
+            reached = sub == dest
+            end = np.where(reached.any(axis=1), reached.argmax(axis=1), width - 1)
+            start = (rng.random(len(mutate)) * np.maximum(end, 1)).astype(np.int64)
+            sub[np.arange(width)[None, :] > start[:, None]] = dest
+            self._walk(sub, start, dest, guide, rng.uniform(0.5, 2.0, len(mutate)), rng)
+            children[mutate] = sub
+
+        return np.concatenate([elite, children])
+
+    def _decode(self, row: np.ndarray) -> List[str]:
+        names = self.graph.names
+        route = [names[row[0]]]
+        for node in row[1:]:
+            if names[node] != route[-1]:
+                route.append(names[node])
+        return route
+
+class GARun:
+    # One request prepared for the vectorized GA (start/end nodes, walk guide, route width).
+    # optimize() evolves a single population; island workers each hold their own GARun.
+
+    def __init__(self, optimizer: AdvancedRouteOptimizer, request: OptimizationRequest, warm_start=None):
+        # Check vehicle capacity
+        if request.waste_classification.quantity > request.vehicle.capacity:
+            raise ValueError("Vehicle capacity exceeded!")
+        g = optimizer.graph
+        if request.source_location not in g.index or request.destination_location not in g.index:
+            raise ValueError("Unknown source or destination location!")
+        self.optimizer = optimizer
+        self.source = g.index[request.source_location]
+        self.dest = g.index[request.destination_location]
+        self.waste_type = request.waste_classification.waste_type
+        self.departures = optimizer._departures(request)
+        self.severity = optimizer._severity(request)
+        self.pop_size = max(2, optimizer.population_size)
+        self.width = optimizer._route_width(self.source, self.dest)
+        self.guide = optimizer._guide(self.dest, self.waste_type, self.severity)
+        if not np.isfinite(self.guide["cost_to_go"][self.source]):
+            raise ValueError("No open route from source to destination!")
+        self.n_elite = max(1, self.pop_size // 20) if optimizer.elitism else 0
+        if warm_start is None:
+            warm_start = optimizer._macro_seeds(request)
+        # Earlier routes to re-seed from: a population array or node-name routes
+        self.warm_start = self._seed_rows(warm_start) if warm_start is not None else None
+
+    def _seed_rows(self, routes) -> np.ndarray:
+        # Warm-start routes (node-ID rows or node-name lists) as destination-padded rows;
+        # routes that do not run from source to destination are dropped, and the route
+        # width grows to fit the longest one
+        graph = self.optimizer.graph
+        rows = [row if isinstance(row, np.ndarray) else graph.ids(row) for row in routes]
+        rows = [row for row in rows if len(row) and row[0] == self.source and row[-1] == self.dest]
+        if not rows:
+            return None
+        self.width = max(self.width, max(len(row) for row in rows))
+        seeds = np.full((len(rows), self.width), self.dest, dtype=np.int32)
+        for i, row in enumerate(rows):
+            seeds[i, :len(row)] = row
+        return np.unique(seeds, axis=0)
+
+    def initial_population(self, rng) -> np.ndarray:
+        # Guided random walks from source towards the destination.
+        # A population is an int array (pop_size x width); once a route reaches the
+        # destination it is padded with the destination node, which costs nothing.
+        population = np.full((self.pop_size, self.width), self.dest, dtype=np.int32)
+        population[:, 0] = self.source
+        temperature = rng.uniform(0.0, 2.0, self.pop_size)
+        temperature[0] = 0.0  # keep one greedy walk in the initial population
+        self.optimizer._walk(population, np.zeros(self.pop_size, dtype=np.int64), self.dest,
+                             self.guide, temperature, rng)
+        if self.warm_start is not None:
+            # The best earlier routes (re-scored on the current graph) fill up to half of
+            # the population; the fresh walks keep exploring around what has changed
+            seeds = self.ranked(self.warm_start)[:self.pop_size // 2]
+            population[1:len(seeds) + 1] = seeds
+        return population
+
+    def scores(self, population) -> Dict[str, np.ndarray]:
+        return self.optimizer._score(population, self.waste_type, self.departures, self.severity)
+
+    def fitness(self, population) -> np.ndarray:
+        return self.scores(population)["fitness"]
+
+    def step(self, population, fitness, rng):
+        # One generation: (population, fitness) -> (next population, its fitness)
+        with metrics.timer("ga_operators"):
+            population = self.optimizer._next_generation(population, fitness, self.n_elite, self.dest, self.guide,
+                                                         rng)
+        return population, self.fitness(population)
+
+    def evolve(self, population, generations, rng) -> np.ndarray:
+        fitness = self.fitness(population)
+        for _ in range(generations):
+            population, fitness = self.step(population, fitness, rng)
+        return population
+
+    def ranked(self, population) -> np.ndarray:
+        return population[np.argsort(-self.fitness(population), kind="stable")]
+
+    def merge(self, population, migrants) -> np.ndarray:
+        # Migrants replace the worst routes
+        return np.concatenate([self.ranked(population)[:len(population) - len(migrants)], migrants])
+
+    def best_fitness(self, population) -> float:
+        return float(self.fitness(population).max())
+
+    def best(self, population, fitness, generations) -> OptimizationResult:
+        # Result for the fittest row
+        return self.row_result(population[int(np.argmax(fitness))], generations)
+
+    def row_result(self, row, generations) -> OptimizationResult:
+        # Only this row is re-scored for the detail columns
+        scores = self.scores(row[None, :])
+        return OptimizationResult(
+            route=self.optimizer._decode(row),
+            fitness=float(scores["fitness"][0]),
+            total_distance=float(scores["distance"][0]),
+            total_cost=float(scores["cost"][0]),
+            total_risk=float(scores["risk"][0]),
+            penalty=float(scores["penalty"][0]),
+            generations=generations,
+            departure_time=float(scores["departure"][0]),
+            duration=float(scores["duration"][0]),
+            schedule=self.optimizer._schedule(row, float(scores["departure"][0])),
+        )
+
+    def result(self, population, generations) -> OptimizationResult:
+        return self.best(population, self.fitness(population), generations)
+
+
+def _order_fitness(order) -> np.ndarray:
+    # Higher is better: minus each row's position in a best-first order
+    fitness = np.empty(len(order))
+    fitness[order] = -np.arange(len(order), dtype=float)
+    return fitness
+
+
+class ParetoRun(GARun):
+    # NSGA-II over (distance, risk + weather exposure, late stops), all minimized. Missing
+    # edges, closed roads and restrictions are constraint violations rather than objectives.
+    # The scalar "fitness" is the crowded-comparison order, so the tournament selection,
+    # crossover and mutation of the single-objective GA are reused unchanged.
+
+    def objectives(self, population):
+        scores = self.scores(population)
+        objectives = np.column_stack([scores["distance"], scores["risk"], scores["late"]])
+        violation = scores["penalty"] - 200.0 * scores["late"]
+        finite = np.isfinite(objectives).all(axis=1)
+        violation = np.where(finite, violation, violation + 1000.0)
+        objectives[~finite] = np.finfo(float).max
+        return objectives, violation
+
+    def rank(self, population):
+        objectives, violation = self.objectives(population)
+        with metrics.timer("pareto_sort"):
+            rank = non_dominated_sort(objectives, violation)
+            return rank, crowding_distance(objectives, rank), violation
+
+    def fitness(self, population) -> np.ndarray:
+        rank, crowding, _ = self.rank(population)
+        return _order_fitness(crowded_order(rank, crowding))
+
+    def step(self, population, fitness, rng):
+        # Offspring of the same size, then the best pop_size of parents + offspring;
+        # duplicate routes are only kept when there are too few distinct ones
+        with metrics.timer("ga_operators"):
+            children = self.optimizer._next_generation(population, fitness, 0, self.dest, self.guide, rng)
+        merged = np.concatenate([population, children])
+        rank, crowding, _ = self.rank(merged)
+        duplicate = np.ones(len(merged), dtype=bool)
+        duplicate[np.unique(merged, axis=0, return_index=True)[1]] = False
+        survivors = merged[np.lexsort((-crowding, rank, duplicate))[:len(population)]]
+        # Survivors are already in crowded-comparison order
+        return survivors, _order_fitness(np.arange(len(survivors)))
+
+    def front(self, population, generations) -> List[OptimizationResult]:
+        # Distinct feasible non-dominated routes, shortest first
+        population = np.unique(population, axis=0)
+        rank, _, violation = self.rank(population)
+        rows = population[(rank == 0) & (violation == 0)]
+        results = [self.row_result(row, generations) for row in rows]
+        return sorted(results, key=lambda r: (r.total_distance, r.total_risk))
+
+
+def island_run(network, ga_params, request) -> GARun:
+    # Island worker factory; runs once per worker process with the shipped network
+    optimizer = AdvancedRouteOptimizer(ga_params)
+    optimizer.network = network
+    return GARun(optimizer, request)
 
 # Example usage (pseudo):
 # optimizer = AdvancedRouteOptimizer()
@@ -0,0 +1,312 @@
+# On-disk network format, converters and a synthetic regional network generator
+# A network is stored as a directory with one .npy file per CompiledGraph array plus
+# meta.json (node names, labels, types, directedness). load_graph memory-maps the arrays
+# copy-on-write, so worker processes that load the same directory share one copy of the
+# pages and an in-place edge update stays private to the process that made it.
+#
+#   python app/graph_store.py generate region/ --nodes 50000
+#   python app/graph_store.py convert roads.csv region/ --nodes-csv sites.csv
+#   python app/graph_store.py convert roads.graphml region/
+#   python app/graph_store.py info region/
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from compiled_graph import HOURS, CompiledGraph, restriction_bit
+
+FORMAT_VERSION = 1
+
+# Arrays written per graph and the dtype CompiledGraph keeps them in (so loading is a
+# memory map, not a conversion)
+ARRAYS = {
+    "indptr": np.int64,
+    "indices": np.int32,
+    "distance": np.float64,
+    "risk": np.float64,
+    "weather": np.float64,
+    "restricted": np.uint8,
+    "tw_open": np.float64,
+    "tw_close": np.float64,
+    "speed_profiles": np.float32,
+    "speed_class": np.uint16,
+}
+
+
+def save_graph(graph: CompiledGraph, directory) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for name, dtype in ARRAYS.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(graph, name), dtype=dtype))
+    meta = {
+        "format": FORMAT_VERSION,
+        "directed": bool(graph.directed),
+        "names": list(graph.names),
+        "labels": list(graph.labels),
+        "node_types": [str(t) for t in graph.node_types],
+    }
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def load_graph(directory, mmap=True) -> CompiledGraph:
+    # Arrays are memory-mapped copy-on-write unless mmap=False
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported graph format: {meta.get('format')}")
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="c" if mmap else None)
+              for name in ARRAYS}
+    graph = CompiledGraph(names=meta["names"], labels=meta["labels"], node_types=meta["node_types"],
+                          directed=meta["directed"], **arrays)
+    graph.path = os.path.abspath(directory)
+    return graph
+
+
+def graph_from_edges(names, tails, heads, distance, risk=None, weather=None, restricted=None, speed=None,
+                     labels=None, node_types=None, tw_open=None, tw_close=None, directed=False) -> CompiledGraph:
+    """
+    Vectorized CompiledGraph construction from edge arrays (node IDs into names).
+    restricted is a per-edge restriction bitmask and speed a per-edge km/h value.
+    Undirected graphs get both directions; for duplicate (tail, head) pairs the first wins.
+    """
+    n = len(names)
+    tails = np.asarray(tails, dtype=np.int64)
+    heads = np.asarray(heads, dtype=np.int64)
+    m = len(tails)
+    columns = {
+        "distance": np.asarray(distance, dtype=float),
+        "risk": np.zeros(m) if risk is None else np.asarray(risk, dtype=float),
+        "weather": np.zeros(m) if weather is None else np.asarray(weather, dtype=float),
+        "restricted": np.zeros(m, dtype=np.uint8) if restricted is None else np.asarray(restricted, dtype=np.uint8),
+        "speed": np.full(m, 50.0) if speed is None else np.asarray(speed, dtype=float),
+    }
+    if not directed:
+        tails, heads = np.concatenate([tails, heads]), np.concatenate([heads, tails])
+        columns = {k: np.concatenate([v, v]) for k, v in columns.items()}
+    # CSR order (sorted by tail, then head); np.unique keeps the first duplicate
+    keys, first = np.unique(tails * n + heads, return_index=True)
+    columns = {k: v[first] for k, v in columns.items()}
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+    speeds, speed_class = np.unique(columns["speed"], return_inverse=True)
+    return CompiledGraph(
+        names=names,
+        labels=labels,
+        node_types=node_types if node_types is not None else ["waypoint"] * n,
+        tw_open=np.zeros(n) if tw_open is None else tw_open,
+        tw_close=np.full(n, 24.0) if tw_close is None else tw_close,
+        indptr=indptr,
+        indices=keys % n,
+        distance=columns["distance"],
+        risk=columns["risk"],
+        weather=columns["weather"],
+        restricted=columns["restricted"],
+        directed=directed,
+        speed_profiles=np.repeat(speeds[:, None], HOURS, axis=1),
+        speed_class=speed_class,
+    )
+
+
+def _restriction_masks(values) -> np.ndarray:
+    # "flammable;toxic" style lists (any of ; , | separated) -> bitmasks, per distinct value
+    codes, labels = pd.factorize(pd.Series(values).fillna("").astype(str))
+    masks = []
+    for label in labels:
+        mask = 0
+        for waste_type in label.replace(",", ";").replace("|", ";").split(";"):
+            if waste_type.strip():
+                mask |= restriction_bit(waste_type.strip())
+        masks.append(mask)
+    return np.array(masks + [0], dtype=np.uint8)[codes]
+
+
+def graph_from_frames(edges: pd.DataFrame, nodes: Optional[pd.DataFrame] = None, directed=False) -> CompiledGraph:
+    """
+    Edges need source, target and distance columns; risk, weather, restricted (waste
+    types) and speed (km/h) are optional. Nodes may give id, name, type, open and close;
+    edge endpoints without a node row become waypoints open all day.
+    """
+    ids = [] if nodes is None else nodes["id"].astype(str).tolist()
+    endpoints = pd.unique(pd.concat([edges["source"], edges["target"]]).astype(str))
+    ids += pd.Index(endpoints).difference(pd.Index(ids), sort=False).tolist()
+    index = pd.Index(ids)
+    n = len(ids)
+    node_info = pd.DataFrame(index=index)
+    if nodes is not None:
+        node_info = nodes.assign(id=nodes["id"].astype(str)).set_index("id").reindex(index)
+    def node_column(name, default):
+        if name not in node_info:
+            return np.full(n, default, dtype=object)
+        return node_info[name].where(node_info[name].notna(), default).to_numpy()
+    def edge_column(name):
+        return edges[name].to_numpy(dtype=float) if name in edges else None
+    return graph_from_edges(
+        names=ids,
+        tails=index.get_indexer(edges["source"].astype(str)),
+        heads=index.get_indexer(edges["target"].astype(str)),
+        distance=edges["distance"].to_numpy(dtype=float),
+        risk=edge_column("risk"),
+        weather=edge_column("weather"),
+        restricted=_restriction_masks(edges["restricted"]) if "restricted" in edges else None,
+        speed=edge_column("speed"),
+        labels=[str(v) for v in node_info["name"].fillna(pd.Series(ids, index=index))] if "name" in node_info else None,
+        node_types=[str(v) for v in node_column("type", "waypoint")],
+        tw_open=node_column("open", 0.0).astype(float),
+        tw_close=node_column("close", 24.0).astype(float),
+        directed=directed,
+    )
+
+
+def graph_from_csv(edges_path, nodes_path=None, directed=False) -> CompiledGraph:
+    nodes = pd.read_csv(nodes_path) if nodes_path else None
+    return graph_from_frames(pd.read_csv(edges_path), nodes, directed)
+
+
+def graph_from_graphml(path) -> CompiledGraph:
+    # Node attributes name/type/open/close and edge attributes distance (or length or
+    # weight)/risk/weather/restricted/speed, read with networkx
+    import networkx as nx
+    g = nx.read_graphml(path)
+    nodes = pd.DataFrame([{"id": str(n), **attrs} for n, attrs in g.nodes(data=True)])
+    edges = pd.DataFrame([{"source": str(a), "target": str(b), **attrs} for a, b, attrs in g.edges(data=True)])
+    if "distance" not in edges:
+        edges["distance"] = edges["length"] if "length" in edges else edges.get("weight", 1.0)
+    return graph_from_frames(edges, nodes, directed=g.is_directed())
+
+
+def _nearest(xy, k) -> np.ndarray:
+    # k nearest neighbours of every point on a uniform grid: the points of each cell are
+    # compared with those of the surrounding ring of cells, widened until it holds more
+    # than k points (exact unless the k-th neighbour lies beyond the ring)
+    n = len(xy)
+    lo = xy.min(axis=0)
+    span = max(float((xy.max(axis=0) - lo).max()), 1e-9)
+    side = max(1, int(np.sqrt(n / 4)))
+    cell = np.minimum(((xy - lo) / span * side).astype(np.int64), side - 1)
+    key = cell[:, 0] * side + cell[:, 1]
+    order = np.argsort(key, kind="stable")
+    starts = np.searchsorted(key[order], np.arange(side * side + 1))
+    nearest = np.empty((n, k), dtype=np.int64)
+    for c in np.unique(key).tolist():
+        members = order[starts[c]:starts[c + 1]]
+        cx, cy = divmod(c, side)
+        ring = 1
+        while True:
+            y0, y1 = max(0, cy - ring), min(side - 1, cy + ring)
+            # Cells (x, y0..y1) are contiguous in the sorted order
+            candidates = np.concatenate([order[starts[x * side + y0]:starts[x * side + y1 + 1]]
+                                         for x in range(max(0, cx - ring), min(side, cx + ring + 1))])
+            if len(candidates) > k or ring >= side:
+                break
+            ring += 1
+        squared = ((xy[members][:, None, :] - xy[candidates][None, :, :]) ** 2).sum(axis=2)
+        squared[members[:, None] == candidates[None, :]] = np.inf
+        nearest[members] = candidates[np.argpartition(squared, k - 1, axis=1)[:, :k]]
+    return nearest
+
+
+def regional_network(n_nodes, n_towns=None, n_sources=None, n_disposals=None, k=4, seed=0,
+                     extent_km=150.0) -> CompiledGraph:
+    """
+    Synthetic regional road network. Most nodes cluster around towns; roads join each
+    node to its k nearest neighbours with a detour factor. Risk is higher near towns,
+    weather varies smoothly across the region, flammable loads are kept out of town
+    centres and toxic loads out of water-protection zones, and urban roads are slower
+    with rush-hour dips. Waste sources sit in towns, disposal sites on the periphery with
+    an inspection station on their approach; both have opening hours.
+    """
+    rng = np.random.default_rng(seed)
+    n_towns = n_towns or max(2, n_nodes // 2000)
+    n_sources = n_sources or max(1, n_nodes // 500)
+    n_disposals = n_disposals or max(1, n_nodes // 5000)
+    towns = rng.uniform(0.1 * extent_km, 0.9 * extent_km, (n_towns, 2))
+    urban = rng.random(n_nodes) < 0.6
+    xy = rng.uniform(0, extent_km, (n_nodes, 2))
+    xy[urban] = towns[rng.integers(n_towns, size=urban.sum())] + rng.normal(0, extent_km / 30, (urban.sum(), 2))
+    to_town = np.min(np.linalg.norm(xy[:, None, :] - towns[None, :, :], axis=2), axis=1)
+
+    k = min(k, n_nodes - 1)
+    tails = np.repeat(np.arange(n_nodes), k)
+    heads = _nearest(xy, k).ravel()
+    m = len(tails)
+    mid = (xy[tails] + xy[heads]) / 2
+    mid_to_town = (to_town[tails] + to_town[heads]) / 2
+    distance = np.linalg.norm(xy[tails] - xy[heads], axis=1) * rng.uniform(1.1, 1.4, m)
+    risk = np.exp(-mid_to_town / 10.0) * rng.uniform(0.5, 1.0, m)
+    weather = 0.5 + 0.4 * np.sin(mid[:, 0] / extent_km * 2 * np.pi) * np.cos(mid[:, 1] / extent_km * np.pi)
+    weather = np.clip(weather + rng.normal(0, 0.05, m), 0.0, 1.0)
+    zones = rng.uniform(0, extent_km, (max(1, n_towns // 2), 2))
+    in_zone = np.min(np.linalg.norm(mid[:, None, :] - zones[None, :, :], axis=2), axis=1) < extent_km / 25
+    restricted = ((mid_to_town < 3.0) & (rng.random(m) < 0.3)) * restriction_bit("flammable")
+    restricted = restricted | in_zone * restriction_bit("toxic")
+    restricted = restricted | (rng.random(m) < 0.01) * restriction_bit("corrosive")
+    # Urban roads 30 km/h, rural 80 km/h; rush-hour profiles are attached below
+    city = mid_to_town < 5.0
+    speed = np.where(city, 30.0, 80.0)
+
+    node_types = np.full(n_nodes, "waypoint", dtype=object)
+    tw_open, tw_close = np.zeros(n_nodes), np.full(n_nodes, 24.0)
+    sources = rng.choice(np.flatnonzero(urban), min(n_sources, int(urban.sum())), replace=False)
+    node_types[sources] = "source"
+    disposals = np.argsort(-to_town)[:n_disposals]
+    node_types[disposals] = "disposal"
+    tw_open[disposals], tw_close[disposals] = 6.0, 20.0
+    for d in disposals.tolist():
+        # Inspection on the approach: a waypoint 5-20 km from the site, towards the towns
+        gap = np.linalg.norm(xy - xy[d], axis=1)
+        candidates = np.flatnonzero((gap > 5) & (gap < 20) & (node_types == "waypoint") & (to_town < to_town[d]))
+        if len(candidates):
+            i = int(candidates[np.argmin(to_town[candidates])])
+            node_types[i] = "inspection"
+            tw_open[i], tw_close[i] = 8.0, 18.0
+    counters = {}
+    labels = []
+    for t in node_types.tolist():
+        counters[t] = counters.get(t, 0) + 1
+        labels.append(f"{t.capitalize()} {counters[t]}")
+
+    graph = graph_from_edges([f"n{i}" for i in range(n_nodes)], tails, heads, distance, risk, weather, restricted,
+                             speed, labels, node_types.tolist(), tw_open, tw_close)
+    # Rush hours: urban roads drop to half speed 7-9 and 16-18
+    rush = np.ones(HOURS)
+    rush[[7, 8, 16, 17]] = 0.5
+    urban_rows = graph.speed_profiles[:, 0] < 50.0
+    graph.speed_profiles[urban_rows] *= rush.astype(np.float32)
+    return graph
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="write a synthetic regional network")
+    gen.add_argument("output")
+    gen.add_argument("--nodes", type=int, default=10000)
+    gen.add_argument("--seed", type=int, default=0)
+    conv = sub.add_parser("convert", help="convert an edge CSV or a GraphML file")
+    conv.add_argument("input")
+    conv.add_argument("output")
+    conv.add_argument("--nodes-csv")
+    conv.add_argument("--directed", action="store_true")
+    info = sub.add_parser("info", help="summarize a stored network")
+    info.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        save_graph(regional_network(args.nodes, seed=args.seed), args.output)
+    elif args.command == "convert":
+        if args.input.lower().endswith(".graphml"):
+            graph = graph_from_graphml(args.input)
+        else:
+            graph = graph_from_csv(args.input, args.nodes_csv, args.directed)
+        save_graph(graph, args.output)
+    if args.command == "info":
+        graph = load_graph(args.directory)
+        types = pd.Series(graph.node_types).value_counts().to_dict()
+        print(f"{graph.n_nodes} nodes, {graph.n_edges} edges, directed={graph.directed}, types={types}")
+    else:
+        print(f"wrote {args.output}")
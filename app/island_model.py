@@ -0,0 +1,70 @@
+# Island-model GA driver
+# Several sub-populations ("islands") evolve independently in worker processes and
+# every migration_interval generations each island receives the best routes of its
+# neighbour on a ring. Each worker builds its run once from (factory, args) in the
+# pool initializer, so the compiled network is shipped once per worker instead of
+# being pickled with every task; tasks only carry a population and an RNG.
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-worker run object, created by _init_worker
+_RUN = None
+
+
+def _init_worker(factory, args):
+    global _RUN
+    _RUN = factory(*args)
+
+
+def _epoch(population, rng, generations):
+    return _RUN.evolve(population, generations, rng), rng
+
+
+def _epoch_lengths(generations, migration_interval):
+    interval = max(1, migration_interval)
+    lengths = [interval] * (generations // interval)
+    if generations % interval:
+        lengths.append(generations % interval)
+    return lengths
+
+
+def run_islands(factory, args, generations, n_islands=4, migration_interval=5,
+                n_migrants=2, seed=None, max_workers=None):
+    """
+    Runs factory(*args) -> run object on n_islands islands for `generations` generations.
+    The run object provides initial_population(rng), evolve(population, generations, rng),
+    ranked(population) (best first), merge(population, migrants), best_fitness(population)
+    (higher is better) and result(population, generations).
+    Island i always draws from the i-th child of SeedSequence(seed), so a fixed seed gives
+    the same result whatever the number of workers. max_workers=0 runs the islands serially
+    in this process.
+    """
+    n_islands = max(1, n_islands)
+    if isinstance(seed, np.random.Generator):
+        seed = int(seed.integers(2**63))  # a caller's Generator seeds the SeedSequence
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n_islands)]
+    run = factory(*args)
+    populations = [run.initial_population(rng) for rng in rngs]
+    n_migrants = min(n_migrants, len(populations[0]) - 1) if n_islands > 1 else 0
+
+    pool = None
+    if max_workers != 0 and n_islands > 1:
+        pool = ProcessPoolExecutor(max_workers=min(max_workers or n_islands, n_islands),
+                                   initializer=_init_worker, initargs=(factory, args))
+    try:
+        for length in _epoch_lengths(generations, migration_interval):
+            if pool is None:
+                populations = [run.evolve(p, length, rng) for p, rng in zip(populations, rngs)]
+            else:
+                futures = [pool.submit(_epoch, p, rng, length) for p, rng in zip(populations, rngs)]
+                populations, rngs = map(list, zip(*(f.result() for f in futures)))
+            if n_migrants > 0:
+                # Ring migration: island i receives the elites of island i - 1
+                elites = [run.ranked(p)[:n_migrants] for p in populations]
+                populations = [run.merge(p, elites[i - 1]) for i, p in enumerate(populations)]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return run.result(max(populations, key=run.best_fitness), generations)
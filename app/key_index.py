@@ -0,0 +1,276 @@
+# Precomputed distance / risk index between the key nodes of a network
+# Key nodes are the sources, inspection stations and disposal sites. For every waste
+# type the index holds the shortest allowed distance from each origin (source or
+# inspection) to each destination (inspection or disposal) and the risk + weather
+# exposure along that path, so a macro-route such as source -> inspection -> disposal
+# costs two array lookups instead of a graph search. The node sequence of every such
+# path is stored too, so expanding a macro-route into nodes is a slice per leg. Waste
+# types whose restrictions block the same edges share one set of searches.
+#
+# Indexes are saved as key_index_<fingerprint>.npz; the fingerprint hashes the graph
+# arrays, so a changed network (or an in-place edge update) never matches a stale file.
+#
+#   index = key_index(graph, directory="region/")
+#   index.segment("Source", "Inspection C", "toxic")  -> (distance, risk)
+#   index.macro_routes("Source", "Disposal C", "toxic")
+
+import hashlib
+import heapq
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from compiled_graph import RESTRICTION_BITS, CompiledGraph, compile_network
+from path_solver import shortest_constrained_path
+
+ORIGIN_TYPES = ("source", "inspection")
+DESTINATION_TYPES = ("inspection", "disposal")
+
+
+def fingerprint(graph: CompiledGraph) -> str:
+    # Hash of the structure, edge attributes and node types
+    digest = hashlib.sha1()
+    for array in (graph.indptr, graph.indices, graph.distance, graph.risk, graph.weather, graph.restricted):
+        digest.update(memoryview(np.ascontiguousarray(array)).cast("B"))
+    digest.update("\0".join(map(str, graph.node_types)).encode())
+    return digest.hexdigest()
+
+
+def _sweep(indptr, heads, weight, extra, origin, targets):
+    # List-based Dijkstra from origin until every target is settled: (distance, extra
+    # summed along the shortest path, predecessor) per node. weight is inf on
+    # disallowed edges.
+    n = len(indptr) - 1
+    dist = [float("inf")] * n
+    acc = [0.0] * n
+    pred = [-1] * n
+    dist[origin] = 0.0
+    remaining = set(targets)
+    remaining.discard(origin)
+    heap = [(0.0, origin)]
+    pop, push = heapq.heappop, heapq.heappush
+    while heap and remaining:
+        d, u = pop(heap)
+        if d > dist[u]:
+            continue
+        remaining.discard(u)
+        a = acc[u]
+        for k in range(indptr[u], indptr[u + 1]):
+            nd = d + weight[k]
+            v = heads[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                acc[v] = a + extra[k]
+                pred[v] = u
+                push(heap, (nd, v))
+    return dist, acc, pred
+
+
+def _tree_walk(pred, root, node) -> List[int]:
+    # Nodes from node back to the root of a _sweep tree
+    walk = [node]
+    while walk[-1] != root:
+        walk.append(pred[walk[-1]])
+    return walk
+
+
+class KeyNodeIndex:
+    def __init__(self, graph, fingerprint, origins, destinations, waste_types, distance, risk, path_start, path_end,
+                 path_nodes):
+        self.graph = graph
+        self.version = graph.version  # graph version the index was built or loaded for
+        self.fingerprint = fingerprint
+        self.origins = np.asarray(origins, dtype=np.int64)            # node IDs (rows)
+        self.destinations = np.asarray(destinations, dtype=np.int64)  # node IDs (columns)
+        self.waste_types = dict(waste_types)  # waste type ("" = unrestricted) -> matrix slot
+        self.distance = distance              # (slots x origins x destinations), inf = unreachable
+        self.risk = risk                      # risk + weather along the shortest path
+        # Shortest path of slot, origin i, destination j: path_nodes[path_start[s, i, j]:path_end[s, i, j]]
+        # (node IDs, empty if unreachable)
+        self.path_start = path_start
+        self.path_end = path_end
+        self.path_nodes = path_nodes
+        self._row = {int(v): i for i, v in enumerate(self.origins)}
+        self._col = {int(v): j for j, v in enumerate(self.destinations)}
+
+    @classmethod
+    def build(cls, graph) -> "KeyNodeIndex":
+        graph = compile_network(graph)
+        types = np.asarray(graph.node_types).astype(str)
+        origins = np.flatnonzero(np.isin(types, ORIGIN_TYPES))
+        destinations = np.flatnonzero(np.isin(types, DESTINATION_TYPES))
+        # One slot per distinct set of blocked edges
+        masks, waste_types = {}, {}
+        for waste_type in ("",) + tuple(RESTRICTION_BITS):
+            blocked = graph.blocked(waste_type or None)
+            waste_types[waste_type] = masks.setdefault(blocked.tobytes(), len(masks))
+        distance = np.full((len(masks), len(origins), len(destinations)), np.inf)
+        risk = np.full_like(distance, np.inf)
+        path_start = np.zeros(distance.shape, dtype=np.int64)
+        path_end = np.zeros(distance.shape, dtype=np.int64)
+        path_nodes: List[int] = []
+        # Search from whichever side has fewer key nodes (backwards over the reversed graph)
+        forward = len(origins) <= len(destinations)
+        if forward:
+            indptr, heads, edges = graph.indptr, graph.indices, np.arange(graph.n_edges)
+            roots, targets = origins, destinations
+        else:
+            indptr, heads, edges = graph.reverse()
+            roots, targets = destinations, origins
+        indptr, heads = indptr.tolist(), heads.tolist()
+        extra = (graph.risk + graph.weather)[edges].tolist()
+        for blocked_bytes, slot in masks.items():
+            blocked = np.frombuffer(blocked_bytes, dtype=bool)
+            weight = np.where(blocked | ~np.isfinite(graph.distance), np.inf, graph.distance)[edges].tolist()
+            for r, root in enumerate(roots.tolist()):
+                dist, acc, pred = _sweep(indptr, heads, weight, extra, root, targets.tolist())
+                for t, target in enumerate(targets.tolist()):
+                    if dist[target] == np.inf:
+                        continue
+                    # Forward trees walk back from the destination; reverse trees hold the
+                    # next hop, so the walk from the origin is already in travel order
+                    walk = _tree_walk(pred, root, target)
+                    cell = (slot, r, t) if forward else (slot, t, r)
+                    distance[cell], risk[cell] = dist[target], acc[target]
+                    path_start[cell] = len(path_nodes)
+                    path_nodes += walk[::-1] if forward else walk
+                    path_end[cell] = len(path_nodes)
+        risk[~np.isfinite(distance)] = np.inf
+        return cls(graph, fingerprint(graph), origins, destinations, waste_types, distance, risk, path_start, path_end,
+                   np.array(path_nodes, dtype=np.int32))
+
+    # --- persistence ---
+
+    def save(self, directory) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"key_index_{self.fingerprint[:16]}.npz")
+        names, slots = zip(*self.waste_types.items())
+        np.savez(path, fingerprint=self.fingerprint, origins=self.origins, destinations=self.destinations,
+                 waste_names=np.array(names), waste_slots=np.array(slots), distance=self.distance, risk=self.risk,
+                 path_start=self.path_start, path_end=self.path_end, path_nodes=self.path_nodes)
+        return path
+
+    @classmethod
+    def load(cls, graph, directory) -> Optional["KeyNodeIndex"]:
+        # The saved index for this graph's current fingerprint, or None
+        graph = compile_network(graph)
+        key = fingerprint(graph)
+        path = os.path.join(directory, f"key_index_{key[:16]}.npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != key or "path_nodes" not in data:
+                return None  # other network, or saved before paths were stored
+            waste_types = dict(zip(data["waste_names"].tolist(), data["waste_slots"].tolist()))
+            return cls(graph, key, data["origins"], data["destinations"], waste_types, data["distance"], data["risk"],
+                       data["path_start"], data["path_end"], data["path_nodes"])
+
+    # --- lookups ---
+
+    def _slot(self, waste_type) -> int:
+        return self.waste_types.get(str(waste_type).lower() if waste_type is not None else "", self.waste_types[""])
+
+    def _id(self, node) -> int:
+        return self.graph.index[node] if isinstance(node, str) else int(node)
+
+    @property
+    def stale(self) -> bool:
+        # The graph has been updated in place since
+        return self.graph.version != self.version
+
+    def has(self, source, destination) -> bool:
+        # Both nodes are key nodes on the right side of the index
+        g = self.graph
+        return (source in g.index and destination in g.index and g.index[source] in self._row
+                and g.index[destination] in self._col)
+
+    def segment(self, a, b, waste_type=None) -> Tuple[float, float]:
+        # (distance, risk) of the shortest allowed path from key node a to key node b
+        i, j = self._row[self._id(a)], self._col[self._id(b)]
+        slot = self._slot(waste_type)
+        return float(self.distance[slot, i, j]), float(self.risk[slot, i, j])
+
+    def macro_costs(self, routes: Sequence[Sequence], waste_type=None) -> Tuple[np.ndarray, np.ndarray]:
+        # Vectorized (distance, risk) of equal-length key-node routes, e.g. (source,
+        # inspection, disposal) rows: one lookup per leg
+        ids = np.array([[self._id(n) for n in route] for route in routes], dtype=np.int64)
+        rows = np.vectorize(self._row.__getitem__, otypes=[np.int64])(ids[:, :-1])
+        cols = np.vectorize(self._col.__getitem__, otypes=[np.int64])(ids[:, 1:])
+        slot = self._slot(waste_type)
+        return self.distance[slot, rows, cols].sum(axis=1), self.risk[slot, rows, cols].sum(axis=1)
+
+    def macro_routes(self, source, destination, waste_type=None, required=None) -> List[Tuple[List[str], float, float]]:
+        """
+        Every source -> inspection -> destination macro-route (and the direct one unless
+        required is given), as (key-node names, distance, risk), shortest first;
+        unreachable combinations are left out. required limits the inspections used.
+        """
+        g = self.graph
+        slot = self._slot(waste_type)
+        s, t = self._row[self._id(source)], self._col[self._id(destination)]
+        types = np.asarray(g.node_types).astype(str)
+        inspections = [int(v) for v in self.origins if types[v] == "inspection"]
+        if required is not None:
+            allowed = {self._id(n) for n in ([required] if isinstance(required, (str, int)) else required)}
+            inspections = [v for v in inspections if v in allowed]
+        out = []
+        if inspections:
+            cols = np.array([self._col[v] for v in inspections])
+            rows = np.array([self._row[v] for v in inspections])
+            distance = self.distance[slot, s, cols] + self.distance[slot, rows, t]
+            risk = self.risk[slot, s, cols] + self.risk[slot, rows, t]
+            out += [([g.names[self.origins[s]], g.names[v], g.names[self.destinations[t]]], float(d), float(r))
+                    for v, d, r in zip(inspections, distance, risk)]
+        if required is None:
+            out.append(([g.names[self.origins[s]], g.names[self.destinations[t]]],
+                        float(self.distance[slot, s, t]), float(self.risk[slot, s, t])))
+        return sorted((r for r in out if np.isfinite(r[1])), key=lambda r: (r[1], r[2]))
+
+    def expand(self, macro_route: Sequence[str], waste_type=None) -> List[str]:
+        # Node-level route along the shortest allowed path of every macro-route leg: the
+        # stored path, or a search for legs the index does not cover or after an update
+        g = self.graph
+        slot = self._slot(waste_type)
+        route = [macro_route[0]]
+        for a, b in zip(macro_route[:-1], macro_route[1:]):
+            i, j = self._row.get(self._id(a)), self._col.get(self._id(b))
+            if i is None or j is None or self.stale:
+                leg, _ = shortest_constrained_path(g, a, b, None, waste_type)
+            else:
+                ids = self.path_nodes[self.path_start[slot, i, j]:self.path_end[slot, i, j]]
+                leg = [g.names[v] for v in ids] if len(ids) else None
+            if leg is None:
+                raise ValueError(f"No allowed path from {a} to {b}")
+            route += leg[1:]
+        return route
+
+
+_INDEXES: Dict[Tuple[int, int], KeyNodeIndex] = {}
+_lock = threading.Lock()
+
+
+def key_index(network, directory=None) -> KeyNodeIndex:
+    """
+    The key-node index of a network, built at most once per graph version in this process.
+    With a directory (default: the graph_store directory of a memory-mapped graph) the
+    index is loaded from and saved to disk.
+    """
+    graph = compile_network(network)
+    directory = directory if directory is not None else graph.path
+    key = (graph.token, graph.version)
+    with _lock:
+        index = _INDEXES.get(key)
+    if index is None:
+        index = KeyNodeIndex.load(graph, directory) if directory else None
+        if index is None:
+            index = KeyNodeIndex.build(graph)
+            if directory:
+                index.save(directory)
+        with _lock:
+            # Indexes of earlier versions of this graph are stale
+            for old in [k for k in _INDEXES if k[0] == graph.token and k != key]:
+                del _INDEXES[old]
+            index = _INDEXES.setdefault(key, index)
+    return index
@@ -0,0 +1,198 @@
+# Lightweight instrumentation for the classify / optimize / render hot paths
+# Stage timers and counters aggregate per process and can be exported as JSON or
+# Prometheus text. capture() additionally records the stages of one request (e.g. one
+# button press) in order, optionally under cProfile; a capture only feeds the process
+# totals while metrics are enabled. While disabled and not capturing, timer() returns a
+# shared no-op context manager and count() returns immediately. Snapshots from other
+# processes (e.g. pool workers) can be added with merge().
+#
+#   with metrics.timer("optimize"):
+#       ...
+#   metrics.count("fitness_evaluations", len(rows))
+#   with metrics.capture(profile=True) as breakdown:
+#       handle_request()
+#   breakdown.stages, breakdown.profile
+#
+# Enable with metrics.METRICS.enabled = True or the HAZWASTE_METRICS=1 environment variable.
+
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+_NULL = contextlib.nullcontext()
+
+# Breakdown of the request being captured in this thread / task, if any
+_current: contextvars.ContextVar = contextvars.ContextVar("metrics_breakdown", default=None)
+
+
+class Breakdown:
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []  # (stage, milliseconds) in completion order
+        self.counters: Dict[str, int] = {}
+        self.total_ms = 0.0
+        self.profile: Optional[str] = None         # cProfile report, when requested
+
+    def totals(self) -> List[Dict]:
+        # Calls and milliseconds per stage, in first-seen order
+        out = {}
+        for stage, ms in self.stages:
+            row = out.setdefault(stage, {"stage": stage, "calls": 0, "ms": 0.0})
+            row["calls"] += 1
+            row["ms"] += ms
+        return list(out.values())
+
+    def snapshot(self) -> Dict:
+        # Timers and counters in the shape of Metrics.snapshot(), for Metrics.merge()
+        timers = {}
+        for stage, ms in self.stages:
+            t = timers.setdefault(stage, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            t["calls"] += 1
+            t["total_ms"] += ms
+            t["max_ms"] = max(t["max_ms"], ms)
+        return {"timers": timers, "counters": dict(self.counters)}
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter_ns() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._timers: Dict[str, List[int]] = {}  # name -> [calls, total ns, max ns]
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, name: str):
+        # Context manager timing one stage
+        if not self.enabled and _current.get() is None:
+            return _NULL
+        return _Timer(self, name)
+
+    def observe(self, name: str, ns: int) -> None:
+        if self.enabled:
+            with self._lock:
+                stat = self._timers.get(name)
+                if stat is None:
+                    stat = self._timers[name] = [0, 0, 0]
+                stat[0] += 1
+                stat[1] += ns
+                stat[2] = max(stat[2], ns)
+        breakdown = _current.get()
+        if breakdown is not None:
+            breakdown.stages.append((name, ns / 1e6))
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled and _current.get() is None:
+            return
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+        breakdown = _current.get()
+        if breakdown is not None:
+            breakdown.counters[name] = breakdown.counters.get(name, 0) + n
+
+    def gauge(self, name: str, fn: Callable[[], float]) -> None:
+        # Value read at export time, e.g. a cache size
+        self._gauges[name] = fn
+
+    @contextlib.contextmanager
+    def capture(self, profile=False):
+        # Records the stages of the enclosed work into a Breakdown; instrumentation is
+        # active inside the block even while metrics are disabled process-wide
+        breakdown = Breakdown()
+        token = _current.set(breakdown)
+        profiler = cProfile.Profile() if profile else None
+        started = time.perf_counter_ns()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            yield breakdown
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            breakdown.total_ms = (time.perf_counter_ns() - started) / 1e6
+            _current.reset(token)
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+                breakdown.profile = out.getvalue()
+
+    def merge(self, snapshot: Dict) -> None:
+        # Adds the timers and counters of a snapshot taken elsewhere (another process)
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, t in snapshot.get("timers", {}).items():
+                stat = self._timers.get(name)
+                if stat is None:
+                    stat = self._timers[name] = [0, 0, 0]
+                stat[0] += t["calls"]
+                stat[1] += int(round(t["total_ms"] * 1e6))
+                stat[2] = max(stat[2], int(round(t["max_ms"] * 1e6)))
+            for name, n in snapshot.get("counters", {}).items():
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            timers = {name: {"calls": calls, "total_ms": total / 1e6, "max_ms": worst / 1e6}
+                      for name, (calls, total, worst) in self._timers.items()}
+            counters = dict(self._counters)
+        gauges = {name: float(fn()) for name, fn in self._gauges.items()}
+        return {"timers": timers, "counters": counters, "gauges": gauges}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="hazwaste") -> str:
+        # Prometheus text exposition format
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for name, t in snap["timers"].items():
+            label = f'{{stage="{name}"}}'
+            lines.append(f"{prefix}_stage_seconds_count{label} {t['calls']}")
+            lines.append(f"{prefix}_stage_seconds_sum{label} {t['total_ms'] / 1000.0:.9f}")
+        for name, value in snap["counters"].items():
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in snap["gauges"].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+# Process-wide registry used by the instrumented modules
+METRICS = Metrics(enabled=os.environ.get("HAZWASTE_METRICS", "") not in ("", "0"))
+timer = METRICS.timer
+count = METRICS.count
+capture = METRICS.capture
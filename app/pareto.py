@@ -0,0 +1,69 @@
+# NSGA-II building blocks over a whole population at once
+# Objectives are (routes x objectives) arrays, all minimized. Domination is computed as
+# one boolean matrix, fronts are peeled off by decrementing domination counts, and the
+# crowding distance is computed for every front in one pass per objective.
+
+from typing import Optional
+
+import numpy as np
+
+
+def non_dominated_sort(objectives: np.ndarray, violation: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pareto rank of every row (0 = non-dominated front). With a per-row constraint
+    violation (0 = feasible), a smaller violation dominates outright and rows with equal
+    violation compare on the objectives (Deb's constrained domination).
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    n = len(objectives)
+    # dominates[i, j]: row i is no worse than row j everywhere and better somewhere.
+    # Built one objective at a time to avoid an (n x n x objectives) temporary.
+    no_worse = np.ones((n, n), dtype=bool)
+    better = np.zeros((n, n), dtype=bool)
+    for column in objectives.T:
+        a, b = column[:, None], column[None, :]
+        no_worse &= a <= b
+        better |= a < b
+    dominates = no_worse & better
+    if violation is not None:
+        v = np.asarray(violation, dtype=float)
+        dominates = (v[:, None] < v[None, :]) | ((v[:, None] == v[None, :]) & dominates)
+    rank = np.full(n, -1, dtype=np.int64)
+    count = dominates.sum(axis=0, dtype=np.int64)  # rows dominating each row
+    front = np.flatnonzero(count == 0)
+    r = 0
+    while len(front):
+        rank[front] = r
+        count -= dominates[front].sum(axis=0, dtype=np.int64)
+        count[front] = -1
+        front = np.flatnonzero(count == 0)
+        r += 1
+    return rank
+
+
+def crowding_distance(objectives: np.ndarray, rank: np.ndarray) -> np.ndarray:
+    # Per-row crowding distance within its front; the extremes of a front are infinite
+    objectives = np.asarray(objectives, dtype=float)
+    n, m = objectives.shape
+    distance = np.zeros(n)
+    if n == 0:
+        return distance
+    for k in range(m):
+        order = np.lexsort((objectives[:, k], rank))
+        values = objectives[order, k]
+        r = rank[order]
+        first = np.r_[True, r[1:] != r[:-1]]
+        last = np.r_[r[1:] != r[:-1], True]
+        group = np.cumsum(first) - 1
+        span = (values[last] - values[first])[group]
+        gap = np.zeros(n)
+        gap[1:-1] = values[2:] - values[:-2]
+        contribution = np.where(span > 0, gap / np.where(span > 0, span, 1.0), 0.0)
+        contribution[first | last] = np.inf
+        distance[order] += contribution
+    return distance
+
+
+def crowded_order(rank: np.ndarray, crowding: np.ndarray) -> np.ndarray:
+    # Row indices best first: lower rank, then larger crowding distance
+    return np.lexsort((-crowding, rank))
@@ -0,0 +1,180 @@
+# Exact shortest-constrained-path solver over a CompiledGraph
+# Searches the (node, inspected) state graph: a route is feasible once it has passed
+# one of the required inspection nodes and ends at the target. Edges restricted for
+# the waste type are never used.
+
+import heapq
+import itertools
+import numpy as np
+from typing import Iterator, List, Tuple
+
+
+def _node_set(graph, nodes) -> frozenset:
+    if nodes is None:
+        return frozenset()
+    if isinstance(nodes, (str, int, np.integer)):
+        nodes = [nodes]
+    return frozenset(graph.index[n] if isinstance(n, str) else int(n) for n in nodes)
+
+
+def _node_id(graph, node) -> int:
+    return graph.index[node] if isinstance(node, str) else int(node)
+
+
+def _dijkstra(indptr, heads, edges, origin, weight, allowed):
+    # Plain Dijkstra over a CSR layout; edges maps CSR slot -> edge ID (None = identity)
+    n = len(indptr) - 1
+    dist = np.full(n, np.inf)
+    pred = np.full(n, -1, dtype=np.int64)
+    dist[origin] = 0.0
+    heap = [(0.0, origin)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for k in range(indptr[u], indptr[u + 1]):
+            e = k if edges is None else edges[k]
+            if not allowed[e]:
+                continue
+            v = heads[k]
+            nd = d + weight[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(heap, (nd, v))
+    return dist, pred
+
+
+def distances_to(graph, target: int, weight: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+    # Reverse Dijkstra: shortest distance from every node to target over allowed edges.
+    # Used as the (admissible) A* heuristic for both inspected states.
+    return shortest_path_tree(graph, target, weight, allowed, reverse=True)[0]
+
+
+def shortest_path_tree(graph, origin: int, weight: np.ndarray, allowed: np.ndarray, reverse=False):
+    # Dijkstra from origin: (distances, predecessor node per node, -1 = none).
+    # With reverse=True distances are *to* origin and the second array is the next hop.
+    if reverse:
+        return _dijkstra(*graph.reverse(), origin, weight, allowed)
+    return _dijkstra(graph.indptr, graph.indices, None, origin, weight, allowed)
+
+
+def tree_path(pred: np.ndarray, origin: int, target: int, reverse=False) -> List[int]:
+    # Node IDs from origin to target along a shortest_path_tree result
+    # (for reverse trees, origin is the tree root and target the node to start from)
+    path = [target]
+    while path[-1] != origin:
+        path.append(int(pred[path[-1]]))
+    return path if reverse else path[::-1]
+
+
+class ConstrainedPathSolver:
+    """
+    Dijkstra/A* over (node, inspected) states for one source, target, inspection set
+    and waste type. Reuse one solver for repeated queries (e.g. Yen's spur searches);
+    the heuristic is computed once.
+    """
+
+    def __init__(self, graph, source, target, required=None, waste_type=None, weight=None):
+        self.graph = graph
+        self.source = _node_id(graph, source)
+        self.target = _node_id(graph, target)
+        self.required = _node_set(graph, required)
+        self.weight = graph.distance if weight is None else np.asarray(weight, dtype=float)
+        self.allowed = ~graph.blocked(waste_type) & np.isfinite(self.weight)
+        self.heuristic = distances_to(graph, self.target, self.weight, self.allowed)
+
+    def start_state(self) -> Tuple[int, int]:
+        return self.source, int(not self.required or self.source in self.required)
+
+    def search(self, start=None, banned_states=frozenset(), banned_moves=frozenset()):
+        # A* from a state to (target, inspected). Returns (states, cost) or None.
+        start = start or self.start_state()
+        g = self.graph
+        indptr, indices = g.indptr, g.indices
+        best = {start: 0.0}
+        parent = {start: None}
+        counter = itertools.count()
+        heap = [(self.heuristic[start[0]], next(counter), 0.0, start)]
+        while heap:
+            _, _, d, state = heapq.heappop(heap)
+            if d > best[state]:
+                continue
+            u, flag = state
+            if u == self.target and flag:
+                states = []
+                while state is not None:
+                    states.append(state)
+                    state = parent[state]
+                return states[::-1], d
+            for e in range(indptr[u], indptr[u + 1]):
+                if not self.allowed[e]:
+                    continue
+                v = int(indices[e])
+                nxt = (v, flag or int(v in self.required))
+                if nxt in banned_states or (state, nxt) in banned_moves:
+                    continue
+                nd = d + self.weight[e]
+                if nd < best.get(nxt, np.inf):
+                    best[nxt] = nd
+                    parent[nxt] = state
+                    heapq.heappush(heap, (nd + self.heuristic[v], next(counter), nd, nxt))
+        return None
+
+    def path_cost(self, states) -> float:
+        nodes = np.array([s[0] for s in states])
+        return float(self.weight[self.graph.edge_ids(nodes[:-1], nodes[1:])].sum())
+
+    def k_shortest(self) -> Iterator[Tuple[List[int], float]]:
+        # Yen's algorithm on the state graph; yields (node IDs, cost) in order of cost, lazily
+        first = self.search()
+        if first is None:
+            return
+        found = [first[0]]
+        yield [s[0] for s in first[0]], first[1]
+        candidates = []
+        seen = {tuple(first[0])}
+        counter = itertools.count()
+        while True:
+            prev = found[-1]
+            for i in range(len(prev) - 1):
+                root = prev[:i + 1]
+                banned_moves = {(p[i], p[i + 1]) for p in found if len(p) > i + 1 and p[:i + 1] == root}
+                spur = self.search(root[-1], frozenset(root[:-1]), banned_moves)
+                if spur is None:
+                    continue
+                states = root[:-1] + spur[0]
+                key = tuple(states)
+                if key in seen:
+                    continue
+                seen.add(key)
+                heapq.heappush(candidates, (self.path_cost(states), next(counter), states))
+            if not candidates:
+                return
+            cost, _, states = heapq.heappop(candidates)
+            found.append(states)
+            yield [s[0] for s in states], cost
+
+
+def shortest_constrained_path(graph, source, target, required=None, waste_type=None, weight=None):
+    """
+    Optimal source -> target route through at least one node of `required`
+    (a name, ID or collection; None = no inspection), avoiding restricted edges.
+    Returns (route names, cost), or (None, inf) when no feasible route exists.
+    """
+    solver = ConstrainedPathSolver(graph, source, target, required, waste_type, weight)
+    result = solver.search()
+    if result is None:
+        return None, float("inf")
+    states, cost = result
+    return [graph.names[s[0]] for s in states], float(cost)
+
+
+def k_shortest_constrained_paths(graph, source, target, required=None, waste_type=None, weight=None):
+    """
+    Yields feasible routes as (route names, cost) in increasing cost, computing each
+    alternative only when the caller asks for it.
+    """
+    solver = ConstrainedPathSolver(graph, source, target, required, waste_type, weight)
+    for route, cost in solver.k_shortest():
+        yield [graph.names[n] for n in route], float(cost)
@@ -0,0 +1,100 @@
+# Incremental re-optimization of active shipments
+# Keeps the last result and final GA population of every registered shipment and an
+# index from edge IDs to the shipments whose best route uses them. When edge risk,
+# weather, restrictions or closures change, only the shipments routed over a changed
+# edge are re-optimized, warm-started from their previous population with a reduced
+# generation budget, so an update costs in proportion to the routes it affects.
+#
+#   registry = ShipmentRegistry(AdvancedRouteOptimizer())
+#   registry.optimize("truck-1", request)
+#   registry.apply_deltas({("A", "B"): {"weather": 4.0}, ("C", "D"): {"closed": True}})
+
+from typing import Dict, Hashable, List, Set
+
+import numpy as np
+
+from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, OptimizationResult
+
+
+class Shipment:
+    def __init__(self, request, result, population, edges):
+        self.request = request        # OptimizationRequest
+        self.result = result          # latest OptimizationResult
+        self.population = population  # final GA population, used to warm-start the next run
+        self.edges = edges            # edge IDs of result.route
+
+
+class ShipmentRegistry:
+    """
+    Registered shipments and the edges their routes use. The optimizer is switched to a
+    private copy of its compiled graph, and deltas are applied to that copy in place
+    (see CompiledGraph.update_edges); other optimizers on the same network, such as the
+    default DEFAULT_NETWORK ones, do not see them. warm_generations is the generation
+    budget of a re-optimization (default a quarter of the optimizer's generations).
+    """
+
+    def __init__(self, optimizer: AdvancedRouteOptimizer, warm_generations=None):
+        optimizer.network = optimizer.graph.copy()
+        self.optimizer = optimizer
+        self.warm_generations = warm_generations or max(1, optimizer.generations // 4)
+        self.shipments: Dict[Hashable, Shipment] = {}
+        self._by_edge: Dict[int, Set[Hashable]] = {}
+
+    def optimize(self, shipment_id, request: OptimizationRequest, **options) -> OptimizationResult:
+        # Full GA run for a new (or replaced) shipment; options go to optimize_iter
+        self._store(shipment_id, request, self.optimizer.optimize_iter(request, **options))
+        return self.shipments[shipment_id].result
+
+    def remove(self, shipment_id):
+        shipment = self.shipments.pop(shipment_id)
+        for eid in shipment.edges.tolist():
+            ids = self._by_edge[eid]
+            ids.discard(shipment_id)
+            if not ids:
+                del self._by_edge[eid]
+
+    def affected(self, edge_ids) -> List[Hashable]:
+        # Shipments whose current route uses any of edge_ids
+        found = set()
+        for eid in np.asarray(edge_ids).tolist():
+            found |= self._by_edge.get(eid, set())
+        return [s for s in self.shipments if s in found]
+
+    def apply_deltas(self, changes: Dict, **options) -> Dict[Hashable, OptimizationResult]:
+        """
+        Applies {(a, b): {"risk", "weather", "restricted", "closed"}} to the network and
+        re-optimizes the shipments routed over a changed edge. Returns their new results;
+        shipments on unchanged edges keep theirs, so an edge that gets better (reopened,
+        lower risk) is only picked up by routes that already use it or by reoptimize().
+        Raises ValueError if closures leave a shipment without an open route.
+        """
+        edge_ids = self.optimizer.graph.update_edges(changes)
+        results = {}
+        for shipment_id in self.affected(edge_ids):
+            results[shipment_id] = self.reoptimize(shipment_id, **options)
+        return results
+
+    def reoptimize(self, shipment_id, **options) -> OptimizationResult:
+        # Warm-started run seeded with the shipment's previous population and best route
+        shipment = self.shipments[shipment_id]
+        seeds = [shipment.result.route]
+        if shipment.population is not None:
+            seeds += list(shipment.population)
+        options.setdefault("generations", self.warm_generations)
+        self._store(shipment_id, shipment.request,
+                    self.optimizer.optimize_iter(shipment.request, warm_start=seeds, **options))
+        return self.shipments[shipment_id].result
+
+    def _store(self, shipment_id, request, progress_iter):
+        progress = None
+        for progress in progress_iter:
+            pass
+        if shipment_id in self.shipments:
+            self.remove(shipment_id)
+        graph = self.optimizer.graph
+        route = graph.ids(progress.result.route)
+        edges = np.unique(graph.edge_ids(route[:-1], route[1:]))
+        edges = edges[edges >= 0]
+        self.shipments[shipment_id] = Shipment(request, progress.result, progress.population, edges)
+        for eid in edges.tolist():
+            self._by_edge.setdefault(eid, set()).add(shipment_id)
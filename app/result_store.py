@@ -0,0 +1,152 @@
+# Persistent store of optimizer results, shared across sessions and processes
+# Results live in one SQLite table keyed by a hash of everything that determines a run:
+# the network fingerprint (which changes with every in-place edge update), the request,
+# the GA parameters and the seed. Only reproducible runs are stored: an int seed, and
+# a stop that did not depend on the wall clock (not on deadline_ms). A repeated request is answered with a single indexed
+# lookup. The store is bounded: beyond max_entries the least recently used results are
+# evicted. Values are JSON, so the file can be inspected with any SQLite client.
+#
+#   store = ResultStore("results.sqlite")
+#   optimizer.result_store = store       # AdvancedRouteOptimizer
+#   ga_optimize_route(..., seed=7, store=store)
+#   store.stats()  -> {"size", "hits", "misses", "hit_rate", ...}
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from anytime import DEADLINE
+from compiled_graph import CompiledGraph
+from key_index import fingerprint
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+# Use time, kept strictly increasing so entries touched within one clock tick still
+# evict in the order they were used
+_NOW = "MAX(?, COALESCE((SELECT MAX(last_used) FROM results), 0) + 1e-6)"
+
+# Fingerprints per (graph token, version); hashing a large network once per version
+_FINGERPRINTS: Dict[Tuple[int, int], str] = {}
+
+
+def network_fingerprint(graph: CompiledGraph) -> str:
+    # The key_index fingerprint (structure, edge attributes, node types) plus what else a
+    # route result depends on: time windows, speed profiles and node names
+    key = (graph.token, graph.version)
+    if key not in _FINGERPRINTS:
+        digest = hashlib.sha1(fingerprint(graph).encode())
+        for array in (graph.tw_open, graph.tw_close, graph.speed_profiles, graph.speed_class):
+            digest.update(memoryview(np.ascontiguousarray(array)).cast("B"))
+        digest.update("\0".join(graph.names).encode())
+        _FINGERPRINTS[key] = digest.hexdigest()
+    return _FINGERPRINTS[key]
+
+
+def reproducible(seed, stop_reason=None) -> bool:
+    # Runs worth storing: a fixed int seed and (once known) a stop that was not the deadline
+    return isinstance(seed, (int, np.integer)) and not isinstance(seed, bool) and stop_reason != DEADLINE
+
+
+def _plain(value):
+    # JSON fallback for NumPy scalars and arrays
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def result_key(kind: str, graph: CompiledGraph, **parts) -> str:
+    # Stable key of one run: kind ("advanced", "route_optimizer"), network and run parameters
+    payload = json.dumps([kind, network_fingerprint(graph), parts], sort_keys=True, default=_plain)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ResultStore:
+    def __init__(self, path: str = ":memory:", max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # One connection shared by the threads of this process (Streamlit, service threads)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key: str, default=None):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self._db.execute(f"UPDATE results SET last_used = {_NOW}, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value) -> None:
+        now = time.time()
+        text = json.dumps(value, default=_plain)
+        with self._lock, self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO results (key, value, created, last_used) VALUES (?, ?, ?, {_NOW})",
+                             (key, text, now, now))
+            self._evict()
+
+    def get_or_compute(self, key: str, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results")
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        self._db.close()
+
+    def stats(self) -> Dict:
+        # Lookups of this instance, plus the size and lifetime hits of the whole store
+        with self._lock:
+            size, lifetime = self._db.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "lifetime_hits": lifetime,
+        }
+
+    def _evict(self) -> None:
+        # Least recently used rows beyond max_entries
+        excess = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._db.execute("DELETE FROM results WHERE key IN "
+                             "(SELECT key FROM results ORDER BY last_used, rowid LIMIT ?)", (excess,))
+            self.evictions += excess
@@ -0,0 +1,107 @@
+# In-memory route graph rendering for the Streamlit page
+# The base graph (nodes, edges and a fixed layout) is built once per network and each
+# route's HTML is cached by (network, route tuple), so repeated views cost nothing and
+# nothing is written to disk: concurrent sessions never share a file.
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Sequence
+
+import networkx as nx
+from pyvis.network import Network
+
+import metrics
+from compiled_graph import compile_network
+
+# Rendered routes kept per process
+ROUTE_CACHE_SIZE = 256
+
+# Node positions are fixed by the cached layout, so the browser skips the physics simulation
+OPTIONS = '''
+var options = {
+  "nodes": {"font": {"size": 18}, "physics": false, "shadow": true},
+  "edges": {"smooth": true},
+  "physics": {"enabled": false},
+  "interaction": {"hover": true, "multiselect": true, "navigationButtons": true}
+}
+'''
+
+
+class BaseGraph:
+    def __init__(self, nodes, edges, positions, directed):
+        self.nodes = nodes          # (node key, label) pairs
+        self.edges = edges          # (a, b) node-key pairs, one per drawn edge
+        self.positions = positions  # node key -> (x, y) in pixels
+        self.directed = directed
+
+
+_BASES: Dict[int, BaseGraph] = {}
+_ROUTES: "OrderedDict[tuple, str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def base_graph(network) -> BaseGraph:
+    # Nodes, edges and a seeded spring layout, computed once per compiled network
+    graph = compile_network(network)
+    with _lock:
+        base = _BASES.get(graph.token)
+    if base is not None:
+        return base
+    edges = []
+    seen = set()
+    for u, v in zip(graph.sources.tolist(), graph.indices.tolist()):
+        key = (u, v) if graph.directed else (min(u, v), max(u, v))
+        if key not in seen:
+            seen.add(key)
+            edges.append((graph.names[u], graph.names[v]))
+    layout = nx.Graph()
+    layout.add_nodes_from(graph.names)
+    layout.add_edges_from(edges)
+    with metrics.timer("layout"):
+        positions = {n: (float(x) * 400, float(y) * 400) for n, (x, y) in nx.spring_layout(layout, seed=7).items()}
+    base = BaseGraph(list(zip(graph.names, graph.labels)), edges, positions, graph.directed)
+    with _lock:
+        return _BASES.setdefault(graph.token, base)
+
+
+def _render(base: BaseGraph, route: Sequence[str]) -> str:
+    on_route = set(route)
+    route_edges = set(zip(route[:-1], route[1:]))
+    if not base.directed:
+        route_edges |= {(b, a) for a, b in route_edges}
+
+    net = Network(height="400px", width="100%", directed=base.directed, notebook=False, cdn_resources="remote")
+    for node, label in base.nodes:
+        x, y = base.positions[node]
+        color = "deepskyblue" if node in on_route else "lightgray"
+        size = 30 if node in on_route else 20
+        net.add_node(node, label=label, color=color, size=size, x=x, y=y, physics=False)
+    for a, b in base.edges:
+        color = "orange" if (a, b) in route_edges else "#cccccc"
+        width = 4 if (a, b) in route_edges else 1
+        net.add_edge(a, b, color=color, width=width)
+    net.set_options(OPTIONS)
+    # Helper scripts are inlined (vis-network comes from the CDN), so the HTML needs no local lib/ files
+    return net.generate_html()
+
+
+def route_html(network, route: Sequence[str]) -> str:
+    """
+    HTML for the network with `route` (node keys) highlighted. Built in memory and
+    cached per (network, route); the least recently viewed routes are dropped first.
+    """
+    base = base_graph(network)
+    key = (compile_network(network).token, tuple(route))
+    with _lock:
+        html = _ROUTES.get(key)
+        if html is not None:
+            _ROUTES.move_to_end(key)
+            metrics.count("render_cache_hits")
+            return html
+    with metrics.timer("render"):
+        html = _render(base, list(route))
+    with _lock:
+        html = _ROUTES.setdefault(key, html)
+        while len(_ROUTES) > ROUTE_CACHE_SIZE:
+            _ROUTES.popitem(last=False)
+    return html
@@ -1,104 +1,261 @@
-def ga_optimize_route(start, disposal, required=None, population_size=30, generations=40, mutation_rate=0.2):
-    # Build all possible nodes
-    nodes = list(NETWORK.keys())
-    nodes.remove(start)
-    nodes.remove(disposal)
-    if required and required in nodes:
-        nodes.remove(required)
-    # Initial population: random permutations with required node in the middle if needed
-    population = []
-    for _ in range(population_size):
-        middle = [required] if required else []
-        rest = nodes.copy()
-        random.shuffle(rest)
-        route = [start] + middle + rest + [disposal]
-        # Remove unreachable nodes from route
-        filtered = [start]
-        for n in route[1:]:
-            if n in NETWORK[filtered[-1]]:
-                filtered.append(n)
-        if filtered[-1] != disposal:
-            filtered.append(disposal)
-        population.append(filtered)
-
-    def fitness(route):
-        # Penalize if required node is missing
-        penalty = 1000 if required and required not in route else 0
-        return get_distance(route) + penalty
-
-    for _ in range(generations):
-        # Evaluate fitness
-        population = sorted(population, key=fitness)
+from distance_matrix import get_distance, GRAPH
+from compiled_graph import compile_network
+from fitness_cache import route_key, shared_cache
+from path_solver import shortest_constrained_path, k_shortest_constrained_paths
+from island_model import run_islands
+from anytime import iterate, run_anytime
+from ga_operators import RouteContext, get_operators
+from result_store import reproducible, result_key
+import random
+import time
+import numpy as np
+import metrics
+
+# Longest random walk of the initial population (bounded so large networks stay cheap)
+MAX_WALK_NODES = 256
+
+def _python_rng(rng):
+    # None -> the random module, an int seed -> random.Random(seed); numpy Generators (from
+    # the island driver or a caller) -> a random.Random drawn from them
+    if rng is None:
+        return random
+    if isinstance(rng, (int, np.integer)):
+        return random.Random(int(rng))
+    if isinstance(rng, np.random.Generator):
+        return random.Random(int(rng.integers(2**63)))
+    return rng
+
+
+class RouteGARun:
+    # Legacy route GA for one start/disposal pair. rng is anything with the random
+    # module's shuffle/sample/randint/random/randrange (the module itself, or random.Random).
+
+    def __init__(self, start, disposal, required=None, population_size=30, mutation_rate=0.2, cache=None, graph=None,
+                 operators="erx"):
+        # graph: a CompiledGraph, network description or graph_store directory
+        # operators: name of a ga_operators.OPERATOR_SETS entry or an Operators instance
+        self.graph = compile_network(graph) if graph is not None else GRAPH
+        self.start = start
+        self.disposal = disposal
+        self.required = required
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        # Memoized in the shared fitness cache; keys are node-ID tuples
+        self.cache = cache if cache is not None else shared_cache()
+        self.operators = get_operators(operators)
+        self.context = RouteContext(self.graph, start, disposal, required)
+        self.namespace = ("route_optimizer", self.graph.token, self.graph.version, required,
+                          self.operators.missing_leg_penalty)
+
+    def initial_population(self, rng=random):
+        rng = _python_rng(rng)
+        # Initial population: random walks from start, through the required node first
+        # when it is a neighbour of start
+        is_open = np.isfinite(self.graph.distance)
+        population = [self._random_walk(rng, is_open) for _ in range(self.population_size)]
+        if self.operators.repair is not None:
+            population = [self.operators.repair(route, self.context) for route in population]
+        return population
+
+    def _random_walk(self, rng, is_open):
+        # Self-avoiding walk over the CSR neighbour arrays (open edges only) that ends at
+        # the disposal, at a dead end or after MAX_WALK_NODES nodes, then jumps to the disposal
+        graph = self.graph
+        indptr, indices = graph.indptr, graph.indices
+        start, disposal = graph.index[self.start], graph.index[self.disposal]
+        route = [start]
+        visited = {start}
+        required = graph.index.get(self.required) if self.required else None
+        if required is not None and required != disposal and graph.edge_ids(start, required) >= 0:
+            route.append(required)
+            visited.add(required)
+        u = route[-1]
+        while u != disposal and len(route) < MAX_WALK_NODES:
+            lo, hi = indptr[u], indptr[u + 1]
+            options = [v for v in indices[lo:hi][is_open[lo:hi]].tolist() if v not in visited]
+            if not options:
+                break
+            u = options[rng.randrange(len(options))]
+            route.append(u)
+            visited.add(u)
+        if u != disposal:
+            route.append(disposal)
+        return [graph.names[v] for v in route]
+
+    def cost(self, route):
+        def compute():
+            metrics.count("legacy_fitness_evaluations")
+            # Penalize if required node is missing
+            penalty = 1000 if self.required and self.required not in route else 0
+            if self.operators.missing_leg_penalty:
+                penalty += self.operators.missing_leg_penalty * self.context.missing_legs(route)
+            return get_distance(route, self.graph) + penalty
+        return self.cache.get_or_compute(route_key(self.namespace, self.graph.ids(route)), compute)
+
+    def fitness(self, population):
+        # Evaluate fitness (once per route per generation); higher is better
+        return -np.array([self.cost(route) for route in population], dtype=float)
+
+    def ranked(self, population, fitness=None):
+        # Lowest cost first
+        fitness = self.fitness(population) if fitness is None else fitness
+        return [population[i] for i in np.argsort(-fitness, kind="stable")]
+
+    def step(self, population, fitness, rng=random):
+        rng = _python_rng(rng)
+        population_size = self.population_size
+        population = self.ranked(population, fitness)
         # Selection: keep top 50%
         survivors = population[:population_size//2]
+        ops, ctx = self.operators, self.context
         # Crossover
         children = []
         while len(children) < population_size//2:
-            p1, p2 = random.sample(survivors, 2)
-            cut = random.randint(1, len(p1)-2)
-            child = p1[:cut] + [n for n in p2 if n not in p1[:cut]]
-            # Ensure start and disposal
-            if child[0] != start:
-                child = [start] + child
-            if child[-1] != disposal:
-                child = child + [disposal]
-            children.append(child)
+            p1, p2 = rng.sample(survivors, 2)
+            children.append(ops.crossover(p1, p2, rng, ctx))
         # Mutation
-        for child in children:
-            if random.random() < mutation_rate and len(child) > 3:
-                i, j = random.sample(range(1, len(child)-1), 2)
-                child[i], child[j] = child[j], child[i]
+        for k, child in enumerate(children):
+            if rng.random() < self.mutation_rate:
+                children[k] = ops.mutation(child, rng, ctx)
+        # Repair and local search
+        if ops.repair is not None:
+            children = [ops.repair(child, ctx) for child in children]
+        if ops.local_search is not None:
+            children = [ops.local_search(child, ctx) for child in children]
         population = survivors + children
-    # Return best route
-    best = min(population, key=fitness)
-    return best, get_distance(best)
+        return population, self.fitness(population)
 
-from distance_matrix import get_distance
-import random
+    def evolve(self, population, generations, rng=random):
+        rng = _python_rng(rng)
+        fitness = self.fitness(population)
+        for _ in range(generations):
+            population, fitness = self.step(population, fitness, rng)
+        return population
+
+    def merge(self, population, migrants):
+        # Migrants replace the worst routes
+        return self.ranked(population)[:len(population) - len(migrants)] + [list(m) for m in migrants]
+
+    def best_fitness(self, population):
+        return float(self.fitness(population).max())
+
+    def best(self, population, fitness, generations=None):
+        # Return best route
+        best = population[int(np.argmax(fitness))]
+        return best, get_distance(best, self.graph)
+
+    def result(self, population, generations=None):
+        return self.best(population, self.fitness(population), generations)
+
+
+def ga_optimize_route(start, disposal, required=None, population_size=30, generations=40, mutation_rate=0.2,
+                      cache=None, graph=None, deadline_ms=None, patience=None, target_cost=None, callback=None,
+                      operators="erx", seed=None, store=None):
+    """
+    Runs the GA for up to `generations` generations and returns (best route, distance).
+    Stops early after deadline_ms, after `patience` generations without improvement or
+    once a route costs at most target_cost; callback(progress) sees every generation.
+    operators picks the crossover / mutation / repair set (see ga_operators.OPERATOR_SETS);
+    the default repaired "erx" set only returns routes along real edges, while "legacy"
+    keeps the original operators, whose missing legs cost nothing.
+    seed (an int or numpy Generator) makes the run reproducible; without one the global
+    random module is used, as before. With a result_store.ResultStore, a stored result for
+    the same network, parameters and int seed is returned without running the GA (runs
+    without a seed or stopped by deadline_ms are not stored).
+    """
+    started = time.perf_counter()
+    key = None
+    if store is not None and reproducible(seed):
+        key = result_key("route_optimizer", compile_network(graph) if graph is not None else GRAPH,
+                         start=start, disposal=disposal, required=required, population_size=population_size,
+                         generations=generations, mutation_rate=mutation_rate, deadline_ms=deadline_ms,
+                         patience=patience, target_cost=target_cost, operators=get_operators(operators).name,
+                         seed=seed)
+        stored = store.get(key)
+        if stored is not None:
+            return stored[0], stored[1]
+    run = RouteGARun(start, disposal, required, population_size, mutation_rate, cache, graph, operators)
+    target = -target_cost if target_cost is not None else None
+    with metrics.timer("legacy_ga"):
+        progress = run_anytime(run, _python_rng(seed), generations, deadline_ms, patience, target, callback, started)
+    route, distance = progress.result
+    if key is not None and reproducible(seed, progress.stop_reason):
+        store.put(key, [route, distance])
+    return route, distance
+
+
+def ga_optimize_route_iter(start, disposal, required=None, population_size=30, generations=40, mutation_rate=0.2,
+                           cache=None, graph=None, deadline_ms=None, patience=None, target_cost=None,
+                           operators="erx", seed=None):
+    """
+    Generator form of ga_optimize_route: yields an anytime.Progress per generation whose
+    result is the best-so-far (route, distance); the last one has stop_reason set.
+    """
+    started = time.perf_counter()
+    run = RouteGARun(start, disposal, required, population_size, mutation_rate, cache, graph, operators)
+    target = -target_cost if target_cost is not None else None
+    return iterate(run, _python_rng(seed), generations, deadline_ms, patience, target, started)
+
+
+def route_island_run(graph, start, disposal, required, population_size, mutation_rate, operators="erx"):
+    # Island worker factory (each worker process uses its own shared_cache())
+    return RouteGARun(start, disposal, required, population_size, mutation_rate, graph=graph, operators=operators)
 
-NETWORK = {
-    "Source": ["Inspection A", "Inspection B", "Inspection C", "Node W"],
-    "Inspection A": ["Node X"],
-    "Inspection B": ["Node Y"],
-    "Inspection C": ["Node Z"],
-    "Node X": ["Disposal A"],
-    "Node Y": ["Disposal B"],
-    "Node Z": ["Disposal C"],
-    "Node W": ["Disposal A", "Disposal B", "Disposal C"],
-    "Disposal A": [], "Disposal B": [], "Disposal C": []
+
+def ga_optimize_route_islands(start, disposal, required=None, population_size=30, generations=40, mutation_rate=0.2,
+                              n_islands=4, migration_interval=5, n_migrants=2, seed=None, max_workers=None, graph=None,
+                              operators="erx"):
+    """
+    Island-model ga_optimize_route: n_islands populations evolve in a process pool and
+    exchange their best routes every migration_interval generations. A fixed seed gives
+    reproducible results.
+    """
+    args = (compile_network(graph) if graph is not None else GRAPH, start, disposal, required, population_size, mutation_rate,
+            operators)
+    return run_islands(route_island_run, args, generations, n_islands, migration_interval,
+                       n_migrants, seed, max_workers)
+
+# Waste type -> (mandatory inspection node, disposal node)
+DISPOSAL_RULES = {
+    "Flammable": ("Inspection A", "Disposal A"),
+    "Corrosive": ("Inspection B", "Disposal B"),
+    "Toxic": ("Inspection C", "Disposal C"),
 }
+DEFAULT_RULE = (None, "Disposal A")
+
+def disposal_rule(waste_type):
+    # Accepts classifier labels ("Toxic") and WasteType values ("toxic")
+    return DISPOSAL_RULES.get(str(waste_type).capitalize(), DEFAULT_RULE)
 
-def find_all_routes(graph, start, end, path=None):
-    if path is None:
-        path = []
-    path = path + [start]
-    if start == end:
-        return [path]
-    if start not in graph:
-        return []
-    routes = []
-    for node in graph[start]:
-        if node not in path:
-            newroutes = find_all_routes(graph, node, end, path)
-            for nr in newroutes:
-                routes.append(nr)
-    return routes
-
-def optimize_route(waste_type):
+def optimize_route(waste_type, seed=None, store=None, operators="erx"):
     """
     Uses a true genetic algorithm to find the best route from Source to the correct Disposal node.
+    seed, store and operators are passed on to ga_optimize_route.
+    """
+    required, disposal = disposal_rule(waste_type)
+    best_route, cost = ga_optimize_route("Source", disposal, required, seed=seed, store=store, operators=operators)
+    return best_route, cost
+
+def exact_optimize_route(waste_type, index=None):
+    """
+    Optimal route from Source to the correct Disposal node via the mandatory inspection,
+    avoiding edges restricted for the waste type. Returns (None, inf) if there is none.
+    With a key_index.KeyNodeIndex of GRAPH the inspection is chosen by index lookups and
+    only the chosen legs are expanded into nodes.
+    """
+    required, disposal = disposal_rule(waste_type)
+    if index is None:
+        return shortest_constrained_path(GRAPH, "Source", disposal, required, waste_type)
+    routes = index.macro_routes("Source", disposal, waste_type, required)
+    if not routes:
+        return None, float("inf")
+    macro, distance, _ = routes[0]
+    return index.expand(macro, waste_type), distance
+
+def alternative_routes(waste_type):
+    """
+    Lazily yields feasible (route, cost) pairs in increasing cost (Yen's k-shortest paths).
+    Take as many as needed, e.g. itertools.islice(alternative_routes("Toxic"), 3).
     """
-    if waste_type == "Flammable":
-        required = "Inspection A"
-        disposal = "Disposal A"
-    elif waste_type == "Corrosive":
-        required = "Inspection B"
-        disposal = "Disposal B"
-    elif waste_type == "Toxic":
-        required = "Inspection C"
-        disposal = "Disposal C"
-    else:
-        required = None
-        disposal = "Disposal A"
-    best_route, cost = ga_optimize_route("Source", disposal, required)
-    return best_route, cost
\ No newline at end of file
+    required, disposal = disposal_rule(waste_type)
+    return k_shortest_constrained_paths(GRAPH, "Source", disposal, required, waste_type)
@@ -0,0 +1,401 @@
+# Headless HTTP service for classification and routing
+# A dependency-free ASGI application (runs under uvicorn or any ASGI server) plus a small
+# asyncio HTTP/1.1 server for environments without one. GA runs go to a process pool
+# whose workers build their optimizer once and keep the network and fitness cache warm;
+# identical requests that arrive while one is already running share its result.
+#
+#   python app/service.py [--host 127.0.0.1] [--port 8000] [--workers N] [--result-store results.sqlite]
+#
+# Endpoints (JSON in, JSON out):
+#   GET  /health          -> {"status": "ok", "in_flight": n}
+#   GET  /metrics         -> stage timers and counters of the service and its GA workers (JSON)
+#   GET  /metrics/prometheus -> the same in Prometheus text format
+#   POST /classify        {"pH", "flash_point", "toxicity"} -> {"category"}
+#   POST /classify/batch  {"pH": [...], "flash_point": [...], "toxicity": [...]} -> {"categories": [...]}
+#   POST /optimize        {"source", "destination", "waste_type" | pH/flash_point/toxicity,
+#                          "quantity", "capacity", "start_time", "latest_departure", "deadline_ms", "seed",
+#                          "hazard" | pH/flash_point/toxicity}
+#                         -> route, scores and per-stop ETA schedule
+#   POST /risk/batch      {"pH": [...], "flash_point": [...], "toxicity": [...]} -> {"risk": [...], "levels": [...]}
+
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, Union
+
+import metrics
+from compiled_graph import compile_network
+from genetic_algorithm_advanced import (DEFAULT_NETWORK, AdvancedRouteOptimizer, OptimizationRequest, Vehicle,
+                                        WasteClassification)
+from result_store import ResultStore
+from fuzzy_risk import fuzzy_risk, fuzzy_risk_batch, risk_levels
+from waste_classifier import classify_waste, classify_waste_batch
+
+MAX_BODY_BYTES = 50 * 2**20
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Per-worker optimizer, created by _init_worker
+_OPTIMIZER: Optional[AdvancedRouteOptimizer] = None
+
+
+def _init_worker(network, ga_params, result_store=None):
+    global _OPTIMIZER
+    _OPTIMIZER = AdvancedRouteOptimizer(ga_params)
+    _OPTIMIZER.network = network
+    if result_store is not None:
+        _OPTIMIZER.result_store = ResultStore(result_store)
+
+
+def _optimize(params: Dict) -> Dict:
+    # Runs in a pool worker; params is the normalized /optimize body
+    request = OptimizationRequest(
+        source_location=params["source"],
+        destination_location=params["destination"],
+        waste_classification=WasteClassification(params["waste_type"], params["quantity"], hazard=params["hazard"]),
+        vehicle=Vehicle(params["capacity"]),
+        start_time=params["start_time"],
+        latest_departure=params["latest_departure"],
+    )
+    result = _OPTIMIZER.optimize(request, deadline_ms=params["deadline_ms"], seed=params["seed"])
+    labels = dict(zip(_OPTIMIZER.graph.names, _OPTIMIZER.graph.labels))
+    return {
+        "route": result.route,
+        "route_names": [labels[n] for n in result.route],
+        "fitness": result.fitness,
+        "total_distance": result.total_distance,
+        "total_cost": result.total_cost,
+        "total_risk": result.total_risk,
+        "penalty": result.penalty,
+        "generations": result.generations,
+        "departure_time": result.departure_time,
+        "duration": result.duration,
+        "schedule": [dict(stop, name=labels[stop["node"]]) for stop in result.schedule],
+    }
+
+
+def _run_captured(collect, fn, *args):
+    # Runs fn in a pool worker or thread; returns (result, snapshot of the metrics stages
+    # it recorded, or None), so stages recorded in other processes reach the service
+    if not collect:
+        return fn(*args), None
+    with metrics.capture() as breakdown:
+        result = fn(*args)
+    return result, breakdown.snapshot()
+
+
+def _number(body, field, default=None):
+    value = body.get(field, default)
+    if value is None:
+        raise HTTPError(400, f"Missing field: {field}")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Field {field} must be a number")
+    if not math.isfinite(value):
+        raise HTTPError(400, f"Field {field} must be finite")
+    return value
+
+
+class RoutingService:
+    """
+    ASGI application. Call start() (or let the ASGI lifespan do it) before serving;
+    with processes=False the GA runs on threads, which is handy for local testing.
+    result_store is the path of a result_store.ResultStore file shared by all workers.
+    With collect_metrics, the service's own Metrics (self.metrics, served on /metrics)
+    collects the handler timings and the stages of every run in the executor.
+    """
+
+    def __init__(self, network=None, ga_params=None, max_workers=None, processes=True, collect_metrics=True,
+                 result_store=None):
+        self.metrics = metrics.Metrics(enabled=collect_metrics)
+        self.graph = compile_network(network if network is not None else DEFAULT_NETWORK)
+        self.ga_params = ga_params
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processes = processes
+        self.result_store = result_store
+        self.executor = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics_json,
+            ("GET", "/metrics/prometheus"): self.metrics_prometheus,
+            ("POST", "/classify"): self.classify,
+            ("POST", "/classify/batch"): self.classify_batch,
+            ("POST", "/risk/batch"): self.risk_batch,
+            ("POST", "/optimize"): self.optimize,
+        }
+
+    def start(self):
+        if self.executor is None:
+            if self.processes:
+                # Spawned (not forked) workers do not inherit the server's client sockets,
+                # which would otherwise keep finished connections open
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context("spawn"),
+                                                    initializer=_init_worker,
+                                                    initargs=(self.graph, self.ga_params, self.result_store))
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                   initargs=(self.graph, self.ga_params, self.result_store))
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    # --- endpoints ---
+
+    async def health(self, body):
+        return {"status": "ok", "in_flight": len(self._in_flight)}
+
+    async def metrics_json(self, body):
+        # Handler timings ("http /optimize" includes the GA) plus the stages and counters
+        # recorded by the workers
+        return self.metrics.snapshot()
+
+    async def metrics_prometheus(self, body):
+        return self.metrics.to_prometheus()
+
+    async def classify(self, body):
+        return {"category": classify_waste(_number(body, "pH"), _number(body, "flash_point"),
+                                           str(body.get("toxicity", "")))}
+
+    async def classify_batch(self, body):
+        columns = [body.get(c) for c in ("pH", "flash_point", "toxicity")]
+        if any(not isinstance(c, list) for c in columns) or len({len(c) for c in columns}) != 1:
+            raise HTTPError(400, "pH, flash_point and toxicity must be lists of equal length")
+        try:
+            categories = await self._run(None, lambda: classify_waste_batch(*columns).astype(str).tolist())
+        except (TypeError, ValueError):
+            raise HTTPError(400, "pH and flash_point must be numbers")
+        return {"categories": categories}
+
+    async def risk_batch(self, body):
+        columns = [body.get(c) for c in ("pH", "flash_point", "toxicity")]
+        if any(not isinstance(c, list) for c in columns) or len({len(c) for c in columns}) != 1:
+            raise HTTPError(400, "pH, flash_point and toxicity must be lists of equal length")
+        try:
+            risk, levels = await self._run(None, lambda: (fuzzy_risk_batch(*columns), risk_levels(*columns)))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "pH and flash_point must be numbers")
+        return {"risk": risk.tolist(), "levels": levels.astype(str).tolist()}
+
+    def _hazard(self, body):
+        # Explicit fuzzy risk, else inferred from the sample properties when all are given
+        if body.get("hazard") is not None:
+            return _number(body, "hazard")
+        if all(body.get(c) is not None for c in ("pH", "flash_point", "toxicity")):
+            return fuzzy_risk(_number(body, "pH"), _number(body, "flash_point"), str(body["toxicity"]))
+        return None
+
+    async def optimize(self, body):
+        waste_type = body.get("waste_type")
+        if waste_type is None:
+            waste_type = (await self.classify(body))["category"]
+        params = {
+            "source": body.get("source", "source"),
+            "destination": body.get("destination", "disposal"),
+            "waste_type": str(waste_type).lower(),
+            "quantity": _number(body, "quantity"),
+            "capacity": _number(body, "capacity"),
+            "start_time": _number(body, "start_time", 8),
+            "latest_departure": _number(body, "latest_departure") if body.get("latest_departure") is not None else None,
+            "deadline_ms": _number(body, "deadline_ms") if body.get("deadline_ms") is not None else None,
+            "seed": int(_number(body, "seed")) if body.get("seed") is not None else None,
+            "hazard": self._hazard(body),
+        }
+        if not isinstance(params["source"], str) or not isinstance(params["destination"], str):
+            raise HTTPError(400, "source and destination must be node names")
+        if params["source"] not in self.graph.index or params["destination"] not in self.graph.index:
+            raise HTTPError(400, "Unknown source or destination location!")
+        if params["quantity"] > params["capacity"]:
+            raise HTTPError(400, "Vehicle capacity exceeded!")
+        return await self._coalesced(params)
+
+    async def _run(self, executor, fn, *args):
+        # fn(*args) in an executor (None = the loop's default thread pool); the stages it
+        # records are merged into self.metrics
+        result, snapshot = await asyncio.get_running_loop().run_in_executor(
+            executor, _run_captured, self.metrics.enabled, fn, *args)
+        if snapshot is not None:
+            self.metrics.merge(snapshot)
+        return result
+
+    async def _coalesced(self, params):
+        # Identical in-flight requests await one pool task
+        key = json.dumps(params, sort_keys=True)
+        future = self._in_flight.get(key)
+        if future is None:
+            self.start()
+            future = asyncio.ensure_future(self._run(self.executor, _optimize, params))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        try:
+            return await asyncio.shield(future)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+    # --- ASGI ---
+
+    async def handle(self, method: str, path: str, raw: bytes) -> Tuple[int, Union[Dict, str]]:
+        # Payloads are JSON objects, or plain text (str) for the Prometheus exposition
+        path = path.rstrip("/") or "/"
+        handler = self._routes.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in self._routes):
+                return 405, {"error": "Method not allowed"}
+            return 404, {"error": "Not found"}
+        try:
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+            with self.metrics.timer(f"http {path}"):
+                return 200, await handler(body)
+        except json.JSONDecodeError:
+            return 400, {"error": "Invalid JSON"}
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            # Anything else is a bug or a failed worker; the client still gets a response
+            return 500, {"error": f"Internal error: {type(e).__name__}"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    self.start()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.stop()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        raw = b""
+        while True:
+            message = await receive()
+            raw += message.get("body", b"")
+            if len(raw) > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Request body too large"}
+                break
+            if not message.get("more_body"):
+                status, payload = await self.handle(scope["method"], scope["path"], raw)
+                break
+        data, content_type = _encode(payload)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type.encode()),
+                                (b"content-length", str(len(data)).encode())]})
+        await send({"type": "http.response.body", "body": data})
+
+
+def _encode(payload) -> Tuple[bytes, str]:
+    if isinstance(payload, str):
+        return payload.encode(), "text/plain; version=0.0.4"
+    return json.dumps(payload).encode(), "application/json"
+
+
+class InProcessClient:
+    # Calls an ASGI app directly, without sockets: status, body = await client.post(path, json)
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, json_body=None):
+        raw = json.dumps(json_body).encode() if json_body is not None else b""
+        scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b""}
+        sent = False
+        messages = []
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {"type": "http.disconnect"}
+            sent = True
+            return {"type": "http.request", "body": raw, "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send)
+        status = messages[0]["status"]
+        body = b"".join(m.get("body", b"") for m in messages[1:])
+        if dict(messages[0]["headers"])[b"content-type"] != b"application/json":
+            return status, body.decode()
+        return status, json.loads(body)
+
+    async def get(self, path):
+        return await self.request("GET", path)
+
+    async def post(self, path, json_body):
+        return await self.request("POST", path, json_body)
+
+
+async def serve(service: RoutingService, host="127.0.0.1", port=8000):
+    # Minimal HTTP/1.1 front end (one request per connection) for running without an ASGI server
+    async def on_connection(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if len(request_line) < 2:
+                status, payload = 400, {"error": "Invalid request"}
+            elif length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Request body too large"}
+            else:
+                raw = await reader.readexactly(length) if length else b""
+                status, payload = await service.handle(request_line[0], request_line[1].split("?")[0], raw)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {"error": "Invalid request"}
+        try:
+            data, content_type = _encode(payload)
+            writer.write(f"HTTP/1.1 {status} \r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    service.start()
+    server = await asyncio.start_server(on_connection, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--result-store", default=None, help="SQLite file of stored optimizer results")
+    args = parser.parse_args()
+    service = RoutingService(max_workers=args.workers, result_store=args.result_store)
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    if uvicorn is not None:
+        uvicorn.run(service, host=args.host, port=args.port)
+    else:
+        asyncio.run(serve(service, args.host, args.port))
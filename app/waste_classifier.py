@@ -1,22 +1,93 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+CATEGORIES = ["Flammable", "Corrosive", "Toxic", "General"]
+DEFAULT_CATEGORY = "General"
+
+# Canonical rule table, checked in order (first match wins).
+# Each rule takes array-like pH, flash point and lower-cased toxicity and returns a bool mask.
+RULES = [
+    ("Flammable", lambda pH, flash_point, toxicity: flash_point < 37),
+    ("Corrosive", lambda pH, flash_point, toxicity: (pH < 3) | (pH > 11)),
+    ("Toxic", lambda pH, flash_point, toxicity: toxicity == "high"),
+]
+
+# Manifest column names used for DataFrame and file input
+COLUMNS = ("pH", "flash_point", "toxicity")
+
+
+def _normalize_toxicity(toxicity) -> np.ndarray:
+    # Lower-case only the distinct labels, then broadcast back
+    codes, labels = pd.factorize(pd.Series(toxicity, copy=False).astype(str), sort=False)
+    lowered = np.array([label.strip().lower() for label in labels] + [""], dtype=object)
+    return lowered[codes]  # code -1 (missing) maps to ""
+
+
+def classify_waste_batch(pH, flash_point=None, toxicity=None, columns=COLUMNS):
+    """
+    Vectorized classify_waste over arrays, or over a DataFrame with pH, flash_point and
+    toxicity columns. Returns a categorical Series (aligned to the DataFrame index) for
+    DataFrame input, otherwise a pandas Categorical.
+    """
+    with metrics.timer("classify"):
+        return _classify_batch(pH, flash_point, toxicity, columns)
+
+
+def _classify_batch(pH, flash_point, toxicity, columns):
+    index = None
+    if isinstance(pH, pd.DataFrame):
+        frame = pH
+        index = frame.index
+        pH, flash_point, toxicity = (frame[c] for c in columns)
+    pH = np.asarray(pH, dtype=float)
+    flash_point = np.asarray(flash_point, dtype=float)
+    toxicity = _normalize_toxicity(toxicity)
+    conditions = [rule(pH, flash_point, toxicity) for _, rule in RULES]
+    codes = np.select(conditions, list(range(len(RULES))), default=CATEGORIES.index(DEFAULT_CATEGORY))
+    result = pd.Categorical.from_codes(codes, categories=CATEGORIES)
+    if index is not None:
+        return pd.Series(result, index=index, name="category")
+    return result
+
+
 def classify_waste(pH, flash_point, toxicity):
     """
     Classifies hazardous waste based on pH, flash point, and toxicity.
     Returns: 'Flammable', 'Corrosive', 'Toxic', or 'General'
     """
-    if flash_point < 37:
-        return "Flammable"
-    elif pH < 3 or pH > 11:
-        return "Corrosive"
-    elif toxicity.lower() == "high":
-        return "Toxic"
-    else:
-        return "General"
-def classify_waste(pH, flash_point, toxicity):
-    if flash_point < 37:
-        return "Flammable"
-    elif pH < 3 or pH > 11:
-        return "Corrosive"
-    elif toxicity.lower() == "high":
-        return "Toxic"
+    return classify_waste_batch([pH], [flash_point], [toxicity])[0]
+
+
+def iter_classified_chunks(path, chunksize=100_000, columns=COLUMNS):
+    """
+    Streams a CSV or Parquet manifest file in chunks of at most `chunksize` rows and
+    yields each chunk with an added 'category' column, so memory stays bounded.
+    """
+    if str(path).lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet manifests requires pyarrow") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            chunk["category"] = classify_waste_batch(chunk, columns=columns)
+            yield chunk
     else:
-        return "General"
\ No newline at end of file
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            chunk["category"] = classify_waste_batch(chunk, columns=columns)
+            yield chunk
+
+
+def classify_waste_file(path, output_path=None, chunksize=100_000, columns=COLUMNS):
+    """
+    Classifies a whole manifest file chunk by chunk. If output_path is given the
+    classified rows are appended to it as CSV. Returns the count per category.
+    """
+    counts = pd.Series(0, index=CATEGORIES, dtype="int64")
+    for i, chunk in enumerate(iter_classified_chunks(path, chunksize, columns)):
+        counts += chunk["category"].value_counts().reindex(CATEGORIES, fill_value=0)
+        if output_path is not None:
+            chunk.to_csv(output_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return counts
@@ -0,0 +1,49 @@
+# Island-model GA speedup versus island count
+# Each island evolves a full population, so n islands do n times the work of one run;
+# the table compares wall time in the process pool against running the islands serially.
+#
+#   python benchmarks/bench_islands.py [--nodes 2000] [--population 500] [--generations 60]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from genetic_algorithm_advanced import (AdvancedRouteOptimizer, OptimizationRequest, Vehicle,
+                                        WasteClassification)
+from networks import endpoints, knn_network
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=2000)
+    parser.add_argument("--population", type=int, default=500)
+    parser.add_argument("--generations", type=int, default=60)
+    parser.add_argument("--islands", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    network = knn_network(args.nodes)
+    # No fitness cache: forked workers would inherit whatever the serial runs memoized
+    optimizer = AdvancedRouteOptimizer({"population_size": args.population, "generations": args.generations,
+                                        "use_cache": False})
+    optimizer.network = network
+    source, dest = endpoints(optimizer.graph)
+    request = OptimizationRequest(source, dest, WasteClassification("general", 10), Vehicle(100))
+    optimizer.optimize_islands(request, n_islands=1, seed=0)  # warm up compilation and caches
+
+    print(f"cpus={os.cpu_count()} nodes={args.nodes} population={args.population} generations={args.generations}")
+    print(f"{'islands':>7} {'serial s':>9} {'pool s':>8} {'speedup':>8} {'fitness':>10}")
+    for n in args.islands:
+        started = time.perf_counter()
+        optimizer.optimize_islands(request, n_islands=n, seed=0, max_workers=0)
+        serial = time.perf_counter() - started
+        started = time.perf_counter()
+        result = optimizer.optimize_islands(request, n_islands=n, seed=0)
+        pooled = time.perf_counter() - started
+        print(f"{n:>7} {serial:>9.2f} {pooled:>8.2f} {serial / pooled:>8.2f} {result.fitness:>10.5f}")
+
+
+if __name__ == "__main__":
+    main()
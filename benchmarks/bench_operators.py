@@ -0,0 +1,105 @@
+# Convergence of the legacy route GA per CPU-second for each operator set
+# Every set runs on the same networks, endpoints and required inspection node for the
+# same CPU budget; the table shows the gap of the best feasible route (real edges only,
+# through the inspection) to the exact constrained optimum in the initial population
+# ("gen 0") and at a few CPU-time checkpoints ("-" = no feasible route yet). The repaired
+# sets splice shortest paths into the broken legs of their initial routes and insert the
+# inspection where it is cheapest, so their generation-0 gap shows how much of the
+# result comes from the repair rather than from evolution. The legacy
+# operators rarely produce a feasible route at all on larger networks.
+#
+#   python benchmarks/bench_operators.py [--nodes 200 1000] [--budget 4] [--seeds 3] [--no-inspection]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from compiled_graph import compile_network
+from fitness_cache import FitnessCache
+from ga_operators import OPERATOR_SETS
+from networks import endpoints, knn_network
+from path_solver import shortest_constrained_path, shortest_path_tree
+from route_optimizer import ga_optimize_route_iter
+
+
+def inspection_node(graph, source, dest, seed=0):
+    # A node off the shortest source -> dest path whose detour costs 5-50% extra
+    allowed = np.isfinite(graph.distance)
+    to = shortest_path_tree(graph, graph.index[source], graph.distance, allowed)[0]
+    back = shortest_path_tree(graph, graph.index[dest], graph.distance, allowed, reverse=True)[0]
+    via = to + back
+    direct = to[graph.index[dest]]
+    candidates = np.flatnonzero((via > 1.05 * direct) & (via < 1.5 * direct))
+    if not len(candidates):
+        candidates = [int(np.argmin(np.where(via > direct, via, np.inf)))]
+    return graph.names[int(np.random.default_rng(seed).choice(candidates))]
+
+
+def convergence(graph, source, dest, required, operators, budget_s, seed, population_size, mutation_rate):
+    # [(CPU seconds, best feasible distance so far, generation)] after every generation
+    trace, best = [], np.inf
+    started = time.process_time()
+    progress_iter = ga_optimize_route_iter(source, dest, required, population_size, 10**6, mutation_rate,
+                                           cache=FitnessCache(), graph=graph, operators=operators, seed=seed)
+    for progress in progress_iter:
+        route, distance = progress.result
+        ids = graph.ids(route)
+        if (graph.edge_ids(ids[:-1], ids[1:]) >= 0).all() and (required is None or required in route):
+            best = min(best, distance)
+        trace.append((time.process_time() - started, best, progress.generation))
+        if trace[-1][0] >= budget_s:
+            break
+    return trace
+
+
+def at(trace, seconds):
+    # Best distance and generation count at a CPU-time checkpoint
+    found = [(best, generation) for t, best, generation in trace if t <= seconds]
+    return found[-1] if found else (np.inf, 0)
+
+
+def cell(traces, optimum, pick):
+    # Mean gap over the seeds that have a feasible route, and how many do
+    gaps = np.maximum([pick(trace) / optimum - 1 for trace in traces], 0.0)  # no -0.000 from rounding
+    feasible = np.isfinite(gaps)
+    mean = f"{gaps[feasible].mean():.3f}" if feasible.any() else "-"
+    return f"{mean} ({feasible.sum()}/{len(traces)})"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--operators", nargs="+", default=list(OPERATOR_SETS))
+    parser.add_argument("--budget", type=float, default=4.0, help="CPU seconds per run")
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--population", type=int, default=30)
+    parser.add_argument("--mutation-rate", type=float, default=0.2)
+    parser.add_argument("--no-inspection", action="store_true", help="route without a required inspection node")
+    args = parser.parse_args()
+
+    checkpoints = [s for s in (0.1, 0.25, 0.5, 1, 2, 4, 8, 16) if s <= args.budget]
+    print(f"population={args.population} budget={args.budget}s seeds={args.seeds}; cells are mean gap to optimum "
+          f"(feasible runs / seeds)")
+    for n_nodes in args.nodes:
+        graph = compile_network(knn_network(n_nodes))
+        source, dest = endpoints(graph)
+        required = None if args.no_inspection else inspection_node(graph, source, dest)
+        _, optimum = shortest_constrained_path(graph, source, dest, required)
+        print(f"\nnodes={n_nodes} {source} -> {required or '-'} -> {dest} optimum={optimum:.2f}")
+        print(f"{'operators':>9} {'gen 0':>14} " + " ".join(f"{f'{s}s':>14}" for s in checkpoints) + f" {'gen/s':>7}")
+        for operators in args.operators:
+            traces = [convergence(graph, source, dest, required, operators, args.budget, seed, args.population,
+                                  args.mutation_rate) for seed in range(args.seeds)]
+            cells = [cell(traces, optimum, lambda trace: trace[0][1])]
+            cells += [cell(traces, optimum, lambda trace: at(trace, s)[0]) for s in checkpoints]
+            rate = np.mean([trace[-1][2] / trace[-1][0] for trace in traces])
+            print(f"{operators:>9} " + " ".join(f"{c:>14}" for c in cells) + f" {rate:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Synthetic depot networks for the benchmarks
+# Nodes are random points in a square; each is joined to its k nearest neighbours, which
+# gives a sparse, planar-ish road network. A few edges are restricted per waste type.
+
+import numpy as np
+
+WASTE_TYPES = ("flammable", "toxic", "corrosive")
+
+
+def knn_network(n_nodes, k=4, seed=0, extent_km=100.0, restricted_share=0.02):
+    """
+    Network description (as accepted by compile_network) with n_nodes waypoints.
+    Time windows are left open so the GA objective matches the exact shortest path.
+    """
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, extent_km, (n_nodes, 2))
+    nodes = {f"n{i}": {"name": f"Node {i}", "type": "waypoint", "time_window": (0, 1e9)} for i in range(n_nodes)}
+    k = min(k, n_nodes - 1)
+    risk = rng.uniform(0, 1, (n_nodes, k))
+    weather = rng.uniform(0, 1, (n_nodes, k))
+    restricted = rng.random((n_nodes, k, len(WASTE_TYPES))) < restricted_share
+    distances = {}
+    # Nearest neighbours in blocks of rows to bound the n x n distance matrix
+    for lo in range(0, n_nodes, 1024):
+        rows = xy[lo:lo + 1024]
+        squared = (rows ** 2).sum(axis=1)[:, None] + (xy ** 2).sum(axis=1)[None, :] - 2 * rows @ xy.T
+        squared[np.arange(len(rows)), np.arange(lo, lo + len(rows))] = np.inf
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        for r, row in enumerate(nearest):
+            i = lo + r
+            for c, j in enumerate(row):
+                distances[(f"n{i}", f"n{j}")] = {
+                    "distance": float(np.hypot(*(xy[i] - xy[j]))),
+                    "risk": float(risk[i, c]),
+                    "weather": float(weather[i, c]),
+                    "restricted": [t for t, on in zip(WASTE_TYPES, restricted[i, c]) if on],
+                }
+    return {"directed": False, "nodes": nodes, "distances": distances}
+
+
+def endpoints(graph, seed=0):
+    # A connected (source, destination) pair of node names, far apart when possible
+    from path_solver import shortest_path_tree
+    rng = np.random.default_rng(seed)
+    allowed = np.ones(graph.n_edges, dtype=bool)
+    for _ in range(20):
+        source = int(rng.integers(graph.n_nodes))
+        dist = shortest_path_tree(graph, source, graph.distance, allowed)[0]
+        reachable = np.flatnonzero(np.isfinite(dist))
+        if len(reachable) > 1:
+            return graph.names[source], graph.names[int(reachable[np.argmax(dist[reachable])])]
+    raise ValueError("network has no connected pair of nodes")
@@ -0,0 +1,228 @@
+# Benchmark runner for the classifier, fuzzy risk scoring, route evaluation and both GAs
+# Reports wall time, throughput, peak traced memory and (for the GAs) the gap to the
+# exact optimum, and writes everything to JSON so runs can be diffed between commits.
+#
+#   python benchmarks/run_benchmarks.py                      # full run
+#   python benchmarks/run_benchmarks.py --quick              # small sizes only
+#   python benchmarks/run_benchmarks.py --suite classify ga_advanced --output new.json
+#   python benchmarks/run_benchmarks.py --compare old.json   # ratios against an earlier run
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from compiled_graph import compile_network
+from distance_matrix import get_distance
+from fitness_cache import FitnessCache
+from fuzzy_risk import fuzzy_risk_batch
+from genetic_algorithm_advanced import (AdvancedRouteOptimizer, OptimizationRequest, Vehicle,
+                                        WasteClassification)
+from networks import endpoints, knn_network
+from path_solver import shortest_constrained_path
+from route_optimizer import ga_optimize_route
+from waste_classifier import classify_waste_batch
+
+FULL = {
+    "classify_rows": [10**3, 10**4, 10**5, 10**6, 10**7],
+    "nodes": [10, 100, 1000, 10000],
+    "ga_sizes": [(30, 40), (200, 50), (1000, 100)],
+    "legacy_nodes": [10, 100, 1000],
+    "legacy_sizes": [(30, 40), (100, 100)],
+}
+QUICK = {
+    "classify_rows": [10**3, 10**4, 10**5],
+    "nodes": [10, 100, 1000],
+    "ga_sizes": [(30, 40), (200, 50)],
+    "legacy_nodes": [10, 100],
+    "legacy_sizes": [(30, 40)],
+}
+WASTE_TYPE = "toxic"
+
+
+def measure(fn, repeat=1):
+    # Best wall time over `repeat` untraced runs, then one traced run for peak memory
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return value, {"wall_s": best, "peak_mb": peak / 2**20}
+
+
+_NETWORKS = {}
+
+def network(n_nodes):
+    if n_nodes not in _NETWORKS:
+        description = knn_network(n_nodes, seed=n_nodes)
+        graph = compile_network(description)
+        _NETWORKS[n_nodes] = (description, graph, endpoints(graph, seed=n_nodes))
+    return _NETWORKS[n_nodes]
+
+
+def random_routes(graph, source, n_routes, length, seed=0):
+    # Random walks over existing edges, as node-ID rows
+    rng = np.random.default_rng(seed)
+    nbr, _ = graph.neighbor_table()
+    degree = (nbr >= 0).sum(axis=1)
+    routes = np.empty((n_routes, length), dtype=np.int32)
+    routes[:, 0] = source
+    for k in range(1, length):
+        prev = routes[:, k - 1]
+        routes[:, k] = nbr[prev, (rng.random(n_routes) * degree[prev]).astype(np.int64)]
+    return routes
+
+
+def bench_classify(sizes):
+    rng = np.random.default_rng(0)
+    for rows in sizes["classify_rows"]:
+        pH = rng.uniform(0, 14, rows)
+        flash_point = rng.uniform(0, 200, rows)
+        toxicity = rng.choice(np.array(["Low", "Medium", "High"], dtype=object), rows)
+        _, stats = measure(lambda: classify_waste_batch(pH, flash_point, toxicity), repeat=3)
+        yield {"case": f"rows={rows}", "rows": rows, "rows_per_s": rows / stats["wall_s"], **stats}
+
+
+def bench_fuzzy_risk(sizes):
+    rng = np.random.default_rng(0)
+    for rows in sizes["classify_rows"]:
+        pH = rng.uniform(0, 14, rows)
+        flash_point = rng.uniform(0, 200, rows)
+        toxicity = rng.choice(np.array(["Low", "Medium", "High"], dtype=object), rows)
+        for method in ("centroid", "weighted"):
+            _, stats = measure(lambda: fuzzy_risk_batch(pH, flash_point, toxicity, method=method), repeat=3)
+            yield {"case": f"{method} rows={rows}", "rows": rows, "rows_per_s": rows / stats["wall_s"], **stats}
+
+
+def bench_distance(sizes):
+    for n_nodes in sizes["nodes"]:
+        description, graph, (source, _) = network(n_nodes)
+        routes = random_routes(graph, graph.index[source], 10_000, 20)
+        named = [[graph.names[v] for v in row] for row in routes[:1000]]
+        optimizer = AdvancedRouteOptimizer({"use_cache": False})
+        optimizer.network = graph
+        request = OptimizationRequest(source, source, WasteClassification(WASTE_TYPE, 10), Vehicle(100))
+
+        _, stats = measure(lambda: [get_distance(route, graph) for route in named], repeat=3)
+        yield {"case": f"get_distance nodes={n_nodes}", "nodes": n_nodes,
+               "routes_per_s": len(named) / stats["wall_s"], **stats}
+        _, stats = measure(lambda: [optimizer._calculate_fitness(route, request) for route in named], repeat=3)
+        yield {"case": f"_calculate_fitness nodes={n_nodes}", "nodes": n_nodes,
+               "routes_per_s": len(named) / stats["wall_s"], **stats}
+        _, stats = measure(lambda: optimizer._evaluate_population(routes, WASTE_TYPE), repeat=3)
+        yield {"case": f"_evaluate_population nodes={n_nodes}", "nodes": n_nodes,
+               "routes_per_s": len(routes) / stats["wall_s"], **stats}
+
+
+def bench_ga_advanced(sizes):
+    for n_nodes in sizes["nodes"]:
+        description, graph, (source, dest) = network(n_nodes)
+        for population_size, generations in sizes["ga_sizes"]:
+            optimizer = AdvancedRouteOptimizer({"population_size": population_size, "generations": generations,
+                                                "use_cache": False})
+            optimizer.network = graph
+            request = OptimizationRequest(source, dest, WasteClassification(WASTE_TYPE, 10), Vehicle(100))
+            # The fitness denominator summed per edge; time windows are open on these networks
+            _, optimum = shortest_constrained_path(graph, source, dest, weight=optimizer._edge_weight(WASTE_TYPE))
+            result, stats = measure(lambda: optimizer.optimize(request))
+            objective = 1.0 / result.fitness - 1.0
+            yield {"case": f"nodes={n_nodes} pop={population_size} gen={generations}", "nodes": n_nodes,
+                   "population": population_size, "generations": generations,
+                   "routes_per_s": population_size * result.generations / stats["wall_s"],
+                   "objective": objective, "optimum": optimum, "gap": objective / optimum - 1 if optimum else 0.0,
+                   **stats}
+
+
+def bench_ga_legacy(sizes):
+    for n_nodes in sizes["legacy_nodes"]:
+        description, graph, (source, dest) = network(n_nodes)
+        _, optimum = shortest_constrained_path(graph, source, dest)
+        for population_size, generations in sizes["legacy_sizes"]:
+            result, stats = measure(lambda: ga_optimize_route(source, dest, None, population_size, generations,
+                                                              cache=FitnessCache(), graph=graph))
+            route, distance = result
+            feasible = bool((graph.edge_ids(graph.ids(route[:-1]), graph.ids(route[1:])) >= 0).all())
+            yield {"case": f"nodes={n_nodes} pop={population_size} gen={generations}", "nodes": n_nodes,
+                   "population": population_size, "generations": generations,
+                   "routes_per_s": population_size * generations / stats["wall_s"],
+                   "objective": distance, "optimum": optimum, "feasible": feasible,
+                   "gap": distance / optimum - 1 if feasible and optimum else None, **stats}
+
+
+SUITES = {
+    "classify": bench_classify,
+    "fuzzy_risk": bench_fuzzy_risk,
+    "distance": bench_distance,
+    "ga_advanced": bench_ga_advanced,
+    "ga_legacy": bench_ga_legacy,
+}
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["suite"], r["case"]): r for r in json.load(f)["results"]}
+    print(f"\n{'suite':<12} {'case':<40} {'old s':>9} {'new s':>9} {'ratio':>7}")
+    for r in results:
+        old = baseline.get((r["suite"], r["case"]))
+        if old:
+            print(f"{r['suite']:<12} {r['case']:<40} {old['wall_s']:>9.4f} {r['wall_s']:>9.4f} "
+                  f"{r['wall_s'] / old['wall_s']:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suite", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--output", default=os.path.join(HERE, "results.json"))
+    parser.add_argument("--compare", help="earlier results JSON to compare wall times against")
+    args = parser.parse_args()
+
+    sizes = QUICK if args.quick else FULL
+    results = []
+    for suite in args.suite:
+        for row in SUITES[suite](sizes):
+            row = {"suite": suite, **row}
+            results.append(row)
+            extra = f" gap={row['gap']:.3f}" if row.get("gap") is not None else ""
+            rate = row.get("rows_per_s", row.get("routes_per_s"))
+            print(f"{suite:<12} {row['case']:<40} {row['wall_s']:>9.4f}s {rate:>12.0f}/s "
+                  f"{row['peak_mb']:>8.1f}MB{extra}", flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
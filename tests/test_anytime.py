@@ -0,0 +1,57 @@
+import numpy as np
+
+from anytime import CONVERGED, DEADLINE, GENERATIONS, TARGET, iterate, run_anytime
+from route_optimizer import exact_optimize_route, ga_optimize_route_iter
+
+
+class CountingRun:
+    # Fitness follows a fixed per-generation schedule; the best result is the generation it was found in
+    def __init__(self, schedule):
+        self.schedule = schedule
+
+    def initial_population(self, rng):
+        return 0
+
+    def fitness(self, population):
+        return np.array([self.schedule[min(population, len(self.schedule) - 1)]])
+
+    def step(self, population, fitness, rng):
+        population += 1
+        return population, self.fitness(population)
+
+    def best(self, population, fitness, generation):
+        return generation
+
+
+def test_runs_to_the_generation_limit():
+    steps = list(iterate(CountingRun(list(range(10))), None, 5))
+    assert [p.generation for p in steps] == [0, 1, 2, 3, 4, 5]
+    assert [p.done for p in steps] == [False] * 5 + [True]
+    assert steps[-1].stop_reason == GENERATIONS and steps[-1].fitness == 5.0
+
+
+def test_stops_on_the_deadline_with_the_best_so_far():
+    final = run_anytime(CountingRun(list(range(10))), None, 1000, deadline_ms=0)
+    assert final.stop_reason == DEADLINE
+    assert final.generation == 0 and final.result == 0
+
+
+def test_stops_when_fitness_stops_improving():
+    final = run_anytime(CountingRun([0, 1, 2, 2, 2, 2, 2]), None, 100, patience=3)
+    assert final.stop_reason == CONVERGED
+    assert final.generation == 5 and final.result == 2 and final.fitness == 2.0
+
+
+def test_stops_once_the_target_is_reached():
+    seen = []
+    final = run_anytime(CountingRun(list(range(10))), None, 100, target=4, callback=seen.append)
+    assert final.stop_reason == TARGET and final.fitness == 4.0
+    assert [p.generation for p in seen] == [0, 1, 2, 3, 4] and seen[-1] is final
+
+
+def test_route_ga_stops_at_the_target_cost():
+    route, cost = exact_optimize_route("Toxic")
+    final = None
+    for final in ga_optimize_route_iter("Source", "Disposal C", "Inspection C", generations=500, target_cost=cost, seed=1):
+        assert final.result[1] >= cost
+    assert final.stop_reason == TARGET and final.result == (route, cost)
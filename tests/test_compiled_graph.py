@@ -0,0 +1,71 @@
+import copy
+
+import numpy as np
+
+from compiled_graph import DENSE_NODE_LIMIT, build_graph, compile_network
+from distance_matrix import GRAPH, get_distance
+from graph_store import regional_network
+
+NETWORK = {
+    "nodes": {n: {"name": n.upper(), "type": "waypoint"} for n in "abcd"},
+    "distances": {
+        ("a", "b"): {"distance": 1, "risk": 0.1, "restricted": ["toxic"]},
+        ("b", "c"): {"distance": 2, "weather": 0.5},
+        ("c", "d"): 3,
+    },
+}
+
+
+def test_undirected_edges_get_both_directions():
+    graph = build_graph(NETWORK)
+    assert graph.n_nodes == 4 and graph.n_edges == 6
+    assert graph.has_edge("a", "b") and graph.has_edge("b", "a")
+    assert not graph.has_edge("a", "c") and not graph.has_edge("a", "nowhere")
+    assert graph.labels == ["A", "B", "C", "D"]
+    assert sorted(graph.neighbors(graph.index["b"]).tolist()) == [0, 2]
+    eid = int(graph.edge_ids(graph.index["c"], graph.index["b"]))
+    assert (graph.distance[eid], graph.weather[eid]) == (2.0, 0.5)
+
+
+def test_directed_edges_go_one_way():
+    graph = build_graph(dict(NETWORK, directed=True))
+    assert graph.n_edges == 3
+    assert graph.has_edge("a", "b") and not graph.has_edge("b", "a")
+
+
+def test_edge_ids_are_vectorized():
+    graph = build_graph(NETWORK)
+    ids = graph.ids(["a", "b", "c", "x"])
+    assert ids.tolist() == [0, 1, 2, -1]
+    eid = graph.edge_ids(ids[:-1], ids[1:])
+    assert (eid[:2] >= 0).all() and eid[2] == -1
+    assert graph.distance[eid[:2]].tolist() == [1.0, 2.0]
+
+
+def test_restrictions():
+    graph = build_graph(NETWORK)
+    ab = int(graph.edge_ids(0, 1))
+    assert graph.blocked("toxic")[ab] and graph.blocked("Toxic")[ab]
+    assert not graph.blocked("flammable").any() and not graph.blocked(None).any()
+
+
+def test_sparse_edge_lookup_matches_the_edge_list():
+    graph = compile_network(regional_network(DENSE_NODE_LIMIT + 500))
+    assert graph.n_nodes > DENSE_NODE_LIMIT
+    rng = np.random.default_rng(0)
+    picks = rng.choice(graph.n_edges, 200, replace=False)
+    assert (graph.edge_ids(graph.sources[picks], graph.indices[picks]) == picks).all()
+    assert (graph.edge_ids(graph.indices[:50], graph.indices[:50]) == -1).all()  # no self-loops
+
+
+def test_compile_network_builds_once_per_description():
+    assert compile_network(NETWORK) is compile_network(NETWORK)
+    assert compile_network(copy.deepcopy(NETWORK)) is not compile_network(NETWORK)
+    graph = compile_network(NETWORK)
+    assert compile_network(graph) is graph
+
+
+def test_get_distance_skips_missing_legs():
+    assert get_distance(["Source", "Inspection C", "Node Z", "Disposal C"]) == 30.0
+    # Missing legs count as 0, as before
+    assert get_distance(["Source", "Node Z", "Disposal C"], GRAPH) == 13.0
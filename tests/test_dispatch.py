@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from compiled_graph import compile_network
+from dispatch import dispatch
+from genetic_algorithm_advanced import Vehicle, WasteClassification
+from graph_store import regional_network
+
+
+def trips(result):
+    return [(vr, trip) for vr in result.vehicle_routes for trip in vr.trips]
+
+
+def test_types_share_trips_case_insensitively_but_never_mix():
+    lots = [WasteClassification("Toxic", 10), WasteClassification("toxic", 10), WasteClassification("Flammable", 10)]
+    result = dispatch(lots, [Vehicle(100)])
+    assert not result.unassigned
+    loads = sorted(sorted(trip.lots) for _, trip in trips(result))
+    assert loads == [[0, 1], [2]]
+    for _, trip in trips(result):
+        assert {str(lots[i].waste_type).lower() for i in trip.lots} == {trip.waste_type.lower()}
+        required, disposal = {"Toxic": ("Inspection C", "Disposal C"),
+                              "Flammable": ("Inspection A", "Disposal A")}[trip.waste_type]
+        assert required in trip.route and trip.route[-1] == disposal
+
+
+def test_trips_respect_vehicle_capacity():
+    lots = [WasteClassification("Toxic", 40) for _ in range(5)] + [WasteClassification("Toxic", 120)]
+    result = dispatch(lots, [Vehicle(100), Vehicle(50)])
+    assert result.unassigned == [(5, "Vehicle capacity exceeded!")]
+    for vr, trip in trips(result):
+        assert trip.load <= vr.vehicle.capacity
+    assert sorted(i for _, trip in trips(result) for i in trip.lots) == list(range(5))
+
+
+@pytest.mark.parametrize("location, reason", [
+    ("Nowhere", "Unknown pickup location"),
+    ("Disposal A", "No permitted route for this waste type"),  # no road leaves Disposal A
+])
+def test_unassigned_lots(location, reason):
+    lots = [WasteClassification("Toxic", 10), WasteClassification("Toxic", 10, location=location)]
+    result = dispatch(lots, [Vehicle(100)])
+    assert result.unassigned == [(1, reason)]
+    assert result.metrics["lots_assigned"] == 1
+
+
+def test_mixed_fleet_shares_the_work():
+    graph = compile_network(regional_network(300))
+    names = graph.names
+    rules = lambda waste_type: {"Toxic": (names[5], names[10])}.get(waste_type, (None, names[12]))
+    rng = random.Random(0)
+    lots = [WasteClassification(rng.choice(["Toxic", "General"]), rng.randint(5, 80), rng.choice(names))
+            for _ in range(200)]
+    result = dispatch(lots, [Vehicle(500), Vehicle(1000), Vehicle(300)], depot=names[0], graph=graph, rules=rules,
+                      time_budget_ms=10_000)
+    assert result.metrics["lots_assigned"] + len(result.unassigned) == 200
+    distances = [vr.distance for vr in result.vehicle_routes]
+    assert all(len(vr.trips) >= 2 for vr in result.vehicle_routes)
+    assert max(distances) < 0.6 * sum(distances)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from fitness_cache import FitnessCache, route_key
+from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, Vehicle, WasteClassification
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FitnessCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # b is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2 and cache.stats()["evictions"] == 1
+
+
+def test_batch_calls_refresh_and_evict():
+    cache = FitnessCache(maxsize=3)
+    cache.put_many([("a", 1), ("b", 2), ("c", 3)])
+    assert cache.get_many(["a", "x"]) == [1, None]
+    cache.put_many([("d", 4), ("e", 5)])
+    assert cache.get_many(["a", "b", "c", "d", "e"]) == [1, None, None, 4, 5]
+
+
+def test_stats_and_get_or_compute():
+    cache = FitnessCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or 0.5) == 0.5
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+    assert stats["hit_rate"] == 2 / 3
+    cache.clear()
+    assert len(cache) == 0 and cache.stats()["hits"] == 0
+
+
+def test_route_keys():
+    assert route_key("ns", [1, 2, 3]) == route_key("ns", np.array([1, 2, 3]))
+    assert route_key("ns", [1, 2, 3]) != route_key("ns", [1, 2, 3], "toxic")
+    assert route_key("ns", [1, 2, 3]) != route_key("other", [1, 2, 3])
+
+
+def test_cached_scores_match_fresh_ones():
+    request = OptimizationRequest("source", "disposal", WasteClassification("toxic", 10), Vehicle(100))
+    fresh = AdvancedRouteOptimizer({"use_cache": False})
+    cached = AdvancedRouteOptimizer(cache=FitnessCache())
+    graph = fresh.graph
+    # Rows are padded with the destination to a common width
+    routes = [["source", "node_1", "node_2", "disposal"], ["source", "inspection_a", "disposal", "disposal"]]
+    population = np.array([graph.ids(r) for r in routes] * 2)
+    expected = fresh._score(population, "toxic", fresh._departures(request))
+    for _ in range(2):
+        scores = cached._score(population, "toxic", cached._departures(request))
+        for name in expected:
+            assert np.allclose(scores[name], expected[name])
+    # Duplicate rows are looked up (and scored) once; the second pass is all hits
+    stats = cached.cache.stats()
+    assert (stats["size"], stats["misses"], stats["hits"]) == (2, 2, 2)
@@ -0,0 +1,58 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fuzzy_risk import edge_exposure, fuzzy_risk_batch, hazard_severity, risk_level, risk_levels
+from genetic_algorithm_advanced import (DEFAULT_NETWORK, AdvancedRouteOptimizer, OptimizationRequest, Vehicle,
+                                        WasteClassification)
+
+
+def counter_level(pH, flash_point, toxicity):
+    # The app's original crisp 0-3 hazard counter
+    risk = ((pH < 3) | (pH > 11)).astype(int) + (flash_point < 37) + (np.char.lower(toxicity) == "high")
+    return np.array(["Low", "Medium", "High"])[np.minimum(risk, 2)]
+
+
+def test_levels_match_the_old_counter_on_a_grid():
+    pH, flash_point, toxicity = np.meshgrid(np.linspace(0, 14, 141), np.linspace(-20, 120, 141),
+                                            np.array(["low", "medium", "high"]), indexing="ij")
+    pH, flash_point, toxicity = pH.ravel(), flash_point.ravel(), toxicity.ravel()
+    levels = np.asarray(risk_levels(pH, flash_point, toxicity))
+    assert (levels == counter_level(pH, flash_point, toxicity)).all()
+
+
+@pytest.mark.parametrize("sample, level", [
+    ((3.0, 8, "medium"), "Medium"),
+    ((11.1, 29, "low"), "High"),
+    ((3.0, 37, "low"), "Low"),
+    ((11.0, 37, "high"), "Medium"),
+    ((2.999, 36.99, "low"), "High"),
+])
+def test_threshold_samples(sample, level):
+    assert risk_level(*sample) == level
+
+
+def test_levels_of_a_frame_keep_its_index():
+    frame = pd.DataFrame({"pH": [7, 1], "flash_point": [100, 10], "toxicity": ["low", "high"]}, index=[5, 9])
+    levels = risk_levels(frame)
+    assert list(levels.index) == [5, 9] and list(levels) == ["Low", "High"]
+    assert list(fuzzy_risk_batch(frame).index) == [5, 9]
+
+
+def test_hazard_scales_incident_risk_per_edge():
+    assert hazard_severity(None) == hazard_severity(0.5) == 1.0
+    assert (hazard_severity(0.0), hazard_severity(1.0), hazard_severity(7)) == (0.5, 2.0, 2.0)
+    assert edge_exposure(0.3, 0.2, 2.0) == pytest.approx(0.8)
+    optimizer = AdvancedRouteOptimizer({"generations": 5, "population_size": 20})
+    optimizer.network = copy.deepcopy(DEFAULT_NETWORK)
+    route = ["source", "node_1", "node_2", "disposal"]
+    edges = [DEFAULT_NETWORK["distances"][pair] for pair in zip(route[:-1], route[1:])]
+    for hazard, severity in [(None, 1.0), (0.0, 0.5), (1.0, 2.0)]:
+        request = OptimizationRequest("source", "disposal", WasteClassification("toxic", 10, hazard=hazard),
+                                      Vehicle(100))
+        population = optimizer.graph.ids(route)[None, :]
+        scores = optimizer._score(population, "toxic", optimizer._departures(request), optimizer._severity(request))
+        expected = sum(severity * e["risk"] + e["weather"] for e in edges)
+        assert scores["risk"][0] == pytest.approx(expected)
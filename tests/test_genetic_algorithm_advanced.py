@@ -0,0 +1,51 @@
+import copy
+import warnings
+
+import numpy as np
+import pytest
+
+from genetic_algorithm_advanced import (DEFAULT_NETWORK, AdvancedRouteOptimizer, OptimizationRequest, Vehicle,
+                                        WasteClassification)
+
+
+@pytest.fixture
+def optimizer():
+    # Private copy of the default network, so edge updates do not leak into other tests
+    optimizer = AdvancedRouteOptimizer({"generations": 10, "population_size": 20})
+    optimizer.network = copy.deepcopy(DEFAULT_NETWORK)
+    return optimizer
+
+
+def request(**options):
+    return OptimizationRequest("source", "disposal", WasteClassification("toxic", 10), Vehicle(100), **options)
+
+
+def test_seeded_runs_are_reproducible(optimizer):
+    first, second = optimizer.optimize(request(), seed=3), optimizer.optimize(request(), seed=3)
+    assert first.route == second.route and first.fitness == second.fitness
+
+
+def test_closed_source_raises(optimizer):
+    graph = optimizer.graph
+    graph.update_edges({("source", graph.names[v]): {"closed": True} for v in graph.neighbors(graph.index["source"])})
+    with pytest.raises(ValueError):
+        optimizer.optimize(request(), seed=1)
+
+
+def test_routes_avoid_closed_edges(optimizer):
+    # 6 of 14 directed edges stay open; only source -> node_1 -> node_2 -> disposal remains
+    graph = optimizer.graph
+    graph.update_edges({(a, b): {"closed": True} for a, b in [("source", "inspection_a"), ("inspection_a", "node_1"),
+                                                              ("inspection_a", "disposal"), ("source", "node_2")]})
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = optimizer.optimize(request(), seed=1)
+    assert result.route == ["source", "node_1", "node_2", "disposal"]
+    assert np.isfinite(result.total_distance) and result.fitness > 0
+    assert all(np.isfinite(stop["wait"]) for stop in result.schedule)
+
+
+def test_departure_window_is_capped(optimizer):
+    assert len(optimizer._departures(request(start_time=8, latest_departure=1e9))) == 25
+    with pytest.raises(ValueError):
+        optimizer._departures(request(latest_departure=float("inf")))
@@ -0,0 +1,74 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_graph import compile_network
+from graph_store import ARRAYS, graph_from_frames, load_graph, regional_network, save_graph
+
+
+@pytest.fixture(scope="module")
+def region():
+    return regional_network(500, seed=3)
+
+
+@pytest.fixture
+def stored(region, tmp_path):
+    save_graph(region, tmp_path)
+    return tmp_path
+
+
+def test_round_trip_keeps_every_array(region, stored):
+    graph = load_graph(stored)
+    assert (graph.names, graph.labels, graph.directed) == (region.names, region.labels, region.directed)
+    assert list(graph.node_types) == list(region.node_types)
+    for name, dtype in ARRAYS.items():
+        assert getattr(graph, name).dtype == dtype
+        assert np.array_equal(getattr(graph, name), getattr(region, name))
+    # Mapped arrays are views of the files; mmap=False reads them into memory
+    assert isinstance(graph.distance.base, np.memmap) and graph.path == str(stored)
+    assert not isinstance(load_graph(stored, mmap=False).distance.base, np.memmap)
+
+
+def test_updates_stay_in_memory(stored):
+    graph = load_graph(stored)
+    eid = graph.edge_ids(graph.sources[:1], graph.indices[:1])
+    graph.update_edges({(graph.names[graph.sources[0]], graph.names[graph.indices[0]]): {"closed": True}})
+    assert not np.isfinite(graph.distance[eid]).all()
+    assert np.isfinite(load_graph(stored).distance[eid]).all()
+
+
+def test_pickled_graphs_travel_as_their_path(stored):
+    graph = load_graph(stored)
+    assert len(pickle.dumps(graph)) < 1000
+    copy = pickle.loads(pickle.dumps(graph))
+    assert copy.path == graph.path and np.array_equal(copy.distance, graph.distance)
+    graph.update_edges({(graph.names[graph.sources[0]], graph.names[graph.indices[0]]): {"weather": 1.0}})
+    assert pickle.loads(pickle.dumps(graph)).weather[0] == 1.0
+
+
+def test_compile_network_loads_a_directory_once(stored):
+    graph = compile_network(str(stored))
+    assert compile_network(str(stored)) is graph and graph.path == str(stored)
+
+
+def test_unknown_format_is_rejected(stored):
+    meta = json.loads((stored / "meta.json").read_text())
+    (stored / "meta.json").write_text(json.dumps(dict(meta, format=99)))
+    with pytest.raises(ValueError):
+        load_graph(stored)
+
+
+def test_graph_from_frames():
+    edges = pd.DataFrame({"source": ["a", "b"], "target": ["b", "c"], "distance": [1.0, 2.0],
+                          "restricted": ["toxic;Flammable", None]})
+    nodes = pd.DataFrame({"id": ["c"], "name": ["Disposal"], "type": ["disposal"], "open": [6], "close": [20]})
+    graph = graph_from_frames(edges, nodes)
+    assert graph.names == ["c", "a", "b"] and graph.labels == ["Disposal", "a", "b"]
+    assert list(graph.node_types) == ["disposal", "waypoint", "waypoint"]
+    assert (graph.tw_open.tolist(), graph.tw_close.tolist()) == ([6.0, 0.0, 0.0], [20.0, 24.0, 24.0])
+    assert graph.has_edge("b", "a") and graph.n_edges == 4
+    ab = int(graph.edge_ids(graph.index["a"], graph.index["b"]))
+    assert graph.blocked("toxic")[ab] and graph.blocked("flammable")[ab] and not graph.blocked("corrosive")[ab]
@@ -0,0 +1,40 @@
+import pickle
+
+import numpy as np
+
+from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, Vehicle, WasteClassification
+from graph_store import regional_network
+from island_model import _epoch_lengths
+from route_optimizer import GRAPH, ga_optimize_route_islands
+
+
+def test_epoch_lengths_cover_every_generation():
+    assert _epoch_lengths(12, 5) == [5, 5, 2]
+    assert _epoch_lengths(10, 5) == [5, 5]
+    assert _epoch_lengths(3, 0) == [1, 1, 1]
+    assert _epoch_lengths(0, 5) == []
+
+
+def test_seeded_islands_match_serial_and_pooled_runs():
+    graph = regional_network(150)
+    args = dict(population_size=12, generations=6, n_islands=3, migration_interval=2, seed=4, graph=graph)
+    serial = ga_optimize_route_islands("n0", "n149", max_workers=0, **args)
+    pooled = ga_optimize_route_islands("n0", "n149", max_workers=2, **args)
+    assert serial == pooled
+    assert serial[0][0] == "n0" and serial[0][-1] == "n149"
+
+
+def test_advanced_optimizer_islands_are_reproducible():
+    optimizer = AdvancedRouteOptimizer({"generations": 6, "population_size": 12})
+    request = OptimizationRequest("source", "disposal", WasteClassification("toxic", 10), Vehicle(100))
+    serial = optimizer.optimize_islands(request, n_islands=2, migration_interval=3, seed=3, max_workers=0)
+    pooled = optimizer.optimize_islands(request, n_islands=2, migration_interval=3, seed=3, max_workers=2)
+    assert serial.route == pooled.route and serial.fitness == pooled.fitness
+
+
+def test_unpickled_graph_gets_a_fresh_token():
+    copy = pickle.loads(pickle.dumps(GRAPH))
+    assert copy.token != GRAPH.token
+    assert copy.names == GRAPH.names
+    assert np.array_equal(copy.distance, GRAPH.distance) and np.array_equal(copy.indptr, GRAPH.indptr)
+    assert copy._cache == {}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from compiled_graph import compile_network
+from distance_matrix import GRAPH
+from graph_store import regional_network
+from key_index import KeyNodeIndex
+from path_solver import shortest_constrained_path
+from route_optimizer import exact_optimize_route
+
+
+@pytest.fixture(scope="module")
+def region():
+    graph = compile_network(regional_network(3000))
+    return graph, KeyNodeIndex.build(graph)
+
+
+def leg_pairs(index):
+    graph = index.graph
+    for i in index.origins[:4]:
+        for j in index.destinations[:4]:
+            if i != j:
+                yield graph.names[i], graph.names[j]
+
+
+@pytest.mark.parametrize("waste_type", [None, "toxic"])
+def test_stored_paths_match_the_index_and_the_solver(region, waste_type):
+    graph, index = region
+    for a, b in leg_pairs(index):
+        distance, _ = index.segment(a, b, waste_type)
+        _, exact = shortest_constrained_path(graph, a, b, None, waste_type)
+        assert distance == pytest.approx(exact)
+        if np.isfinite(distance):
+            route = index.expand([a, b], waste_type)
+            ids = graph.ids(route)
+            edges = graph.edge_ids(ids[:-1], ids[1:])
+            assert route[0] == a and route[-1] == b
+            assert (edges >= 0).all()
+            assert graph.distance[edges].sum() == pytest.approx(distance)
+
+
+def test_save_and_load_keep_paths(region, tmp_path):
+    graph, index = region
+    index.save(tmp_path)
+    loaded = KeyNodeIndex.load(graph, tmp_path)
+    for a, b in leg_pairs(index):
+        if np.isfinite(index.segment(a, b)[0]):
+            assert loaded.expand([a, b]) == index.expand([a, b])
+
+
+@pytest.mark.parametrize("waste_type", ["Toxic", "Flammable", "Corrosive", "General"])
+def test_indexed_exact_route_matches_the_solver(waste_type):
+    index = KeyNodeIndex.build(GRAPH)
+    assert exact_optimize_route(waste_type, index) == exact_optimize_route(waste_type)
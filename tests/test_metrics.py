@@ -0,0 +1,84 @@
+import threading
+
+from metrics import Metrics
+
+
+def test_disabled_metrics_are_a_no_op():
+    m = Metrics()
+    with m.timer("stage") as t:
+        m.count("events")
+    assert t is None
+    assert m.snapshot() == {"timers": {}, "counters": {}, "gauges": {}}
+
+
+def test_timers_and_counters_aggregate():
+    m = Metrics(enabled=True)
+    for _ in range(3):
+        with m.timer("stage"):
+            pass
+    m.count("events", 5)
+    m.count("events")
+    m.gauge("cache_size", lambda: 7)
+    snap = m.snapshot()
+    assert snap["timers"]["stage"]["calls"] == 3
+    assert snap["timers"]["stage"]["max_ms"] <= snap["timers"]["stage"]["total_ms"]
+    assert snap["counters"] == {"events": 6} and snap["gauges"] == {"cache_size": 7.0}
+    text = m.to_prometheus()
+    assert 'hazwaste_stage_seconds_count{stage="stage"} 3' in text
+    assert "hazwaste_events_total 6" in text and "hazwaste_cache_size 7.0" in text
+    m.reset()
+    assert m.snapshot()["timers"] == {} and m.snapshot()["counters"] == {}
+
+
+def test_capture_records_one_request_while_disabled():
+    m = Metrics()
+    with m.capture(profile=True) as breakdown:
+        with m.timer("classify"):
+            pass
+        for _ in range(2):
+            with m.timer("optimize"):
+                m.count("fitness_evaluations", 10)
+    assert [stage for stage, _ in breakdown.stages] == ["classify", "optimize", "optimize"]
+    assert [(row["stage"], row["calls"]) for row in breakdown.totals()] == [("classify", 1), ("optimize", 2)]
+    assert breakdown.counters == {"fitness_evaluations": 20}
+    assert breakdown.total_ms >= sum(ms for _, ms in breakdown.stages)
+    assert "cumulative" in breakdown.profile
+    # Process totals only grow while metrics are enabled
+    assert m.snapshot()["timers"] == {}
+
+
+def test_captures_are_per_thread():
+    m = Metrics()
+    seen = {}
+
+    def request(name):
+        with m.capture() as breakdown:
+            with m.timer(name):
+                pass
+        seen[name] = [stage for stage, _ in breakdown.stages]
+    threads = [threading.Thread(target=request, args=(name,)) for name in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen == {"a": ["a"], "b": ["b"]}
+
+
+def test_merge_adds_snapshots_from_other_processes():
+    worker = Metrics(enabled=True)
+    with worker.timer("fitness"):
+        pass
+    worker.count("fitness_evaluations", 4)
+    m = Metrics(enabled=True)
+    m.merge(worker.snapshot())
+    m.merge(worker.snapshot())
+    snap = m.snapshot()
+    assert snap["timers"]["fitness"]["calls"] == 2 and snap["counters"] == {"fitness_evaluations": 8}
+    with m.capture() as breakdown:
+        with m.timer("render"):
+            pass
+    m.merge(breakdown.snapshot())
+    assert m.snapshot()["timers"]["render"]["calls"] == 2
+    disabled = Metrics()
+    disabled.merge(worker.snapshot())
+    assert disabled.snapshot()["counters"] == {}
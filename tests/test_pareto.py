@@ -0,0 +1,36 @@
+import numpy as np
+
+from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, Vehicle, WasteClassification
+from pareto import crowded_order, crowding_distance, non_dominated_sort
+
+# A, B, C trade off; B dominates D, which dominates E
+OBJECTIVES = np.array([[1, 5], [2, 3], [4, 1], [3, 4], [5, 5]], dtype=float)
+
+
+def test_ranks():
+    assert non_dominated_sort(OBJECTIVES).tolist() == [0, 0, 0, 1, 2]
+
+
+def test_constraint_violation_dominates_first():
+    rank = non_dominated_sort(OBJECTIVES, violation=np.array([1, 0, 0, 0, 0]))
+    assert rank.tolist() == [3, 0, 0, 1, 2]
+
+
+def test_crowding_distance():
+    rank = non_dominated_sort(OBJECTIVES)
+    crowding = crowding_distance(OBJECTIVES, rank)
+    # B's neighbours span the whole front in both objectives: (4-1)/3 + (5-1)/4
+    assert crowding[1] == 2.0
+    assert np.isinf(crowding[[0, 2, 3, 4]]).all()
+    assert crowded_order(rank, crowding).tolist() == [0, 2, 1, 3, 4]
+
+
+def test_optimize_pareto_returns_a_front():
+    optimizer = AdvancedRouteOptimizer({"generations": 20, "population_size": 30})
+    request = OptimizationRequest("source", "disposal", WasteClassification("general", 10), Vehicle(100))
+    front = optimizer.optimize_pareto(request, seed=0)
+    assert front
+    points = np.array([[r.total_distance, r.total_risk, sum(s["late"] for s in r.schedule)] for r in front])
+    assert (non_dominated_sort(points) == 0).all()
+    assert points[:, 0].tolist() == sorted(points[:, 0])
+    assert all(r.route[0] == "source" and r.route[-1] == "disposal" for r in front)
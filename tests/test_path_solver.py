@@ -0,0 +1,108 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from compiled_graph import build_graph
+from path_solver import k_shortest_constrained_paths, shortest_constrained_path
+from route_optimizer import GRAPH, exact_optimize_route
+
+
+def random_network(seed, n=8, n_edges=16):
+    rng = np.random.default_rng(seed)
+    names = [f"v{i}" for i in range(n)]
+    distances = {}
+    while len(distances) < n_edges:
+        a, b = rng.choice(n, 2, replace=False)
+        distances[(names[a], names[b])] = {"distance": float(rng.integers(1, 10)),
+                                           "restricted": ["toxic"] if rng.random() < 0.2 else []}
+    return {"nodes": {name: {"name": name} for name in names}, "distances": distances}
+
+
+def simple_paths(graph, source, target, required, waste_type):
+    # Every loop-free feasible route with its cost, by exhaustive search (the old find_all_routes)
+    blocked = graph.blocked(waste_type)
+    target = graph.index[target]
+    out = []
+
+    def walk(path, cost):
+        u = path[-1]
+        if u == target:
+            route = [graph.names[v] for v in path]
+            if required is None or required in route:
+                out.append((route, cost))
+            return
+        for v in graph.neighbors(u).tolist():
+            eid = int(graph.edge_ids(u, v))
+            if v not in path and not blocked[eid]:
+                walk(path + [v], cost + graph.distance[eid])
+    walk([graph.index[source]], 0.0)
+    return sorted(out, key=lambda r: r[1])
+
+
+def route_cost(graph, route, waste_type):
+    ids = graph.ids(route)
+    eid = graph.edge_ids(ids[:-1], ids[1:])
+    assert (eid >= 0).all() and not graph.blocked(waste_type)[eid].any()
+    return float(graph.distance[eid].sum())
+
+
+def all_pairs(graph, waste_type):
+    # Floyd-Warshall over the allowed edges
+    dist = np.full((graph.n_nodes, graph.n_nodes), np.inf)
+    np.fill_diagonal(dist, 0.0)
+    allowed = ~graph.blocked(waste_type)
+    dist[graph.sources[allowed], graph.indices[allowed]] = graph.distance[allowed]
+    for k in range(graph.n_nodes):
+        dist = np.minimum(dist, dist[:, k:k + 1] + dist[k:k + 1, :])
+    return dist
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("waste_type", [None, "toxic"])
+def test_shortest_path_is_optimal(seed, waste_type):
+    # Routes may pass a node twice (e.g. out to the inspection and back), so the optimum
+    # is the best source -> inspection -> target combination of shortest paths
+    graph = build_graph(random_network(seed))
+    dist = all_pairs(graph, waste_type)
+    s, r, t = graph.ids(["v0", "v3", "v7"])
+    route, cost = shortest_constrained_path(graph, "v0", "v7", "v3", waste_type)
+    if not np.isfinite(dist[s, r] + dist[r, t]):
+        assert route is None and cost == float("inf")
+        return
+    assert cost == pytest.approx(dist[s, r] + dist[r, t])
+    assert "v3" in route and route_cost(graph, route, waste_type) == pytest.approx(cost)
+    simple = simple_paths(graph, "v0", "v7", "v3", waste_type)
+    assert not simple or cost <= simple[0][1]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_k_shortest_paths_come_in_increasing_cost(seed):
+    graph = build_graph(random_network(seed))
+    found = list(itertools.islice(k_shortest_constrained_paths(graph, "v0", "v7", "v3"), 8))
+    costs = [cost for _, cost in found]
+    assert costs == sorted(costs)
+    assert len({tuple(route) for route, _ in found}) == len(found)
+    for route, cost in found:
+        assert route[0] == "v0" and route[-1] == "v7" and "v3" in route
+        assert route_cost(graph, route, None) == pytest.approx(cost)
+    if found:
+        # No loop-free route cheaper than the last one found is missing
+        simple = {tuple(route) for route, _ in found}
+        expected = [tuple(route) for route, cost in simple_paths(graph, "v0", "v7", "v3", None) if cost < costs[-1]]
+        assert set(expected) <= simple
+
+
+@pytest.mark.parametrize("waste_type, required, disposal", [
+    ("Toxic", "Inspection C", "Disposal C"),
+    ("Flammable", "Inspection A", "Disposal A"),
+])
+def test_exact_route_on_the_depot_network(waste_type, required, disposal):
+    route, cost = exact_optimize_route(waste_type)
+    expected = simple_paths(GRAPH, "Source", disposal, required, waste_type)
+    assert (route, cost) == (expected[0][0], expected[0][1])
+
+
+def test_missing_route():
+    assert shortest_constrained_path(GRAPH, "Disposal A", "Source") == (None, float("inf"))
+    assert list(k_shortest_constrained_paths(GRAPH, "Disposal A", "Source")) == []
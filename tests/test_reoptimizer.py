@@ -0,0 +1,57 @@
+import pytest
+
+from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, Vehicle, WasteClassification
+from reoptimizer import ShipmentRegistry
+
+
+def request(waste_type="toxic"):
+    return OptimizationRequest("source", "disposal", WasteClassification(waste_type, 10), Vehicle(100))
+
+
+@pytest.fixture
+def registry():
+    # toxic: source -> node_1 -> node_2 -> disposal; flammable: source -> node_2 -> disposal
+    registry = ShipmentRegistry(AdvancedRouteOptimizer({"generations": 20, "population_size": 30}))
+    registry.optimize("toxic", request("toxic"), seed=1)
+    registry.optimize("flammable", request("flammable"), seed=1)
+    return registry
+
+
+def test_registry_updates_stay_private(registry):
+    other = AdvancedRouteOptimizer()
+    before = other.graph.version
+    registry.apply_deltas({("source", "node_1"): {"weather": 5.0}})
+    assert other.graph.version == before
+    assert other.graph is not registry.optimizer.graph
+    assert registry.optimizer.graph.version == 1
+
+
+def test_only_affected_shipments_are_rerun(registry, monkeypatch):
+    assert registry.shipments["toxic"].result.route == ["source", "node_1", "node_2", "disposal"]
+    graph = registry.optimizer.graph
+    eid = int(graph.edge_ids(graph.index["node_1"], graph.index["node_2"]))
+    assert registry.affected([eid]) == ["toxic"]
+    flammable = registry.shipments["flammable"].result
+    rerun = []
+    original = registry.reoptimize
+    monkeypatch.setattr(registry, "reoptimize",
+                        lambda shipment_id, **options: rerun.append(shipment_id) or original(shipment_id, **options))
+    results = registry.apply_deltas({("node_1", "node_2"): {"closed": True}})
+    assert rerun == ["toxic"] and list(results) == ["toxic"]
+    route = results["toxic"].route
+    assert route[0] == "source" and route[-1] == "disposal" and "inspection_a" in route
+    assert ("node_1", "node_2") not in zip(route[:-1], route[1:])
+    assert registry.shipments["flammable"].result is flammable
+    assert registry.affected([eid]) == []
+
+
+def test_closing_every_route_raises(registry):
+    with pytest.raises(ValueError):
+        registry.apply_deltas({("source", "inspection_a"): {"closed": True}, ("source", "node_1"): {"closed": True},
+                               ("source", "node_2"): {"closed": True}})
+
+
+def test_remove_clears_the_edge_index(registry):
+    for shipment_id in list(registry.shipments):
+        registry.remove(shipment_id)
+    assert not registry._by_edge and not registry.affected(range(registry.optimizer.graph.n_edges))
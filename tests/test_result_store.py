@@ -0,0 +1,129 @@
+import copy
+
+import pytest
+
+from compiled_graph import build_graph
+from genetic_algorithm_advanced import (DEFAULT_NETWORK, AdvancedRouteOptimizer, OptimizationRequest, Vehicle,
+                                        WasteClassification)
+from result_store import ResultStore, network_fingerprint, result_key
+from route_optimizer import ga_optimize_route
+
+
+def test_round_trip_and_persistence(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    store = ResultStore(path)
+    value = {"route": ["a", "b"], "fitness": 0.5, "schedule": [{"node": "a", "eta": 8.0}]}
+    store.put("k", value)
+    assert store.get("k") == value
+    assert store.get("missing") is None
+    store.close()
+    assert ResultStore(path).get("k") == value
+
+
+def test_get_or_compute_computes_once():
+    store = ResultStore()
+    calls = []
+    for _ in range(3):
+        assert store.get_or_compute("k", lambda: calls.append(1) or [1, 2]) == [1, 2]
+    assert len(calls) == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    store = ResultStore(max_entries=2)
+    store.put("a", 1)
+    store.put("b", 2)
+    store.get("a")
+    store.put("c", 3)  # b is the least recently used
+    assert store.get("b") is None
+    assert store.get("a") == 1 and store.get("c") == 3
+    assert len(store) == 2 and store.stats()["evictions"] == 1
+
+
+def test_stats():
+    store = ResultStore()
+    store.put("a", 1)
+    store.get("a")
+    store.get("a")
+    store.get("b")
+    stats = store.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["lifetime_hits"]) == (1, 2, 1, 2)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    store.clear()
+    assert len(store) == 0 and store.stats()["hits"] == 0
+
+
+def test_fingerprint_covers_time_windows_speeds_and_names():
+    base = network_fingerprint(build_graph(DEFAULT_NETWORK))
+    for change in ({"time_window": (8, 8.2)}, {"name": "Renamed"}):
+        network = copy.deepcopy(DEFAULT_NETWORK)
+        network["nodes"]["disposal"].update(change)
+        if "name" in change:
+            network["nodes"]["landfill"] = network["nodes"].pop("disposal")
+            network["distances"] = {tuple("landfill" if n == "disposal" else n for n in pair): attrs
+                                    for pair, attrs in network["distances"].items()}
+        assert network_fingerprint(build_graph(network)) != base
+    network = copy.deepcopy(DEFAULT_NETWORK)
+    pair = next(iter(network["distances"]))
+    attrs = network["distances"][pair]
+    network["distances"][pair] = dict(attrs if isinstance(attrs, dict) else {"distance": attrs}, speed=20)
+    assert network_fingerprint(build_graph(network)) != base
+
+
+def test_result_key_depends_on_every_part():
+    graph = build_graph(DEFAULT_NETWORK)
+    key = result_key("advanced", graph, seed=1, request=["a", "b"])
+    assert key == result_key("advanced", graph, request=["a", "b"], seed=1)
+    assert key != result_key("advanced", graph, seed=2, request=["a", "b"])
+    assert key != result_key("route_optimizer", graph, seed=1, request=["a", "b"])
+
+
+def optimizer_with_store(network=DEFAULT_NETWORK):
+    optimizer = AdvancedRouteOptimizer({"generations": 10, "population_size": 20})
+    optimizer.network = network
+    optimizer.result_store = ResultStore()
+    return optimizer
+
+
+def request():
+    return OptimizationRequest("source", "disposal", WasteClassification("toxic", 10), Vehicle(100))
+
+
+def test_advanced_runs_are_served_from_the_store():
+    optimizer = optimizer_with_store()
+    fresh = list(optimizer.optimize_iter(request(), seed=7))[-1]
+    cached = list(optimizer.optimize_iter(request(), seed=7))
+    assert len(cached) == 1 and cached[0].stop_reason == "cached"
+    assert vars(cached[0].result) == vars(fresh.result)
+
+
+@pytest.mark.parametrize("options, stored", [
+    ({}, 0),
+    ({"seed": 7, "deadline_ms": 0}, 0),        # stopped by the deadline
+    ({"seed": 7, "deadline_ms": 60_000}, 1),   # ran to the generation limit
+])
+def test_only_reproducible_runs_are_stored(options, stored):
+    optimizer = optimizer_with_store()
+    optimizer.optimize(request(), **options)
+    assert len(optimizer.result_store) == stored
+
+
+def test_networks_differing_in_time_windows_do_not_share_results():
+    closed = copy.deepcopy(DEFAULT_NETWORK)
+    closed["nodes"]["disposal"]["time_window"] = (8, 8.2)
+    store = ResultStore()
+    results = []
+    for network in (DEFAULT_NETWORK, closed):
+        optimizer = optimizer_with_store(network)
+        optimizer.result_store = store
+        results.append(optimizer.optimize(request(), seed=3))
+    assert store.stats()["hits"] == 0
+    assert results[1].penalty > results[0].penalty
+
+
+def test_route_optimizer_uses_the_store():
+    store = ResultStore()
+    first = ga_optimize_route("Source", "Disposal C", "Inspection C", seed=4, store=store, operators="ox")
+    assert ga_optimize_route("Source", "Disposal C", "Inspection C", seed=4, store=store, operators="ox") == first
+    assert store.stats()["hits"] == 1
+    ga_optimize_route("Source", "Disposal C", "Inspection C", store=store, operators="ox")
+    assert len(store) == 1
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyvis")
+
+import route_graph
+from distance_matrix import GRAPH
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    route_graph._ROUTES.clear()
+    yield
+    route_graph._ROUTES.clear()
+
+
+def test_base_graph_is_built_once_per_network():
+    base = route_graph.base_graph(GRAPH)
+    assert route_graph.base_graph(GRAPH) is base
+    assert len(base.edges) == GRAPH.n_edges and all(GRAPH.has_edge(a, b) for a, b in base.edges)
+    assert set(base.positions) == set(GRAPH.names)
+
+
+def test_route_html_is_cached_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route = ["Source", "Inspection C", "Disposal C"]
+    html = route_graph.route_html(GRAPH, route)
+    assert route_graph.route_html(GRAPH, tuple(route)) is html
+    assert "orange" in html and "Inspection C" in html
+    assert route_graph.route_html(GRAPH, ["Source", "Inspection A", "Disposal A"]) != html
+    assert os.listdir(tmp_path) == []
+
+
+def test_least_recently_viewed_routes_are_dropped(monkeypatch):
+    monkeypatch.setattr(route_graph, "ROUTE_CACHE_SIZE", 2)
+    routes = [("Source", "Inspection A", "Disposal A"), ("Source", "Inspection B", "Disposal B"),
+              ("Source", "Inspection C", "Disposal C")]
+    for route in routes:
+        route_graph.route_html(GRAPH, route)
+    assert [key[1] for key in route_graph._ROUTES] == routes[1:]
+
+
+def test_undirected_edges_are_drawn_once():
+    network = {"nodes": {n: {"name": n} for n in "abc"}, "distances": {("a", "b"): 1, ("b", "c"): 2}}
+    assert route_graph.base_graph(network).edges == [("a", "b"), ("b", "c")]
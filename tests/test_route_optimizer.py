@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from compiled_graph import compile_network
+from graph_store import regional_network
+from route_optimizer import (GRAPH, MAX_WALK_NODES, RouteGARun, disposal_rule, exact_optimize_route, ga_optimize_route,
+                             ga_optimize_route_islands, optimize_route)
+
+
+@pytest.fixture(scope="module")
+def region():
+    return compile_network(regional_network(5000))
+
+
+def test_initial_population_walks_real_edges(region):
+    start, disposal = region.names[0], region.names[-1]
+    run = RouteGARun(start, disposal, population_size=20, graph=region, operators="legacy")
+    for route in run.initial_population(random.Random(0)):
+        assert route[0] == start and route[-1] == disposal
+        assert len(route) <= MAX_WALK_NODES + 1
+        assert len(set(route)) == len(route)
+        # Every leg but the final jump to the disposal is an edge
+        assert all(region.has_edge(a, b) for a, b in zip(route[:-2], route[1:-1]))
+
+
+def test_initial_population_starts_with_adjacent_required_node():
+    run = RouteGARun("Source", "Disposal C", "Inspection C", population_size=10)
+    assert all(route[1] == "Inspection C" for route in run.initial_population(random.Random(0)))
+
+
+@pytest.mark.parametrize("operators", ["ox", "erx", "memetic"])
+def test_repaired_operators_reach_the_optimum(operators):
+    required, disposal = disposal_rule("Toxic")
+    route, cost = ga_optimize_route("Source", disposal, required, operators=operators, seed=0)
+    assert required in route
+    assert cost == pytest.approx(exact_optimize_route("Toxic")[1])
+
+
+def test_seeded_runs_are_reproducible():
+    assert ga_optimize_route("Source", "Disposal A", "Inspection A", seed=5, operators="ox") == \
+        ga_optimize_route("Source", "Disposal A", "Inspection A", seed=5, operators="ox")
+
+
+@pytest.mark.parametrize("waste_type", ["Toxic", "Flammable", "Corrosive", "General"])
+def test_optimize_route_returns_feasible_routes(waste_type):
+    route, cost = optimize_route(waste_type, seed=0)
+    ids = GRAPH.ids(route)
+    assert (GRAPH.edge_ids(ids[:-1], ids[1:]) >= 0).all()
+    assert cost == pytest.approx(exact_optimize_route(waste_type)[1])
+
+
+def test_legacy_ga_handles_direct_start_to_disposal_edges():
+    # Walks that take the direct edge are 2-node routes with no interior to cut or swap
+    network = {"nodes": {n: {"name": n, "type": "waypoint"} for n in "sad"},
+               "distances": {("s", "d"): {"distance": 5}, ("s", "a"): {"distance": 1}, ("a", "d"): {"distance": 1}}}
+    for seed in range(5):
+        route, cost = ga_optimize_route("s", "d", graph=network, seed=seed, operators="legacy")
+        assert route[0] == "s" and route[-1] == "d"
+        assert cost in (2, 5)
+
+
+def test_default_entry_points_return_real_routes():
+    for route, cost in [ga_optimize_route("Source", "Disposal C", "Inspection C", seed=2),
+                        ga_optimize_route_islands("Source", "Disposal C", "Inspection C", seed=2, max_workers=0)]:
+        ids = GRAPH.ids(route)
+        assert (GRAPH.edge_ids(ids[:-1], ids[1:]) >= 0).all()
+        assert "Inspection C" in route and cost == pytest.approx(exact_optimize_route("Toxic")[1])
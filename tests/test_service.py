@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+import metrics
+import service
+from service import InProcessClient, RoutingService
+
+BODY = {"source": "source", "destination": "disposal", "waste_type": "toxic", "quantity": 10, "capacity": 100,
+        "seed": 1}
+
+
+@pytest.fixture
+def app():
+    # GA runs on threads so tests do not spawn worker processes
+    app = RoutingService(ga_params={"generations": 5, "population_size": 20}, max_workers=2, processes=False)
+    yield app
+    app.stop()
+
+
+def call(app, method, path, body=None):
+    return asyncio.run(InProcessClient(app).request(method, path, body))
+
+
+def test_health(app):
+    assert call(app, "GET", "/health") == (200, {"status": "ok", "in_flight": 0})
+
+
+def test_classify(app):
+    status, body = call(app, "POST", "/classify", {"pH": 1, "flash_point": 100, "toxicity": "low"})
+    assert status == 200
+    assert body == {"category": "Corrosive"}
+
+
+def test_classify_batch(app):
+    status, body = call(app, "POST", "/classify/batch",
+                        {"pH": [1, 7], "flash_point": [100, 10], "toxicity": ["low", "low"]})
+    assert status == 200
+    assert body == {"categories": ["Corrosive", "Flammable"]}
+
+
+def test_risk_batch(app):
+    status, body = call(app, "POST", "/risk/batch",
+                        {"pH": [7, 1], "flash_point": [100, 10], "toxicity": ["low", "high"]})
+    assert status == 200
+    assert body["levels"] == ["Low", "High"]
+    assert body["risk"][0] < body["risk"][1]
+
+
+def test_optimize(app):
+    status, body = call(app, "POST", "/optimize", BODY)
+    assert status == 200
+    assert body["route"][0] == "source" and body["route"][-1] == "disposal"
+    assert body["fitness"] > 0
+    assert [stop["node"] for stop in body["schedule"]] == body["route"]
+
+
+def test_optimize_is_reproducible_with_seed(app):
+    assert call(app, "POST", "/optimize", BODY) == call(app, "POST", "/optimize", BODY)
+
+
+def test_metrics_include_worker_stages():
+    # Without the fitness cache every generation is scored (and timed) in the worker
+    app = RoutingService(ga_params={"generations": 5, "population_size": 20, "use_cache": False}, processes=False)
+    call(app, "POST", "/optimize", BODY)
+    app.stop()
+    status, body = call(app, "GET", "/metrics")
+    assert status == 200
+    assert {"http /optimize", "ga_setup", "ga_operators", "fitness"} <= set(body["timers"])
+    assert body["timers"]["ga_setup"]["calls"] == 1
+    status, text = call(app, "GET", "/metrics/prometheus")
+    assert status == 200 and 'stage="fitness"' in text
+
+
+def test_service_leaves_process_metrics_alone(app):
+    assert not metrics.METRICS.enabled
+    call(app, "POST", "/optimize", BODY)
+    assert "fitness" not in metrics.METRICS.snapshot()["timers"]
+
+
+def test_identical_in_flight_requests_share_one_run(app, monkeypatch):
+    calls = []
+    original = service._optimize
+
+    def counting(params):
+        calls.append(params)
+        time.sleep(0.05)  # keep the run in flight while the duplicates arrive
+        return original(params)
+
+    monkeypatch.setattr(service, "_optimize", counting)
+
+    async def run():
+        client = InProcessClient(app)
+        return await asyncio.gather(client.post("/optimize", BODY), client.post("/optimize", BODY),
+                                    client.post("/optimize", dict(BODY, seed=2)))
+
+    first, second, other = asyncio.run(run())
+    assert first == second and first[0] == other[0] == 200
+    assert len(calls) == 2
+    assert not app._in_flight
+    assert call(app, "GET", "/metrics")[1]["timers"]["ga_setup"]["calls"] == 2
+
+
+@pytest.mark.parametrize("method, path, status", [
+    ("GET", "/nowhere", 404),
+    ("GET", "/optimize", 405),
+])
+def test_unknown_routes(app, method, path, status):
+    assert call(app, method, path)[0] == status
+
+
+@pytest.mark.parametrize("raw, error", [
+    (b"{", "Invalid JSON"),
+    (b"[1, 2]", "Request body must be a JSON object"),
+])
+def test_invalid_bodies(app, raw, error):
+    assert asyncio.run(app.handle("POST", "/optimize", raw)) == (400, {"error": error})
+
+
+@pytest.mark.parametrize("changes", [
+    {"quantity": None},
+    {"quantity": "ten"},
+    {"source": ["source"]},
+    {"destination": {"node": "disposal"}},
+    {"source": "nowhere"},
+    {"quantity": 200},
+    {"latest_departure": "later"},
+    {"latest_departure": float("inf")},
+    {"start_time": float("nan")},
+])
+def test_optimize_rejects_bad_requests(app, changes):
+    status, body = call(app, "POST", "/optimize", dict(BODY, **changes))
+    assert status == 400
+    assert "error" in body
+
+
+def test_departure_window_is_capped(app):
+    status, body = call(app, "POST", "/optimize", dict(BODY, start_time=8, latest_departure=1e9))
+    assert status == 200
+    assert 8 <= body["departure_time"] <= 8 + 24
+
+
+def test_batch_rejects_mismatched_columns(app):
+    status, _ = call(app, "POST", "/classify/batch", {"pH": [1, 2], "flash_point": [3], "toxicity": ["low"]})
+    assert status == 400
+
+
+def test_worker_failure_is_a_json_500(app, monkeypatch):
+    def broken(params):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(service, "_optimize", broken)
+    assert call(app, "POST", "/optimize", BODY) == (500, {"error": "Internal error: RuntimeError"})
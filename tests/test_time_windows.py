@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from compiled_graph import build_graph
+from genetic_algorithm_advanced import AdvancedRouteOptimizer, OptimizationRequest, Vehicle, WasteClassification
+
+# a -> b -> c; a -> b is slow in the morning rush, b opens at 10 and c closes at 11
+RUSH = [50.0] * 6 + [25.0] * 2 + [50.0] * 16
+NETWORK = {
+    "nodes": {"a": {}, "b": {"time_window": (10, 18)}, "c": {"time_window": (0, 11)}},
+    "distances": {("a", "b"): {"distance": 50, "speed": "rush"}, ("b", "c"): {"distance": 20, "speed": 40}},
+    "speed_profiles": {"rush": RUSH},
+    "directed": True,
+}
+
+
+@pytest.fixture
+def optimizer():
+    optimizer = AdvancedRouteOptimizer({"generations": 5, "population_size": 10, "use_cache": False})
+    optimizer.network = NETWORK
+    return optimizer
+
+
+def request(**options):
+    return OptimizationRequest("a", "c", WasteClassification("general", 10), Vehicle(100), **options)
+
+
+def test_travel_time_depends_on_the_departure_hour(optimizer):
+    graph = optimizer.graph
+    assert not graph.constant_speed
+    eid = np.array([int(graph.edge_ids(0, 1))] * 4)
+    assert graph.travel_hours(eid, np.array([6.5, 8.0, 5.9, 30.0])).tolist() == [2.0, 1.0, 1.0, 2.0]
+
+
+def test_schedule_waits_for_the_time_window(optimizer):
+    schedule = optimizer._schedule(optimizer.graph.ids(["a", "b", "c"]), 8.0)
+    assert [stop["node"] for stop in schedule] == ["a", "b", "c"]
+    # Arrives at b at 9 and waits for it to open at 10, then reaches c at 10.5
+    assert (schedule[1]["arrival"], schedule[1]["wait"], schedule[1]["departure"]) == (9.0, 1.0, 10.0)
+    assert (schedule[2]["arrival"], schedule[2]["late"]) == (10.5, False)
+    assert optimizer._schedule(optimizer.graph.ids(["a", "b", "c"]), 10.0)[2]["late"]
+
+
+def test_departure_avoids_waiting_and_lateness(optimizer):
+    # 6-8 wait at b, 10 is late at c: 9 is the shortest on-time trip
+    result = optimizer.optimize(request(start_time=6, latest_departure=10), seed=1)
+    assert result.route == ["a", "b", "c"]
+    assert result.departure_time == 9.0 and result.duration == 1.5
+    assert result.penalty == 0 and not any(stop["late"] or stop["wait"] for stop in result.schedule)
+
+
+def test_late_arrival_is_penalised(optimizer):
+    result = optimizer.optimize(request(start_time=10), seed=1)
+    assert result.departure_time == 10.0 and result.schedule[-1]["late"]
+    assert result.penalty == 200.0
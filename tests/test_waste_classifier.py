@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from waste_classifier import CATEGORIES, classify_waste, classify_waste_batch, classify_waste_file
+
+
+def scalar_classify(pH, flash_point, toxicity):
+    # The original one-sample classifier
+    if flash_point < 37:
+        return "Flammable"
+    elif pH < 3 or pH > 11:
+        return "Corrosive"
+    elif toxicity.lower() == "high":
+        return "Toxic"
+    else:
+        return "General"
+
+
+def grid():
+    pH, flash_point, toxicity = np.meshgrid(np.linspace(0, 14, 57), np.linspace(0, 80, 81),
+                                            np.array(["low", "Medium", "HIGH", "high"]), indexing="ij")
+    return pH.ravel(), flash_point.ravel(), toxicity.ravel()
+
+
+def test_batch_matches_the_scalar_rules():
+    pH, flash_point, toxicity = grid()
+    expected = [scalar_classify(*row) for row in zip(pH, flash_point, toxicity)]
+    assert list(classify_waste_batch(pH, flash_point, toxicity)) == expected
+
+
+@pytest.mark.parametrize("sample, category", [
+    ((3.0, 37, "high"), "Toxic"),      # thresholds are strict
+    ((2.99, 37, "low"), "Corrosive"),
+    ((11.0, 36.9, "low"), "Flammable"),
+    ((7, 100, "low"), "General"),
+])
+def test_classify_waste(sample, category):
+    assert classify_waste(*sample) == category
+
+
+def test_frames_keep_their_index_and_missing_toxicity_is_not_toxic():
+    frame = pd.DataFrame({"pH": [7, 7, 1], "flash_point": [100, 100, 100], "toxicity": ["high", None, "low"]},
+                         index=[10, 20, 30])
+    result = classify_waste_batch(frame)
+    assert list(result.index) == [10, 20, 30]
+    assert list(result) == ["Toxic", "General", "Corrosive"]
+    assert list(result.cat.categories) == CATEGORIES
+
+
+def test_file_is_classified_in_chunks(tmp_path):
+    pH, flash_point, toxicity = grid()
+    source, output = tmp_path / "manifest.csv", tmp_path / "classified.csv"
+    pd.DataFrame({"pH": pH, "flash_point": flash_point, "toxicity": toxicity}).to_csv(source, index=False)
+    counts = classify_waste_file(source, output, chunksize=1000)
+    written = pd.read_csv(output)
+    assert len(written) == len(pH)
+    assert written["category"].tolist() == list(classify_waste_batch(pH, flash_point, toxicity))
+    assert counts.to_dict() == written["category"].value_counts().reindex(CATEGORIES, fill_value=0).to_dict()